@@ -1,13 +1,15 @@
 from __future__ import annotations
 
 from abc import ABCMeta, abstractmethod
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
 if TYPE_CHECKING:
     from autogpt.config import AIConfig, Config
 
     from autogpt.models.command_registry import CommandRegistry
 
+from autogpt.json_utils.streaming import JSONPath, JSONStreamParser
+from autogpt.json_utils.utilities import llm_response_schema
 from autogpt.llm.base import ChatModelResponse, ChatSequence, Message
 from autogpt.llm.providers.openai import OPEN_AI_CHAT_MODELS, get_openai_command_specs
 from autogpt.llm.utils import count_message_tokens, create_chat_completion
@@ -91,11 +93,15 @@ class BaseAgent(metaclass=ABCMeta):
     def think(
         self,
         instruction: Optional[str] = None,
+        on_partial_response: Optional[Callable[[JSONPath, Any], None]] = None,
     ) -> tuple[CommandName | None, CommandArgs | None, AgentThoughts]:
         """Runs the agent for one cycle.
 
         Params:
             instruction: The instruction to put at the end of the prompt.
+            on_partial_response: Called with each member of the response (e.g.
+                `("thoughts",)` or `("thoughts", "plan")`) and its value as soon
+                as it is complete, if responses are streamed (`OPENAI_STREAMING`).
 
         Returns:
             The command name and arguments, if any, and the agent's thoughts.
@@ -105,17 +111,64 @@ class BaseAgent(metaclass=ABCMeta):
 
         prompt: ChatSequence = self.construct_prompt(instruction)
         prompt = self.on_before_think(prompt, instruction)
-        raw_response = create_chat_completion(
-            prompt,
-            self.config,
-            functions=get_openai_command_specs(self.command_registry)
+        functions = (
+            get_openai_command_specs(self.command_registry)
             if self.config.openai_functions
-            else None,
+            else None
         )
+        if self.config.openai_streaming:
+            raw_response = self._stream_response(prompt, functions, on_partial_response)
+        else:
+            raw_response = create_chat_completion(
+                prompt, self.config, functions=functions
+            )
         self.cycle_count += 1
 
         return self.on_response(raw_response, prompt, instruction)
 
+    def _stream_response(
+        self,
+        prompt: ChatSequence,
+        functions: Optional[list],
+        on_partial_response: Optional[Callable[[JSONPath, Any], None]],
+    ) -> ChatModelResponse:
+        """
+        Streams the response to the prompt, and parses it as it arrives. Once all
+        required members of the response (the thoughts and the command) are known,
+        the rest of the response is not waited for.
+
+        With OpenAI functions, the command is a function call that follows the
+        content, so the response is always read to the end; only the thoughts are
+        passed to `on_partial_response` early.
+        """
+        parser = JSONStreamParser(on_partial_response)
+        # Nothing in the content is enough to stop early for: see above
+        required = (
+            set()
+            if functions
+            else set(llm_response_schema(self.config).get("required", []))
+        )
+
+        stopped_early = False
+
+        def on_content_delta(delta: str) -> bool:
+            nonlocal stopped_early
+            parser.feed(delta)
+            stopped_early = bool(required) and required <= parser.members.keys()
+            return stopped_early
+
+        response = create_chat_completion(
+            prompt,
+            self.config,
+            functions=functions,
+            on_content_delta=on_content_delta,
+        )
+        if stopped_early:
+            # Drop the rest of the response that wasn't waited for, which would
+            # otherwise leave e.g. an unclosed object or code fence
+            response.content = parser.completed_text()
+        return response
+
     @abstractmethod
     def execute(
         self,
@@ -214,7 +267,6 @@ class BaseAgent(metaclass=ABCMeta):
         Returns:
             The prompt to execute
         """
-        current_tokens_used = prompt.token_length
         plugin_count = len(self.config.plugins)
         for i, plugin in enumerate(self.config.plugins):
             if not plugin.can_handle_on_planning():
@@ -226,14 +278,13 @@ class BaseAgent(metaclass=ABCMeta):
                 continue
             message_to_add = Message("system", plugin_response)
             tokens_to_add = count_message_tokens(message_to_add, self.llm.name)
-            if current_tokens_used + tokens_to_add > self.send_token_limit:
+            if prompt.token_length + tokens_to_add > self.send_token_limit:
                 logger.debug(f"Plugin response too long, skipping: {plugin_response}")
                 logger.debug(f"Plugins remaining at stop: {plugin_count - i}")
                 break
             prompt.insert(
                 -1, message_to_add
             )  # HACK: assumes cycle instruction to be at the end
-            current_tokens_used += tokens_to_add
         return prompt
 
     def on_response(
@@ -138,5 +138,27 @@ def main(
         )
 
 
+@main.command("memory-server")
+@click.option("--debug", is_flag=True, help="Enable Debug Mode")
+@click.option(
+    "--workspace-directory",
+    "-w",
+    type=click.Path(),
+    hidden=True,
+)
+def memory_server(debug: bool, workspace_directory: Optional[str]) -> None:
+    """
+    Start a memory server, which keeps the memory indexes loaded for all Auto-GPT
+    instances that use the remote memory backend.
+    """
+    from autogpt.app.main import run_memory_server
+
+    run_memory_server(
+        debug=debug,
+        working_directory=Path(__file__).parent.parent,
+        workspace_directory=workspace_directory,
+    )
+
+
 if __name__ == "__main__":
     main()
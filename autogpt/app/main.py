@@ -6,7 +6,7 @@ import signal
 import sys
 from pathlib import Path
 from types import FrameType
-from typing import Optional
+from typing import Any, Optional
 
 from colorama import Fore, Style
 
@@ -15,7 +15,9 @@ from autogpt.app.configurator import create_config
 from autogpt.app.setup import prompt_user
 from autogpt.commands import COMMAND_CATEGORIES
 from autogpt.config import AIConfig, Config, ConfigBuilder, check_openai_api_key
+from autogpt.json_utils.streaming import JSONPath
 from autogpt.llm.api_manager import ApiManager
+from autogpt.llm.rate_limiter import set_model_rate_limits
 from autogpt.logs import logger
 from autogpt.memory.vector import get_memory
 from autogpt.models.command_registry import CommandRegistry
@@ -66,6 +68,7 @@ def run_auto_gpt(
 
     # TODO: fill in llm values here
     check_openai_api_key(config)
+    set_model_rate_limits(config.openai_rate_limits)
 
     create_config(
         config,
@@ -184,7 +187,9 @@ def run_auto_gpt(
     # Initialize memory and make sure it is empty.
     # this is particularly important for indexing and referencing pinecone memory
     memory = get_memory(config)
-    memory.clear()
+    if config.memory_backend != "remote":
+        # A memory server is shared with other agents, so it is left as is
+        memory.clear()
     logger.typewriter_log(
         "Using memory of type:", Fore.GREEN, f"{memory.__class__.__name__}"
     )
@@ -201,6 +206,32 @@ def run_auto_gpt(
     run_interaction_loop(agent)
 
 
+def run_memory_server(
+    debug: bool,
+    working_directory: Path,
+    workspace_directory: str | Path | None = None,
+):
+    """Serves the memory indexes in the workspace to the agents that use the remote
+    memory backend, until interrupted"""
+    from autogpt.memory.vector.server import MemoryServer
+
+    logger.set_level(logging.DEBUG if debug else logging.INFO)
+
+    config = ConfigBuilder.build_config_from_env(workdir=working_directory)
+    logger.config = config
+    config.workspace_path = Workspace.set_workspace_directory(
+        config, workspace_directory
+    )
+
+    set_model_rate_limits(config.openai_rate_limits)
+
+    server = MemoryServer(config)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Memory server stopped")
+
+
 def _get_cycle_budget(continuous_mode: bool, continuous_limit: int) -> int | None:
     # Translate from the continuous_mode/continuous_limit config
     # to a cycle_budget (maximum number of cycles to run without checking in with the
@@ -278,14 +309,33 @@ def run_interaction_loop(
         # Plan #
         ########
         # Have the agent determine the next action to take.
+        thoughts_shown = False
+
+        def show_thoughts(path: JSONPath, value: Any) -> None:
+            # Show streamed thoughts as soon as they are complete
+            nonlocal thoughts_shown
+            if path == ("thoughts",) and isinstance(value, dict):
+                spinner.stop()
+                print_assistant_thoughts(ai_config.ai_name, {"thoughts": value}, config)
+                thoughts_shown = True
+
         with spinner:
-            command_name, command_args, assistant_reply_dict = agent.think()
+            command_name, command_args, assistant_reply_dict = agent.think(
+                on_partial_response=show_thoughts
+            )
 
         ###############
         # Update User #
         ###############
         # Print the assistant's thoughts and the next command to the user.
-        update_user(config, ai_config, command_name, command_args, assistant_reply_dict)
+        update_user(
+            config,
+            ai_config,
+            command_name,
+            command_args,
+            assistant_reply_dict,
+            show_thoughts=not thoughts_shown,
+        )
 
         ##################
         # Get user input #
@@ -356,6 +406,7 @@ def update_user(
     command_name: CommandName | None,
     command_args: CommandArgs | None,
     assistant_reply_dict: AgentThoughts,
+    show_thoughts: bool = True,
 ) -> None:
     """Prints the assistant's thoughts and the next command to the user.
 
@@ -365,9 +416,12 @@ def update_user(
         command_name: The name of the command to execute.
         command_args: The arguments for the command.
         assistant_reply_dict: The assistant's reply.
+        show_thoughts: Whether to print the thoughts: not if they have already
+            been shown while the reply was streamed.
     """
 
-    print_assistant_thoughts(ai_config.ai_name, assistant_reply_dict, config)
+    if show_thoughts:
+        print_assistant_thoughts(ai_config.ai_name, assistant_reply_dict, config)
 
     if command_name is not None:
         if config.speak_mode:
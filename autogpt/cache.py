@@ -0,0 +1,138 @@
+"""Persistent, size-bounded key-value cache backed by SQLite"""
+from __future__ import annotations
+
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+from autogpt.logs import logger
+
+
+class PersistentCache:
+    """
+    A key-value cache that is stored in an SQLite database, so that it is shared
+    between runs (and processes) that use the same cache file.
+
+    When the cache holds more than `max_entries` entries, the least recently used
+    entries are evicted. If `max_age` is set, entries expire `max_age` seconds after
+    they were stored. Lookups are counted in `hits` and `misses`.
+
+    Errors of the underlying database are logged and otherwise ignored: a failing
+    cache behaves like an empty one and must never break the code that uses it.
+    """
+
+    _MAX_SQL_PARAMS = 900
+    """Stays below SQLite's default limit on the number of parameters per query"""
+
+    def __init__(
+        self, path: Path, max_entries: int, max_age: float | None = None
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS cache_last_access ON cache(last_access)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS cache_created ON cache(created)"
+            )
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: str) -> bytes | None:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, bytes]:
+        """Returns the cached values for those of the given keys that are cached"""
+        keys = list(dict.fromkeys(keys))
+        found: dict[str, bytes] = {}
+        try:
+            with self._lock, self._db:
+                for i in range(0, len(keys), self._MAX_SQL_PARAMS):
+                    batch = keys[i : i + self._MAX_SQL_PARAMS]
+                    placeholders = ",".join("?" * len(batch))
+                    found.update(
+                        self._db.execute(
+                            "SELECT key, value FROM cache "
+                            f"WHERE key IN ({placeholders}) AND created >= ?",
+                            [*batch, self._expiry_cutoff()],
+                        ).fetchall()
+                    )
+                    self._db.execute(
+                        "UPDATE cache SET last_access = ? "
+                        f"WHERE key IN ({placeholders})",
+                        [time.time(), *batch],
+                    )
+                self.hits += len(found)
+                self.misses += len(keys) - len(found)
+        except sqlite3.Error as e:
+            logger.warn(f"Could not read from cache {self.path}: {e}")
+            self.misses += len(keys)
+        return found
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many({key: value})
+
+    def set_many(self, items: dict[str, bytes]) -> None:
+        """Stores the given values and evicts the least recently used entries"""
+        now = time.time()
+        try:
+            with self._lock, self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, last_access, created) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(key, value, now, now) for key, value in items.items()],
+                )
+                if self.max_age is not None:
+                    self._db.execute(
+                        "DELETE FROM cache WHERE created < ?", (self._expiry_cutoff(),)
+                    )
+                (n_entries,) = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()
+                if n_entries > self.max_entries:
+                    self._db.execute(
+                        "DELETE FROM cache WHERE key IN ("
+                        " SELECT key FROM cache ORDER BY last_access LIMIT ?)",
+                        (n_entries - self.max_entries,),
+                    )
+        except sqlite3.Error as e:
+            logger.warn(f"Could not write to cache {self.path}: {e}")
+
+    def _expiry_cutoff(self) -> float:
+        """Entries stored before this time have expired"""
+        return time.time() - self.max_age if self.max_age is not None else -math.inf
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM cache")
+        self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self)} entries, {self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate:.0%} hit rate)"
+        )
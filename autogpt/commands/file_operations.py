@@ -6,15 +6,22 @@ import hashlib
 import os
 import os.path
 from pathlib import Path
-from typing import Generator, Literal
+from typing import Generator, Iterable, Iterator, Literal
 
 from autogpt.agents.agent import Agent
 from autogpt.command_decorator import command
+from autogpt.config import Config
 from autogpt.logs import logger
-from autogpt.memory.vector import MemoryItem, VectorMemory
+from autogpt.memory.vector import (
+    IngestionPipeline,
+    MemoryDocument,
+    MemoryItem,
+    VectorMemory,
+    hash_content,
+)
 
 from .decorators import sanitize_path_arg
-from .file_operations_utils import read_textual_file
+from .file_operations_utils import read_textual_file, read_textual_files
 
 Operation = Literal["write", "append", "delete"]
 
@@ -148,10 +155,20 @@ def read_file(filename: str, agent: Agent) -> str:
         str: The contents of the file
     """
     try:
-        content = read_textual_file(filename, logger)
-
-        # TODO: invalidate/update memory when file is edited
-        file_memory = MemoryItem.from_text_file(content, filename, agent.config)
+        content = read_textual_file(
+            filename,
+            logger,
+            max_tokens=agent.config.read_file_max_tokens or None,
+            for_model=agent.config.fast_llm,
+        )
+
+        # Don't summarize the file again if its memory is up to date
+        memory = agent.memory
+        file_memory = memory.find("text_file", filename, hash_content(content))
+        if file_memory is None:
+            file_memory = MemoryItem.from_text_file(content, filename, agent.config)
+            if agent.config.memorize_read_files:
+                file_memory = memory.upsert(file_memory)
         if len(file_memory.chunks) > 1:
             return file_memory.summary
 
@@ -160,10 +177,7 @@ def read_file(filename: str, agent: Agent) -> str:
         return f"Error: {str(e)}"
 
 
-def ingest_file(
-    filename: str,
-    memory: VectorMemory,
-) -> None:
+def ingest_file(filename: str, memory: VectorMemory, config: Config) -> None:
     """
     Ingest a file by reading its content, splitting it into chunks with a specified
     maximum length and overlap, and adding the chunks to the memory storage.
@@ -171,19 +185,51 @@ def ingest_file(
     Args:
         filename: The name of the file to ingest
         memory: An object with an add() method to store the chunks in memory
+        config: The config object
     """
-    try:
-        logger.info(f"Ingesting file {filename}")
-        content = read_file(filename)
+    ingest_files([filename], memory, config)
 
-        # TODO: differentiate between different types of files
-        file_memory = MemoryItem.from_text_file(content, filename)
-        logger.debug(f"Created memory: {file_memory.dump(True)}")
-        memory.add(file_memory)
 
-        logger.info(f"Ingested {len(file_memory.e_chunks)} chunks from {filename}")
-    except Exception as err:
-        logger.warn(f"Error while ingesting file '{filename}': {err}")
+def ingest_files(
+    filenames: Iterable[str],
+    memory: VectorMemory,
+    config: Config,
+    raise_errors: bool = False,
+) -> int:
+    """
+    Ingest multiple files into the memory storage. The files are read in a pool of
+    processes (see `read_textual_files`), and summarized and embedded concurrently and
+    in batches; see `IngestionPipeline`. Files that are unchanged in the memory are
+    skipped.
+
+    Args:
+        filenames: The names of the files to ingest
+        memory: An object with an add() method to store the chunks in memory
+        config: The config object
+        raise_errors: If True, raise the error of the first file that can't be read
+            or ingested. Otherwise, such files are logged and skipped.
+
+    Returns:
+        int: The number of files that were ingested, not counting unchanged files
+    """
+
+    def read_files() -> Iterator[MemoryDocument]:
+        for filename, content in read_textual_files(
+            filenames,
+            logger,
+            config.memory_ingestion_parse_workers,
+            config.memory_ingestion_parse_timeout or None,
+        ):
+            if isinstance(content, Exception):
+                if raise_errors:
+                    raise content
+                logger.warn(f"Error while ingesting file '{filename}': {content}")
+                continue
+            logger.info(f"Ingesting file {filename}")
+            # TODO: differentiate between different types of files
+            yield MemoryDocument(content, "text_file", {"location": filename})
+
+    return IngestionPipeline(config).ingest(read_files(), memory, raise_errors)
 
 
 @command(
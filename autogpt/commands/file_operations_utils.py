@@ -1,5 +1,18 @@
+from __future__ import annotations
+
+import codecs
+import dataclasses
+import functools
 import json
+import math
+import multiprocessing
+import multiprocessing.connection
 import os
+import time
+from multiprocessing.connection import Connection
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+from typing import Callable, Iterable, Iterator, Optional
 
 import charset_normalizer
 import docx
@@ -10,40 +23,103 @@ from bs4 import BeautifulSoup
 from pylatexenc.latex2text import LatexNodes2Text
 
 from autogpt import logs
+from autogpt.llm.utils import get_encoding
 from autogpt.logs import logger
 
+TEXT_BLOCK_CHARS = 1 << 16
+"""Number of characters of a plain text file that are read at a time"""
+
+CHARSET_DETECTION_BYTES = 1 << 20
+"""Number of bytes at the start of a text file that its encoding is detected from"""
+
+FILE_INFO_CACHE_SIZE = 1024
+"""Number of files of which the encoding and type are remembered"""
+
 
 class ParserStrategy:
+    """
+    Extracts the text of a file. Parsers implement `iter_text` if their format can be
+    read in segments (pages, paragraphs, blocks), and `read` otherwise.
+    """
+
     def read(self, file_path: str) -> str:
-        raise NotImplementedError
+        return "".join(self.iter_text(file_path))
+
+    def iter_text(self, file_path: str) -> Iterator[str]:
+        """Yields the text of the file in segments, as they are parsed"""
+        yield self.read(file_path)
 
 
 # Basic text file reading
 class TXTParser(ParserStrategy):
-    def read(self, file_path: str) -> str:
-        charset_match = charset_normalizer.from_path(file_path).best()
-        logger.debug(f"Reading '{file_path}' with encoding '{charset_match.encoding}'")
-        return str(charset_match)
+    def iter_text(self, file_path: str) -> Iterator[str]:
+        encoding, exact = _detect_encoding(*_file_key(file_path))
+        logger.debug(f"Reading '{file_path}' with encoding '{encoding}'")
+
+        # The encoding of a large file is guessed from its start, so the rest of it
+        # may contain characters that can't be decoded
+        with open(
+            file_path, "r", encoding=encoding, errors=None if exact else "replace"
+        ) as f:
+            while block := f.read(TEXT_BLOCK_CHARS):
+                yield block
+
+
+def _file_key(file_path: str) -> tuple[str, int, int]:
+    """Identifies a version of a file by its path, modification time and size"""
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+
+@functools.lru_cache(maxsize=FILE_INFO_CACHE_SIZE)
+def _detect_encoding(file_path: str, mtime_ns: int, size: int) -> tuple[str, bool]:
+    """
+    Returns the encoding of a text file, and whether it was checked against the whole
+    file. Files that decode as UTF-8 are read as such; only for other files, the
+    encoding is detected with charset_normalizer. Results are cached for each
+    version of a file; see `_file_key`.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(file_path, "rb") as f:
+        bom = f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8
+        f.seek(0)
+        try:
+            while block := f.read(CHARSET_DETECTION_BYTES):
+                decoder.decode(block)
+            decoder.decode(b"", final=True)
+            return ("utf_8_sig" if bom else "utf_8"), True
+        except UnicodeDecodeError:
+            pass
+
+        f.seek(0)
+        sample = f.read(CHARSET_DETECTION_BYTES)
+        is_sample = bool(f.read(1))
+    charset_match = charset_normalizer.from_bytes(sample).best()
+    if charset_match is None:
+        logger.warn(
+            f"Could not detect the encoding of '{file_path}', reading it as UTF-8"
+        )
+        return "utf_8", False
+    encoding = charset_match.encoding
+    if charset_match.bom and encoding == "utf_8":
+        encoding = "utf_8_sig"
+    return encoding, not is_sample
 
 
 # Reading text from binary file using pdf parser
 class PDFParser(ParserStrategy):
-    def read(self, file_path: str) -> str:
+    def iter_text(self, file_path: str) -> Iterator[str]:
         parser = PyPDF2.PdfReader(file_path)
-        text = ""
-        for page_idx in range(len(parser.pages)):
-            text += parser.pages[page_idx].extract_text()
-        return text
+        for page in parser.pages:
+            yield page.extract_text()
 
 
 # Reading text from binary file using docs parser
 class DOCXParser(ParserStrategy):
-    def read(self, file_path: str) -> str:
+    def iter_text(self, file_path: str) -> Iterator[str]:
         doc_file = docx.Document(file_path)
-        text = ""
         for para in doc_file.paragraphs:
-            text += para.text
-        return text
+            yield para.text
 
 
 # Reading as dictionary and returning string format
@@ -109,6 +185,10 @@ class FileContext:
         self.logger.debug(f"Reading file {file_path} with parser {self.parser}")
         return self.parser.read(file_path)
 
+    def iter_file(self, file_path) -> Iterator[str]:
+        self.logger.debug(f"Reading file {file_path} with parser {self.parser}")
+        return self.parser.iter_text(file_path)
+
 
 extension_to_parser = {
     ".txt": TXTParser(),
@@ -129,33 +209,243 @@ extension_to_parser = {
 
 
 def is_file_binary_fn(file_path: str):
-    """Given a file path load all its content and checks if the null bytes is present
+    """Given a file path, checks if null bytes are present in its content
 
     Args:
-        file_path (_type_): _description_
+        file_path (str): The path of the file
 
     Returns:
         bool: is_binary
     """
     with open(file_path, "rb") as f:
-        file_data = f.read()
-    if b"\x00" in file_data:
-        return True
+        while block := f.read(1 << 20):
+            if b"\x00" in block:
+                return True
     return False
 
 
-def read_textual_file(file_path: str, logger: logs.Logger) -> str:
+@functools.lru_cache(maxsize=FILE_INFO_CACHE_SIZE)
+def _is_file_binary(file_path: str, mtime_ns: int, size: int) -> bool:
+    """Cached `is_file_binary_fn` for each version of a file; see `_file_key`"""
+    return is_file_binary_fn(file_path)
+
+
+def read_textual_file(
+    file_path: str,
+    logger: logs.Logger,
+    max_bytes: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    for_model: str = "gpt-3.5-turbo",
+) -> str:
+    """Reads the text of a file; see `iter_textual_file`"""
+    return "".join(
+        iter_textual_file(file_path, logger, max_bytes, max_tokens, for_model)
+    )
+
+
+def iter_textual_file(
+    file_path: str,
+    logger: logs.Logger,
+    max_bytes: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    for_model: str = "gpt-3.5-turbo",
+) -> Iterator[str]:
+    """
+    Yields the text of a file in segments (pages, paragraphs or blocks, depending on
+    the file type) as they are parsed, so the text never has to be held as a whole.
+
+    Args:
+        file_path (str): The path of the file
+        logger (Logger): The logger to use
+        max_bytes (int, optional): Stop after this many bytes of (UTF-8) text
+        max_tokens (int, optional): Stop after this many tokens of text. Segments are
+            tokenized separately, so the count may differ slightly from the token
+            count of the joined text.
+        for_model (str): The model whose tokenizer `max_tokens` applies to
+
+    Raises:
+        FileNotFoundError: if the file doesn't exist
+        ValueError: if the file is binary and of an unsupported type
+    """
     if not os.path.isfile(file_path):
         raise FileNotFoundError(
             f"read_file {file_path} failed: no such file or directory"
         )
-    is_binary = is_file_binary_fn(file_path)
     file_extension = os.path.splitext(file_path)[1].lower()
     parser = extension_to_parser.get(file_extension)
     if not parser:
-        if is_binary:
+        if _is_file_binary(*_file_key(file_path)):
             raise ValueError(f"Unsupported binary file format: {file_extension}")
         # fallback to txt file parser (to support script and code files loading)
         parser = TXTParser()
     file_context = FileContext(parser, logger)
-    return file_context.read_file(file_path)
+    segments = file_context.iter_file(file_path)
+    if max_bytes is None and max_tokens is None:
+        yield from segments
+        return
+
+    tokenizer = None
+    n_bytes = n_tokens = 0
+    # Every token is at least one byte, so text isn't tokenized until it is longer
+    # than `max_tokens` bytes; until then, these are the segments that are not counted
+    uncounted: list[str] = []
+    for segment in segments:
+        truncated = False
+        data = segment.encode("utf-8")
+        if max_bytes is not None and n_bytes + len(data) > max_bytes:
+            segment = data[: max_bytes - n_bytes].decode("utf-8", errors="ignore")
+            data = segment.encode("utf-8")
+            truncated = True
+        n_bytes += len(data)
+        if max_tokens is not None and tokenizer is None:
+            if n_bytes <= max_tokens:
+                uncounted.append(segment)
+            else:
+                tokenizer = get_encoding(for_model)
+                n_tokens = sum(len(tokenizer.encode(s)) for s in uncounted)
+                uncounted.clear()
+        if tokenizer is not None:
+            tokens = tokenizer.encode(segment)
+            if n_tokens + len(tokens) > max_tokens:
+                segment = tokenizer.decode(tokens[: max_tokens - n_tokens])
+                truncated = True
+            n_tokens += min(len(tokens), max_tokens - n_tokens)
+        if segment:
+            yield segment
+        if truncated:
+            logger.debug(f"Stopped reading {file_path} at the size limit")
+            return
+
+
+ReadFileFn = Callable[[str, logs.Logger], str]
+
+
+def read_textual_files(
+    file_paths: Iterable[str],
+    logger: logs.Logger,
+    workers: int,
+    timeout: Optional[float] = None,
+    read_file: ReadFileFn = read_textual_file,
+) -> Iterator[tuple[str, str | Exception]]:
+    """
+    Reads the text of many files in a pool of `workers` processes, so that parsing
+    (which is CPU bound for PDF, DOCX, LaTeX and HTML files) scales with the number of
+    cores. The (file path, text) pairs are yielded in order of completion; if a file
+    can't be read, the exception is yielded instead of its text.
+
+    A worker that takes longer than `timeout` seconds to read a file is killed and
+    replaced, and a TimeoutError is yielded for the file, so that one pathological
+    file can't stall the others. With `workers` < 1, the files are read one by one
+    in this process, without a timeout.
+
+    Args:
+        file_paths: The paths of the files to read
+        logger: The logger to use
+        workers: The number of worker processes
+        timeout: The maximum number of seconds to spend on a single file
+        read_file: The function that reads a file; must be picklable
+    """
+    if workers < 1:
+        for file_path in file_paths:
+            try:
+                yield file_path, read_file(file_path, logger)
+            except Exception as e:
+                yield file_path, e
+        return
+
+    # Forking a process with running threads is unsafe
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # Import the parsers once in the server, instead of in every worker
+        context.set_forkserver_preload([__name__])
+    else:
+        context = multiprocessing.get_context("spawn")
+    file_paths = iter(file_paths)
+    idle: list[_ParseWorker] = []
+    # The deadline of a file is set when its worker starts to read it
+    busy: dict[Connection, tuple[_ParseWorker, str, float]] = {}
+    try:
+        while True:
+            while len(busy) < workers and (path := next(file_paths, None)) is not None:
+                worker = idle.pop() if idle else _ParseWorker.start(context, read_file)
+                worker.connection.send(path)
+                busy[worker.connection] = (worker, path, math.inf)
+            if not busy:
+                return
+
+            next_deadline = min(deadline for _, _, deadline in busy.values())
+            for connection in multiprocessing.connection.wait(
+                list(busy),
+                None
+                if next_deadline == math.inf
+                else max(0, next_deadline - time.monotonic()),
+            ):
+                worker, path, _ = busy.pop(connection)
+                try:
+                    status, result = connection.recv()
+                except EOFError:
+                    worker.stop()
+                    yield path, RuntimeError(f"Worker process died reading {path}")
+                    continue
+                if status == "started":
+                    deadline = time.monotonic() + timeout if timeout else math.inf
+                    busy[connection] = (worker, path, deadline)
+                    continue
+                idle.append(worker)
+                yield path, result
+
+            now = time.monotonic()
+            for connection, (worker, path, deadline) in list(busy.items()):
+                if deadline <= now:
+                    logger.warn(f"Reading {path} timed out; killing its worker")
+                    del busy[connection]
+                    worker.stop()
+                    yield path, TimeoutError(
+                        f"Reading {path} took longer than {timeout} seconds"
+                    )
+    finally:
+        for worker in idle + [worker for worker, _, _ in busy.values()]:
+            worker.stop()
+
+
+@dataclasses.dataclass
+class _ParseWorker:
+    """A process that reads the files that are sent to it through `connection`"""
+
+    process: BaseProcess
+    connection: Connection
+
+    @staticmethod
+    def start(context: BaseContext, read_file: ReadFileFn) -> _ParseWorker:
+        connection, child_connection = context.Pipe()
+        process = context.Process(
+            target=_parse_files, args=(child_connection, read_file), daemon=True
+        )
+        process.start()
+        child_connection.close()
+        return _ParseWorker(process, connection)
+
+    def stop(self) -> None:
+        self.connection.close()
+        self.process.kill()
+        self.process.join()
+
+
+def _parse_files(connection: Connection, read_file: ReadFileFn) -> None:
+    """Reads the files that are sent through the connection, and sends back a
+    ("started", None) message and then a ("done", text or exception) message"""
+    while True:
+        try:
+            file_path = connection.recv()
+        except EOFError:
+            return
+        connection.send(("started", None))
+        try:
+            result = read_file(file_path, logger)
+        except Exception as e:
+            result = e
+        try:
+            connection.send(("done", result))
+        except Exception as e:
+            # The exception could not be pickled
+            connection.send(("done", RuntimeError(f"Could not read {file_path}: {e}")))
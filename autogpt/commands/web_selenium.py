@@ -30,7 +30,7 @@ from webdriver_manager.microsoft import EdgeChromiumDriverManager as EdgeDriverM
 from autogpt.agents.agent import Agent
 from autogpt.command_decorator import command
 from autogpt.logs import logger
-from autogpt.memory.vector import MemoryItem, get_memory
+from autogpt.memory.vector import MemoryItem, hash_content
 from autogpt.processing.html import extract_hyperlinks, format_hyperlinks
 from autogpt.url_utils.validators import validate_url
 
@@ -230,8 +230,12 @@ def summarize_memorize_webpage(
     text_length = len(text)
     logger.info(f"Text length: {text_length} characters")
 
-    memory = get_memory(agent.config)
+    memory = agent.memory
 
-    new_memory = MemoryItem.from_webpage(text, url, agent.config, question=question)
-    memory.add(new_memory)
-    return new_memory.summary
+    # Only summarize the page if it is new or has changed since it was last visited
+    page_memory = memory.find("webpage", url, hash_content(text, question))
+    if page_memory is None:
+        page_memory = memory.upsert(
+            MemoryItem.from_webpage(text, url, agent.config, question=question)
+        )
+    return page_memory.summary
@@ -5,7 +5,7 @@ import contextlib
 import os
 import re
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Literal, Optional, Union
 
 import yaml
 from auto_gpt_plugin_template import AutoGPTPluginTemplate
@@ -54,8 +54,18 @@ class Config(SystemSettings, arbitrary_types_allowed=True):
     smart_llm: str = "gpt-4"
     temperature: float = 0
     openai_functions: bool = False
+    openai_streaming: bool = False
     embedding_model: str = "text-embedding-ada-002"
+    embedding_cache_size: int = 10000
     browse_spacy_language_model: str = "en_core_web_sm"
+    browse_spacy_sentencizer_only: bool = False
+    summarization_concurrency: int = 4
+    summarization_requests_per_minute: int = 0
+    summarization_extract_max_tokens: int = 3000
+    summary_cache_size: int = 1000
+    summary_cache_ttl: int = 604800
+    llm_cache_mode: Literal["passthrough", "record", "replay"] = "passthrough"
+    llm_cache_size: int = 1000
     # Run loop configuration
     continuous_mode: bool = False
     continuous_limit: int = 0
@@ -65,6 +75,17 @@ class Config(SystemSettings, arbitrary_types_allowed=True):
     ##########
     memory_backend: str = "json_file"
     memory_index: str = "auto-gpt-memory"
+    memorize_read_files: bool = False
+    memory_ivf_nprobe: int = 16
+    memory_embedding_dtype: str = "float32"
+    memory_rescore_factor: int = 4
+    memory_ingestion_concurrency: int = 4
+    memory_ingestion_requests_per_minute: int = 0
+    memory_ingestion_parse_workers: int = os.cpu_count() or 1
+    memory_ingestion_parse_timeout: int = 300
+    memory_server_address: Optional[str] = None
+    memory_server_authkey: Optional[str] = None
+    memory_server_backend: str = "segment_file"
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_password: str = ""
@@ -78,6 +99,7 @@ class Config(SystemSettings, arbitrary_types_allowed=True):
     # File ops
     restrict_to_workspace: bool = True
     allow_downloads: bool = False
+    read_file_max_tokens: int = 100000
     # Shell commands
     shell_command_control: str = "denylist"
     execute_local_commands: bool = False
@@ -121,6 +143,8 @@ class Config(SystemSettings, arbitrary_types_allowed=True):
     use_azure: bool = False
     azure_config_file: Optional[str] = AZURE_CONFIG_FILE
     azure_model_to_deployment_id_map: Optional[Dict[str, str]] = None
+    # (requests per minute, tokens per minute) of each rate-limited model
+    openai_rate_limits: Dict[str, tuple[int, int]] = Field(default_factory=dict)
     # Elevenlabs
     elevenlabs_api_key: Optional[str] = None
     # Github
@@ -224,6 +248,8 @@ class ConfigBuilder(Configurable[Config]):
             "smart_llm": os.getenv("SMART_LLM", os.getenv("SMART_LLM_MODEL")),
             "embedding_model": os.getenv("EMBEDDING_MODEL"),
             "browse_spacy_language_model": os.getenv("BROWSE_SPACY_LANGUAGE_MODEL"),
+            "browse_spacy_sentencizer_only": os.getenv("BROWSE_SPACY_SENTENCIZER_ONLY")
+            == "True",
             "openai_api_key": os.getenv("OPENAI_API_KEY"),
             "use_azure": os.getenv("USE_AZURE") == "True",
             "azure_config_file": os.getenv("AZURE_CONFIG_FILE", AZURE_CONFIG_FILE),
@@ -232,6 +258,8 @@ class ConfigBuilder(Configurable[Config]):
             "restrict_to_workspace": os.getenv("RESTRICT_TO_WORKSPACE", "True")
             == "True",
             "openai_functions": os.getenv("OPENAI_FUNCTIONS", "False") == "True",
+            "openai_streaming": os.getenv("OPENAI_STREAMING", "False") == "True",
+            "llm_cache_mode": os.getenv("LLM_CACHE_MODE"),
             "elevenlabs_api_key": os.getenv("ELEVENLABS_API_KEY"),
             "streamelements_voice": os.getenv("STREAMELEMENTS_VOICE"),
             "text_to_speech_provider": os.getenv("TEXT_TO_SPEECH_PROVIDER"),
@@ -252,6 +280,11 @@ class ConfigBuilder(Configurable[Config]):
             "user_agent": os.getenv("USER_AGENT"),
             "memory_backend": os.getenv("MEMORY_BACKEND"),
             "memory_index": os.getenv("MEMORY_INDEX"),
+            "memorize_read_files": os.getenv("MEMORIZE_READ_FILES", "False") == "True",
+            "memory_embedding_dtype": os.getenv("MEMORY_EMBEDDING_DTYPE"),
+            "memory_server_address": os.getenv("MEMORY_SERVER_ADDRESS"),
+            "memory_server_authkey": os.getenv("MEMORY_SERVER_AUTHKEY"),
+            "memory_server_backend": os.getenv("MEMORY_SERVER_BACKEND"),
             "redis_host": os.getenv("REDIS_HOST"),
             "redis_password": os.getenv("REDIS_PASSWORD"),
             "wipe_redis_on_start": os.getenv("WIPE_REDIS_ON_START", "True") == "True",
@@ -289,6 +322,10 @@ class ConfigBuilder(Configurable[Config]):
                 default_tts_provider = "gtts"
             config_dict["text_to_speech_provider"] = default_tts_provider
 
+        config_dict["openai_rate_limits"] = _parse_rate_limits(
+            os.getenv("OPENAI_RATE_LIMITS")
+        )
+
         config_dict["plugins_allowlist"] = _safe_split(os.getenv("ALLOWLISTED_PLUGINS"))
         config_dict["plugins_denylist"] = _safe_split(os.getenv("DENYLISTED_PLUGINS"))
 
@@ -296,6 +333,50 @@ class ConfigBuilder(Configurable[Config]):
             config_dict["image_size"] = int(os.getenv("IMAGE_SIZE"))
         with contextlib.suppress(TypeError):
             config_dict["redis_port"] = int(os.getenv("REDIS_PORT"))
+        with contextlib.suppress(TypeError):
+            config_dict["embedding_cache_size"] = int(os.getenv("EMBEDDING_CACHE_SIZE"))
+        with contextlib.suppress(TypeError):
+            config_dict["memory_ivf_nprobe"] = int(os.getenv("MEMORY_IVF_NPROBE"))
+        with contextlib.suppress(TypeError):
+            config_dict["memory_rescore_factor"] = int(
+                os.getenv("MEMORY_RESCORE_FACTOR")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["memory_ingestion_concurrency"] = int(
+                os.getenv("MEMORY_INGESTION_CONCURRENCY")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["memory_ingestion_requests_per_minute"] = int(
+                os.getenv("MEMORY_INGESTION_REQUESTS_PER_MINUTE")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["memory_ingestion_parse_workers"] = int(
+                os.getenv("MEMORY_INGESTION_PARSE_WORKERS")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["memory_ingestion_parse_timeout"] = int(
+                os.getenv("MEMORY_INGESTION_PARSE_TIMEOUT")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["read_file_max_tokens"] = int(os.getenv("READ_FILE_MAX_TOKENS"))
+        with contextlib.suppress(TypeError):
+            config_dict["summarization_concurrency"] = int(
+                os.getenv("SUMMARIZATION_CONCURRENCY")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["summarization_requests_per_minute"] = int(
+                os.getenv("SUMMARIZATION_REQUESTS_PER_MINUTE")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["summarization_extract_max_tokens"] = int(
+                os.getenv("SUMMARIZATION_EXTRACT_MAX_TOKENS")
+            )
+        with contextlib.suppress(TypeError):
+            config_dict["summary_cache_size"] = int(os.getenv("SUMMARY_CACHE_SIZE"))
+        with contextlib.suppress(TypeError):
+            config_dict["summary_cache_ttl"] = int(os.getenv("SUMMARY_CACHE_TTL"))
+        with contextlib.suppress(TypeError):
+            config_dict["llm_cache_size"] = int(os.getenv("LLM_CACHE_SIZE"))
         with contextlib.suppress(TypeError):
             config_dict["temperature"] = float(os.getenv("TEMPERATURE"))
 
@@ -390,3 +471,23 @@ def _safe_split(s: Union[str, None], sep: str = ",") -> list[str]:
     if s is None:
         return []
     return s.split(sep)
+
+
+def _parse_rate_limits(s: Union[str, None]) -> dict[str, tuple[int, int]]:
+    """
+    Parses rate limits of the form `model:requests_per_minute:tokens_per_minute`,
+    separated by commas, into a dict of (requests per minute, tokens per minute)
+    """
+    limits = {}
+    for limit in _safe_split(s):
+        if not limit.strip():
+            continue
+        try:
+            model, requests_per_minute, tokens_per_minute = limit.strip().split(":")
+            limits[model] = (int(requests_per_minute), int(tokens_per_minute))
+        except ValueError:
+            raise ValueError(
+                f"Invalid rate limit '{limit}' in OPENAI_RATE_LIMITS; "
+                "expected model:requests_per_minute:tokens_per_minute"
+            )
+    return limits
@@ -1,9 +1,12 @@
+import asyncio
+import email.utils
 import enum
 import functools
 import logging
 import math
+import random
 import time
-from typing import Callable, ParamSpec, TypeVar
+from typing import Callable, Mapping, ParamSpec, TypeVar
 
 import openai
 from openai.error import APIError, RateLimitError
@@ -312,13 +315,60 @@ _T = TypeVar("_T")
 _P = ParamSpec("_P")
 
 
+class _RateLimitState:
+    """
+    Rate limit state that is shared by the concurrent calls of a provider: when one
+    call is rate limited, all calls wait until the API is expected to accept
+    requests again, instead of each retrying into the limit on its own.
+    """
+
+    def __init__(self) -> None:
+        self.resume_at = 0.0
+        """The `time.monotonic()` at which requests can be sent again"""
+
+    def pause(self, seconds: float) -> None:
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    async def wait(self) -> None:
+        # Loop, because other calls may extend the pause while this one waits
+        while (delay := self.resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+
+def _retry_after(error: APIError | RateLimitError) -> float | None:
+    """Returns the number of seconds to wait from the Retry-After header, if any"""
+    headers: Mapping[str, str] = getattr(error, "headers", None) or {}
+    headers = {name.lower(): value for name, value in headers.items()}
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if not (value := headers.get("retry-after")):
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(
+            email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0
+        )
+    except (TypeError, ValueError):
+        return None
+
+
 class _OpenAIRetryHandler:
     """Retry Handler for OpenAI API call.
 
+    Backs off without blocking the event loop, for as long as the API asks in its
+    Retry-After header, or exponentially with jitter otherwise.
+
     Args:
         num_retries int: Number of retries. Defaults to 10.
         backoff_base float: Base for exponential backoff. Defaults to 2.
         warn_user bool: Whether to warn the user. Defaults to True.
+        rate_limit_state: The rate limit state to share with other handlers.
     """
 
     _retry_limit_msg = "Error: Reached rate limit, passing..."
@@ -326,7 +376,8 @@ class _OpenAIRetryHandler:
         "Please double check that you have setup a PAID OpenAI API Account. You can "
         "read more here: https://docs.agpt.co/setup/#getting-an-api-key"
     )
-    _backoff_msg = "Error: API Bad gateway. Waiting {backoff} seconds..."
+    _backoff_msg = "Error: API Bad gateway. Waiting {backoff:.2f} seconds..."
+    _rate_limit_backoff_msg = "Pausing requests for {backoff:.2f} seconds..."
 
     def __init__(
         self,
@@ -334,11 +385,13 @@ class _OpenAIRetryHandler:
         num_retries: int = 10,
         backoff_base: float = 2.0,
         warn_user: bool = True,
+        rate_limit_state: _RateLimitState | None = None,
     ):
         self._logger = logger
         self._num_retries = num_retries
         self._backoff_base = backoff_base
         self._warn_user = warn_user
+        self._rate_limit_state = rate_limit_state or _RateLimitState()
 
     def _log_rate_limit_error(self) -> None:
         self._logger.debug(self._retry_limit_msg)
@@ -346,28 +399,42 @@ class _OpenAIRetryHandler:
             self._logger.warning(self._api_key_error_msg)
             self._warn_user = False
 
-    def _backoff(self, attempt: int) -> None:
+    def _get_backoff(self, attempt: int, error: APIError | RateLimitError) -> float:
+        if (retry_after := _retry_after(error)) is not None:
+            return retry_after
         backoff = self._backoff_base ** (attempt + 2)
-        self._logger.debug(self._backoff_msg.format(backoff=backoff))
-        time.sleep(backoff)
+        # Jitter, so that calls that failed together don't all retry together
+        return random.uniform(backoff / 2, backoff)
+
+    async def _backoff(self, attempt: int, error: APIError | RateLimitError) -> None:
+        backoff = self._get_backoff(attempt, error)
+        if isinstance(error, RateLimitError):
+            self._logger.debug(self._rate_limit_backoff_msg.format(backoff=backoff))
+            self._rate_limit_state.pause(backoff)
+        else:
+            self._logger.debug(self._backoff_msg.format(backoff=backoff))
+            await asyncio.sleep(backoff)
 
     def __call__(self, func: Callable[_P, _T]) -> Callable[_P, _T]:
         @functools.wraps(func)
         async def _wrapped(*args: _P.args, **kwargs: _P.kwargs) -> _T:
             num_attempts = self._num_retries + 1  # +1 for the first attempt
             for attempt in range(1, num_attempts + 1):
+                await self._rate_limit_state.wait()
                 try:
                     return await func(*args, **kwargs)
 
-                except RateLimitError:
+                except RateLimitError as e:
                     if attempt == num_attempts:
                         raise
                     self._log_rate_limit_error()
+                    error = e
 
                 except APIError as e:
                     if (e.http_status != 502) or (attempt == num_attempts):
                         raise
+                    error = e
 
-                self._backoff(attempt)
+                await self._backoff(attempt, error)
 
         return _wrapped
@@ -0,0 +1,135 @@
+"""Incremental parsing of a JSON object that is streamed as text, e.g. by an LLM."""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Callable
+
+JSONPath = tuple[str | int, ...]
+
+
+@dataclass
+class _Container:
+    """An object or array that has been opened, but not closed yet"""
+
+    start: int
+    is_object: bool
+    key: str | int | None = None
+    """The key (or index) of the member that is being parsed"""
+    expecting_key: bool = True
+
+
+class JSONStreamParser:
+    """
+    Parses a JSON object from the chunks of text in which it is streamed, and calls
+    `on_value(path, value)` as soon as the value of a member (down to `max_depth`
+    levels deep) is complete, e.g. `(("thoughts", "text"), "...")`.
+
+    Text before the object, like a code fence, is skipped. Values that aren't valid
+    JSON are not reported: the complete response should still be parsed at the end.
+    """
+
+    def __init__(
+        self,
+        on_value: Callable[[JSONPath, Any], None] | None = None,
+        max_depth: int = 2,
+    ):
+        self.on_value = on_value
+        self.max_depth = max_depth
+        self.text = ""
+        self.members: dict[str, Any] = {}
+        """The members of the object that have been parsed so far"""
+        self.done = False
+        """Whether the object has been closed"""
+
+        self._pos = 0
+        self._stack: list[_Container] = []
+        self._string_start: int | None = None
+        self._escaped = False
+        self._primitive_start: int | None = None
+        self._object_start: int | None = None
+        self._last_member_end: int | None = None
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        while self._pos < len(self.text) and not self.done:
+            self._step(self.text[self._pos])
+            self._pos += 1
+
+    def completed_text(self) -> str:
+        """
+        Returns the JSON text of the object, with the members that have been parsed
+        so far: the whole object if it is done, or a closed copy of it otherwise
+        """
+        if self._object_start is None:
+            return ""
+        if self.done:
+            return self.text[self._object_start : self._pos]
+        if self._last_member_end is None:
+            return "{}"
+        return self.text[self._object_start : self._last_member_end] + "\n}"
+
+    def _step(self, char: str) -> None:
+        if self._string_start is not None:
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                start, self._string_start = self._string_start, None
+                self._end_value(start, self._pos + 1)
+            return
+
+        if self._primitive_start is not None:
+            if not (char in ",}]" or char.isspace()):
+                return
+            start, self._primitive_start = self._primitive_start, None
+            self._end_value(start, self._pos)
+
+        if not self._stack:
+            if char == "{":
+                self._object_start = self._pos
+                self._stack.append(_Container(self._pos, is_object=True))
+            return
+
+        container = self._stack[-1]
+        if char == '"':
+            self._string_start = self._pos
+        elif char in "{[":
+            self._stack.append(_Container(self._pos, is_object=char == "{"))
+            if char == "[":
+                self._stack[-1].key = 0
+        elif char in "}]":
+            self._stack.pop()
+            self._end_value(container.start, self._pos + 1)
+        elif char == ",":
+            if container.is_object:
+                container.expecting_key = True
+            elif isinstance(container.key, int):
+                container.key += 1
+        elif char == ":":
+            container.expecting_key = False
+        elif not char.isspace():
+            self._primitive_start = self._pos
+
+    def _end_value(self, start: int, end: int) -> None:
+        """Handles a key or value that spans `text[start:end]`"""
+        if not self._stack:
+            self.done = True
+            return
+
+        container = self._stack[-1]
+        try:
+            value = json.loads(self.text[start:end])
+        except ValueError:
+            return
+        if container.is_object and container.expecting_key:
+            container.key = value
+            return
+
+        path = tuple(c.key for c in self._stack)
+        if len(self._stack) == 1:
+            self.members[container.key] = value
+            self._last_member_end = end
+        if len(path) <= self.max_depth and self.on_value:
+            self.on_value(path, value)
@@ -3,7 +3,16 @@ from __future__ import annotations
 from copy import deepcopy
 from dataclasses import dataclass, field
 from math import ceil, floor
-from typing import TYPE_CHECKING, Literal, Optional, Type, TypedDict, TypeVar, overload
+from typing import (
+    TYPE_CHECKING,
+    Literal,
+    Optional,
+    Type,
+    TypedDict,
+    TypeVar,
+    cast,
+    overload,
+)
 
 if TYPE_CHECKING:
     from autogpt.llm.providers.openai import OpenAIFunctionCall
@@ -86,11 +95,20 @@ TChatSequence = TypeVar("TChatSequence", bound="ChatSequence")
 
 @dataclass
 class ChatSequence:
-    """Utility container for a chat sequence"""
+    """Utility container for a chat sequence
+
+    The token length of every message is counted once, when it is first needed,
+    and kept alongside the messages with a running total, so that `token_length`
+    stays cheap while the sequence is built up. Messages should therefore be changed
+    through the methods of the sequence, not by mutating `messages` in place.
+    """
 
     model: ChatModelInfo
     messages: list[Message] = field(default_factory=list[Message])
 
+    def __post_init__(self):
+        self._set_token_lengths([None] * len(self.messages))
+
     @overload
     def __getitem__(self, key: int) -> Message:
         ...
@@ -103,6 +121,7 @@ class ChatSequence:
         if isinstance(key, slice):
             copy = deepcopy(self)
             copy.messages = self.messages[key]
+            copy._set_token_lengths(self._token_lengths[key])
             return copy
         return self.messages[key]
 
@@ -121,14 +140,21 @@ class ChatSequence:
         self.append(Message(message_role, content, type))
 
     def append(self, message: Message):
+        self._token_lengths.append(None)
+        self._n_uncounted += 1
         return self.messages.append(message)
 
     def extend(self, messages: list[Message] | ChatSequence):
+        messages = list(messages)
+        self._token_lengths.extend([None] * len(messages))
+        self._n_uncounted += len(messages)
         return self.messages.extend(messages)
 
     def insert(self, index: int, *messages: Message):
         for message in reversed(messages):
+            self._token_lengths.insert(index, None)
             self.messages.insert(index, message)
+        self._n_uncounted += len(messages)
 
     @classmethod
     def for_model(
@@ -148,9 +174,41 @@ class ChatSequence:
 
     @property
     def token_length(self) -> int:
-        from autogpt.llm.utils import count_message_tokens
+        """The number of tokens that the sequence takes up in a request"""
+        from autogpt.llm.utils.token_counter import REPLY_PRIMING_TOKENS
 
-        return count_message_tokens(self.messages, self.model.name)
+        self._count_tokens()
+        return self._token_total + REPLY_PRIMING_TOKENS
+
+    @property
+    def token_lengths(self) -> list[tuple[Message, int]]:
+        """The messages of the sequence, with the number of tokens of each message"""
+        self._count_tokens()
+        return list(zip(self.messages, cast(list[int], self._token_lengths)))
+
+    def _set_token_lengths(self, token_lengths: list[int | None]) -> None:
+        self._token_lengths = token_lengths
+        self._token_total = sum(filter(None, token_lengths))
+        self._n_uncounted = token_lengths.count(None)
+
+    def _count_tokens(self) -> None:
+        """Counts the tokens of the messages that have been added since the last count"""
+        from autogpt.llm.utils.token_counter import count_tokens_per_message
+
+        if len(self._token_lengths) != len(self.messages):
+            # `messages` has been replaced or changed in place: count all over again
+            self._set_token_lengths([None] * len(self.messages))
+        if not self._n_uncounted:
+            return
+
+        uncounted = [i for i, n in enumerate(self._token_lengths) if n is None]
+        token_lengths = count_tokens_per_message(
+            [self.messages[i] for i in uncounted], self.model.name
+        )
+        for i, n_tokens in zip(uncounted, token_lengths):
+            self._token_lengths[i] = n_tokens
+        self._token_total += sum(token_lengths)
+        self._n_uncounted = 0
 
     def raw(self) -> list[MessageDict]:
         return [m.raw() for m in self.messages]
@@ -163,7 +221,10 @@ class ChatSequence:
             return f"{floor(half_sep_len)*'-'} {text.upper()} {ceil(half_sep_len)*'-'}"
 
         formatted_messages = "\n".join(
-            [f"{separator(m.role)}\n{m.content}" for m in self.messages]
+            [
+                f"{separator(f'{m.role} ({n_tokens} tokens)')}\n{m.content}"
+                for m, n_tokens in self.token_lengths
+            ]
         )
         return f"""
 ============== {__class__.__name__} ==============
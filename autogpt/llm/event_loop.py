@@ -0,0 +1,72 @@
+"""
+A shared event loop, running in a background thread, on which synchronous code can
+run the async LLM API calls. Coroutines from different threads then overlap on one
+loop, and share its pooled HTTP session.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Returns the shared event loop, and starts it on first use"""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="llm-event-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+    """
+    Runs a coroutine on the shared event loop, and blocks until it is done.
+    The coroutine is cancelled if it doesn't finish within `timeout` seconds, or if
+    the wait is interrupted (e.g. by a KeyboardInterrupt).
+
+    Raises:
+        RuntimeError: if called from a coroutine, which should await `coro` instead
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError("run_sync() can't block a running event loop")
+
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def iterate_sync(iterator: AsyncIterator[T]) -> Iterator[T]:
+    """
+    Iterates over an async iterator (e.g. a streamed response) on the shared event
+    loop. Closing the returned iterator closes the async iterator as well.
+    """
+
+    async def next_item() -> T:
+        return await iterator.__anext__()
+
+    try:
+        while True:
+            try:
+                yield run_sync(next_item())
+            except StopAsyncIteration:
+                return
+    finally:
+        if aclose := getattr(iterator, "aclose", None):
+            run_sync(aclose())
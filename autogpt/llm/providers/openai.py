@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import contextlib
 import functools
+import inspect
 import time
+import weakref
 from dataclasses import dataclass
-from typing import Callable, List, Optional
+from typing import Callable, Iterator, List, Optional
 from unittest.mock import patch
 
+import aiohttp
 import openai
 import openai.api_resources.abstract.engine_api_resource as engine_api_resource
 from colorama import Fore, Style
@@ -15,10 +21,13 @@ from openai.openai_object import OpenAIObject
 from autogpt.llm.base import (
     ChatModelInfo,
     EmbeddingModelInfo,
+    Message,
     MessageDict,
     TextModelInfo,
     TText,
 )
+from autogpt.llm.event_loop import iterate_sync, run_sync
+from autogpt.llm.rate_limiter import get_model_rate_limiter
 from autogpt.logs import logger
 from autogpt.models.command_registry import CommandRegistry
 
@@ -138,6 +147,18 @@ def meter_api(func: Callable):
             update_usage_with_response(openai_obj)
         return openai_obj
 
+    if inspect.iscoroutinefunction(func):
+        # Patching the converter would leak between concurrent coroutines, so
+        # async calls are metered from the response they return
+        @functools.wraps(func)
+        async def metered_coroutine(*args, **kwargs):
+            response = await func(*args, **kwargs)
+            if isinstance(response, OpenAIObject) and "usage" in response:
+                update_usage_with_response(response)
+            return response
+
+        return metered_coroutine
+
     def metered_func(*args, **kwargs):
         with patch.object(
             engine_api_resource.util,
@@ -154,7 +175,8 @@ def retry_api(
     backoff_base: float = 2.0,
     warn_user: bool = True,
 ):
-    """Retry an OpenAI API call.
+    """Retry an OpenAI API call. Coroutine functions are retried without blocking
+    the event loop.
 
     Args:
         num_retries int: Number of retries. Defaults to 10.
@@ -172,54 +194,273 @@ def retry_api(
     )
     backoff_msg = f"{Fore.RED}Waiting {{backoff}} seconds...{Fore.RESET}"
 
+    max_attempts = max_retries + 1  # +1 for the first attempt
+
+    def _handle_error(e: Exception, attempt: int, user_warned: bool) -> bool:
+        """
+        Re-raises the error if the call should not be retried; otherwise warns about
+        it and returns whether the user has been warned
+        """
+        if isinstance(e, (RateLimitError, ServiceUnavailableError)):
+            if attempt >= max_attempts or (
+                # User's API quota exceeded
+                isinstance(e, RateLimitError)
+                and (err := getattr(e, "error", {}))
+                and err.get("code") == "insufficient_quota"
+            ):
+                raise e
+
+            error_msg = error_messages[type(e)]
+            logger.warn(error_msg)
+            if not user_warned:
+                logger.double_check(api_key_error_msg)
+                logger.debug(f"Status: {e.http_status}")
+                logger.debug(f"Response body: {e.json_body}")
+                logger.debug(f"Response headers: {e.headers}")
+                user_warned = True
+
+        elif (e.http_status not in [429, 502]) or (attempt == max_attempts):
+            raise e
+
+        return user_warned
+
+    def _backoff(attempt: int) -> float:
+        backoff = backoff_base ** (attempt + 2)
+        logger.warn(backoff_msg.format(backoff=backoff))
+        return backoff
+
+    retried_errors = (RateLimitError, ServiceUnavailableError, APIError, Timeout)
+
     def _wrapper(func: Callable):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def _wrapped_coroutine(*args, **kwargs):
+                user_warned = not warn_user
+                for attempt in range(1, max_attempts + 1):
+                    try:
+                        return await func(*args, **kwargs)
+                    except retried_errors as e:
+                        user_warned = _handle_error(e, attempt, user_warned)
+                    # Unlike time.sleep, this can be cancelled
+                    await asyncio.sleep(_backoff(attempt))
+
+            return _wrapped_coroutine
+
         @functools.wraps(func)
         def _wrapped(*args, **kwargs):
             user_warned = not warn_user
-            max_attempts = max_retries + 1  # +1 for the first attempt
             for attempt in range(1, max_attempts + 1):
                 try:
                     return func(*args, **kwargs)
-
-                except (RateLimitError, ServiceUnavailableError) as e:
-                    if attempt >= max_attempts or (
-                        # User's API quota exceeded
-                        isinstance(e, RateLimitError)
-                        and (err := getattr(e, "error", {}))
-                        and err.get("code") == "insufficient_quota"
-                    ):
-                        raise
-
-                    error_msg = error_messages[type(e)]
-                    logger.warn(error_msg)
-                    if not user_warned:
-                        logger.double_check(api_key_error_msg)
-                        logger.debug(f"Status: {e.http_status}")
-                        logger.debug(f"Response body: {e.json_body}")
-                        logger.debug(f"Response headers: {e.headers}")
-                        user_warned = True
-
-                except (APIError, Timeout) as e:
-                    if (e.http_status not in [429, 502]) or (attempt == max_attempts):
-                        raise
-
-                backoff = backoff_base ** (attempt + 2)
-                logger.warn(backoff_msg.format(backoff=backoff))
-                time.sleep(backoff)
+                except retried_errors as e:
+                    user_warned = _handle_error(e, attempt, user_warned)
+                time.sleep(_backoff(attempt))
 
         return _wrapped
 
     return _wrapper
 
 
+def limit_rate(count_tokens: Callable[..., int]):
+    """
+    Waits until the rate limits of the requested model (see
+    `autogpt.llm.rate_limiter.set_model_rate_limits`) admit an OpenAI API call.
+
+    Args:
+        count_tokens: Returns the number of tokens that a call, given its arguments,
+            counts against the tokens per minute: its input and its `max_tokens`
+    """
+
+    def _wrapper(func: Callable):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def _limited_coroutine(*args, **kwargs):
+                if limiter := get_model_rate_limiter(kwargs.get("model")):
+                    await limiter.acquire_async(count_tokens(*args, **kwargs))
+                return await func(*args, **kwargs)
+
+            return _limited_coroutine
+
+        @functools.wraps(func)
+        def _limited(*args, **kwargs):
+            if limiter := get_model_rate_limiter(kwargs.get("model")):
+                limiter.acquire(count_tokens(*args, **kwargs))
+            return func(*args, **kwargs)
+
+        return _limited
+
+    return _wrapper
+
+
+def _count_text_tokens(text: str | TText, model: str) -> int:
+    from autogpt.llm.utils import count_string_tokens
+
+    if not isinstance(text, str):
+        return len(text)
+    try:
+        return count_string_tokens(text, model)
+    except KeyError:
+        # Unknown tokenizer; OpenAI's tokenizers average ~4 characters per token
+        return len(text) // 4
+
+
+def _count_chat_tokens(messages: List[MessageDict], *_, **kwargs) -> int:
+    from autogpt.llm.utils import count_message_tokens
+
+    model = kwargs["model"]
+    try:
+        prompt_tokens = count_message_tokens(
+            [Message(m["role"], m.get("content") or "") for m in messages], model
+        )
+    except NotImplementedError:
+        prompt_tokens = sum(
+            _count_text_tokens(m.get("content") or "", model) for m in messages
+        )
+    return prompt_tokens + (kwargs.get("max_tokens") or 0)
+
+
+def _count_text_completion_tokens(prompt: str, *_, **kwargs) -> int:
+    return _count_text_tokens(prompt, kwargs["model"]) + (kwargs.get("max_tokens") or 0)
+
+
+def _count_embedding_tokens(
+    input: str | TText | List[str] | List[TText], *_, **kwargs
+) -> int:
+    if isinstance(input, str) or (input and isinstance(input[0], int)):
+        input = [input]
+    return sum(_count_text_tokens(i, kwargs["model"]) for i in input)
+
+
+def create_chat_completion(
+    messages: List[MessageDict],
+    *_,
+    **kwargs,
+) -> OpenAIObject | Iterator[OpenAIObject]:
+    """Create a chat completion using the OpenAI API
+
+    Runs `acreate_chat_completion` on the shared event loop (see
+    `autogpt.llm.event_loop`), so that the calls of all threads overlap on one pooled
+    HTTP session.
+
+    Args:
+        messages: A list of messages to feed to the chatbot.
+        kwargs: Other arguments to pass to the OpenAI API chat completion call.
+    Returns:
+        OpenAIObject: The ChatCompletion response from OpenAI, or an iterator over
+            its chunks if `stream=True`
+
+    """
+    completion = run_sync(acreate_chat_completion(messages, **kwargs))
+    if kwargs.get("stream"):
+        return iterate_sync(completion)
+    return completion
+
+
+def create_text_completion(
+    prompt: str,
+    *_,
+    **kwargs,
+) -> OpenAIObject:
+    """Create a text completion using the OpenAI API
+
+    Runs `acreate_text_completion` on the shared event loop.
+
+    Args:
+        prompt: A text prompt to feed to the LLM
+        kwargs: Other arguments to pass to the OpenAI API text completion call.
+    Returns:
+        OpenAIObject: The Completion response from OpenAI
+
+    """
+    return run_sync(acreate_text_completion(prompt, **kwargs))
+
+
+def create_embedding(
+    input: str | TText | List[str] | List[TText],
+    *_,
+    **kwargs,
+) -> OpenAIObject:
+    """Create an embedding using the OpenAI API
+
+    Runs `acreate_embedding` on the shared event loop.
+
+    Args:
+        input: The text to embed.
+        kwargs: Other arguments to pass to the OpenAI API embedding call.
+    Returns:
+        OpenAIObject: The Embedding response from OpenAI
+
+    """
+    return run_sync(acreate_embedding(input, **kwargs))
+
+
+OPENAI_CONNECTION_LIMIT = 32
+"""Maximum number of concurrent connections of the pooled async HTTP session"""
+OPENAI_KEEPALIVE_TIMEOUT = 60
+"""Number of seconds that idle connections of the pooled session are kept open"""
+
+_aiosessions: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, aiohttp.ClientSession
+] = weakref.WeakKeyDictionary()
+
+
+def get_aiosession() -> aiohttp.ClientSession:
+    """
+    Returns the pooled HTTP session of the running event loop, so that consecutive
+    async API calls reuse their keep-alive connections. Without it, the OpenAI SDK
+    opens a new session (and connection) for every async call.
+    """
+    loop = asyncio.get_running_loop()
+    session = _aiosessions.get(loop)
+    if session is None or session.closed:
+        session = _aiosessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=OPENAI_CONNECTION_LIMIT,
+                keepalive_timeout=OPENAI_KEEPALIVE_TIMEOUT,
+            )
+        )
+    return session
+
+
+async def close_aiosession() -> None:
+    """Closes the pooled HTTP session of the running event loop, if it has one"""
+    if session := _aiosessions.pop(asyncio.get_running_loop(), None):
+        await session.close()
+
+
+@atexit.register
+def _close_aiosessions() -> None:
+    for loop, session in list(_aiosessions.items()):
+        if loop.is_running() and not session.closed:
+            with contextlib.suppress(Exception):
+                asyncio.run_coroutine_threadsafe(session.close(), loop).result(5)
+
+
+@contextlib.contextmanager
+def _pooled_aiosession() -> Iterator[None]:
+    """Makes the OpenAI SDK use the pooled session, unless a session has been set"""
+    if openai.aiosession.get() is not None:
+        yield
+        return
+    # The context variable is local to the running task
+    token = openai.aiosession.set(get_aiosession())
+    try:
+        yield
+    finally:
+        openai.aiosession.reset(token)
+
+
 @meter_api
 @retry_api()
-def create_chat_completion(
+@limit_rate(_count_chat_tokens)
+async def acreate_chat_completion(
     messages: List[MessageDict],
     *_,
     **kwargs,
 ) -> OpenAIObject:
-    """Create a chat completion using the OpenAI API
+    """Create a chat completion using the OpenAI API, without blocking the event loop
 
     Args:
         messages: A list of messages to feed to the chatbot.
@@ -228,10 +469,11 @@ def create_chat_completion(
         OpenAIObject: The ChatCompletion response from OpenAI
 
     """
-    completion: OpenAIObject = openai.ChatCompletion.create(
-        messages=messages,
-        **kwargs,
-    )
+    with _pooled_aiosession():
+        completion: OpenAIObject = await openai.ChatCompletion.acreate(
+            messages=messages,
+            **kwargs,
+        )
     if not hasattr(completion, "error"):
         logger.debug(f"Response: {completion}")
     return completion
@@ -239,12 +481,13 @@ def create_chat_completion(
 
 @meter_api
 @retry_api()
-def create_text_completion(
+@limit_rate(_count_text_completion_tokens)
+async def acreate_text_completion(
     prompt: str,
     *_,
     **kwargs,
 ) -> OpenAIObject:
-    """Create a text completion using the OpenAI API
+    """Create a text completion using the OpenAI API, without blocking the event loop
 
     Args:
         prompt: A text prompt to feed to the LLM
@@ -253,20 +496,22 @@ def create_text_completion(
         OpenAIObject: The Completion response from OpenAI
 
     """
-    return openai.Completion.create(
-        prompt=prompt,
-        **kwargs,
-    )
+    with _pooled_aiosession():
+        return await openai.Completion.acreate(
+            prompt=prompt,
+            **kwargs,
+        )
 
 
 @meter_api
 @retry_api()
-def create_embedding(
+@limit_rate(_count_embedding_tokens)
+async def acreate_embedding(
     input: str | TText | List[str] | List[TText],
     *_,
     **kwargs,
 ) -> OpenAIObject:
-    """Create an embedding using the OpenAI API
+    """Create an embedding using the OpenAI API, without blocking the event loop
 
     Args:
         input: The text to embed.
@@ -275,10 +520,11 @@ def create_embedding(
         OpenAIObject: The Embedding response from OpenAI
 
     """
-    return openai.Embedding.create(
-        input=input,
-        **kwargs,
-    )
+    with _pooled_aiosession():
+        return await openai.Embedding.acreate(
+            input=input,
+            **kwargs,
+        )
 
 
 @dataclass
@@ -0,0 +1,127 @@
+"""Client-side limits on the rate of API requests"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Mapping
+
+
+class RateLimiter:
+    """Spaces out calls to `wait()` so that at most `requests_per_minute` pass"""
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60 / requests_per_minute if requests_per_minute > 0 else 0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        time.sleep(slot - now)
+
+
+class TokenBucket:
+    """
+    Admits `rate_per_minute` units per minute, in bursts of at most `capacity` units
+    (by default a minute's worth). Callers reserve their units up front, and the
+    bucket may go into debt: concurrent callers are then admitted one after the
+    other, at the rate of the bucket, in the order in which they made reservations.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate = rate_per_minute / 60
+        self.capacity = rate_per_minute if capacity is None else capacity
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Takes `amount` units from the bucket, and returns the number of seconds that
+        the caller has to wait before using them
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(
+                self.capacity, self._level + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._level -= amount
+            return max(-self._level / self.rate, 0.0)
+
+    def refund(self, amount: float) -> None:
+        """Returns units that were reserved but not used"""
+        with self._lock:
+            self._level = min(self.capacity, self._level + amount)
+
+
+class ModelRateLimiter:
+    """
+    Limits the requests and tokens per minute that are sent to a model, so that
+    requests are spread out below the API's rate limits instead of running into
+    them. Shared by all threads and event loops of the process.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserves one request of `tokens` tokens, and returns the number of seconds
+        to wait before sending it
+        """
+        delays = [0.0]
+        if self.requests:
+            delays.append(self.requests.reserve(1))
+        if self.tokens:
+            delays.append(self.tokens.reserve(tokens))
+        return max(delays)
+
+    def refund(self, tokens: int) -> None:
+        if self.requests:
+            self.requests.refund(1)
+        if self.tokens:
+            self.tokens.refund(tokens)
+
+    def acquire(self, tokens: int) -> None:
+        """Blocks until a request of `tokens` tokens may be sent"""
+        if delay := self.reserve(tokens):
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: int) -> None:
+        """Waits, without blocking the event loop, until the request may be sent"""
+        delay = self.reserve(tokens)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.refund(tokens)
+            raise
+
+
+_model_rate_limiters: dict[str, ModelRateLimiter] = {}
+
+
+def set_model_rate_limits(limits: Mapping[str, tuple[int, int]]) -> None:
+    """
+    Sets the (requests per minute, tokens per minute) limits of the given models.
+    The limits of other models are removed; 0 means unlimited.
+    """
+    global _model_rate_limiters
+    _model_rate_limiters = {
+        model: ModelRateLimiter(requests_per_minute, tokens_per_minute)
+        for model, (requests_per_minute, tokens_per_minute) in limits.items()
+        if requests_per_minute > 0 or tokens_per_minute > 0
+    }
+
+
+def get_model_rate_limiter(model: str | None) -> ModelRateLimiter | None:
+    """Returns the rate limiter of a model, or None if it isn't limited"""
+    return _model_rate_limiters.get(model) if model else None
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
-from typing import List, Literal, Optional
+import functools
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, List, Literal, Optional
 
+import orjson
 from colorama import Fore
 
+from autogpt.cache import PersistentCache
 from autogpt.config import Config
 
 from ..api_manager import ApiManager
@@ -78,6 +84,16 @@ def create_text_completion(
     if temperature is None:
         temperature = config.temperature
 
+    cache_key = _llm_cache_key(
+        "text",
+        model=model,
+        prompt=prompt,
+        temperature=temperature,
+        max_tokens=max_output_tokens,
+    )
+    if (text := _get_recorded_response(config, cache_key)) is not None:
+        return text
+
     kwargs = {"model": model}
     kwargs.update(config.get_openai_credentials(model))
 
@@ -89,7 +105,9 @@ def create_text_completion(
     )
     logger.debug(f"Response: {response}")
 
-    return response.choices[0].text
+    text = response.choices[0].text
+    _record_response(config, cache_key, text)
+    return text
 
 
 # Overly simple abstraction until we create something better
@@ -100,6 +118,7 @@ def create_chat_completion(
     model: Optional[str] = None,
     temperature: Optional[float] = None,
     max_tokens: Optional[int] = None,
+    on_content_delta: Optional[Callable[[str], bool | None]] = None,
 ) -> ChatModelResponse:
     """Create a chat completion using the OpenAI API
 
@@ -108,6 +127,9 @@ def create_chat_completion(
         model (str, optional): The model to use. Defaults to None.
         temperature (float, optional): The temperature to use. Defaults to 0.9.
         max_tokens (int, optional): The max tokens to use. Defaults to None.
+        on_content_delta (Callable, optional): If given, the completion is streamed,
+            and this is called with each piece of its content as it arrives. When it
+            returns True, the rest of the completion is not waited for.
 
     Returns:
         str: The response from the chat completion
@@ -154,17 +176,48 @@ def create_chat_completion(
             function.schema for function in functions
         ]
 
-    response = iopenai.create_chat_completion(
+    cache_key = _llm_cache_key(
+        "chat",
+        model=model,
         messages=prompt.raw(),
-        **chat_completion_kwargs,
+        functions=chat_completion_kwargs.get("functions"),
+        temperature=temperature,
+        max_tokens=max_tokens,
     )
-    logger.debug(f"Response: {response}")
+    if (first_message := _get_recorded_response(config, cache_key)) is not None:
+        if on_content_delta and first_message["content"]:
+            on_content_delta(first_message["content"])
+    elif on_content_delta:
+        prompt_tlength = prompt.token_length
+        if functions:
+            prompt_tlength += count_openai_functions_tokens(functions, model)
+        first_message, complete = _stream_chat_completion(
+            prompt.raw(), prompt_tlength, on_content_delta, **chat_completion_kwargs
+        )
+        # A stream that was stopped early is not a response to replay
+        if complete:
+            _record_response(config, cache_key, first_message)
+    else:
+        response = iopenai.create_chat_completion(
+            messages=prompt.raw(),
+            **chat_completion_kwargs,
+        )
+        logger.debug(f"Response: {response}")
 
-    if hasattr(response, "error"):
-        logger.error(response.error)
-        raise RuntimeError(response.error)
+        if hasattr(response, "error"):
+            logger.error(response.error)
+            raise RuntimeError(response.error)
+
+        first_message: ResponseMessageDict = response.choices[0].message
+        _record_response(
+            config,
+            cache_key,
+            {
+                "content": first_message.get("content"),
+                "function_call": first_message.get("function_call"),
+            },
+        )
 
-    first_message: ResponseMessageDict = response.choices[0].message
     content: str | None = first_message.get("content")
     function_call: FunctionCallDict | None = first_message.get("function_call")
 
@@ -183,3 +236,113 @@ def create_chat_completion(
         if function_call
         else None,
     )
+
+
+def _stream_chat_completion(
+    messages: list,
+    prompt_tlength: int,
+    on_content_delta: Callable[[str], bool | None],
+    **kwargs,
+) -> tuple[ResponseMessageDict, bool]:
+    """
+    Streams a chat completion, and returns the message that it adds up to, and
+    whether it was streamed to the end
+    """
+    complete = True
+    content = ""
+    function_call: FunctionCallDict = {"name": "", "arguments": ""}
+    chunks = iopenai.create_chat_completion(messages=messages, stream=True, **kwargs)
+    try:
+        for chunk in chunks:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].get("delta", {})
+            if function_call_delta := delta.get("function_call"):
+                for key in function_call:
+                    function_call[key] += function_call_delta.get(key) or ""
+            if content_delta := delta.get("content"):
+                content += content_delta
+                if on_content_delta(content_delta):
+                    logger.debug("Stopped streaming the chat completion early")
+                    complete = False
+                    break
+    finally:
+        # Stops the stream if it wasn't read to the end. The SDK doesn't expose its
+        # HTTP response, so the connection is only closed once the response is
+        # garbage collected.
+        chunks.close()
+    logger.debug(f"Streamed response: {content}")
+
+    # Streamed responses don't report their usage, so it is counted here
+    model = kwargs["model"]
+    completion_tlength = count_string_tokens(content, model)
+    if function_call["name"]:
+        completion_tlength += count_string_tokens(
+            function_call["name"] + function_call["arguments"], model
+        )
+    ApiManager().update_cost(prompt_tlength, completion_tlength, model)
+
+    message: ResponseMessageDict = {"role": "assistant", "content": content}
+    if function_call["name"]:
+        message["function_call"] = function_call
+    return message, complete
+
+
+def get_llm_cache(config: Config) -> PersistentCache | None:
+    """
+    Returns the cache of LLM responses, or None if it is disabled or unavailable.
+    With `LLM_CACHE_MODE=record`, responses are recorded in it and requests that
+    were made before are answered from it; with `replay`, requests are only
+    answered from it.
+    """
+    if (
+        config.llm_cache_mode == "passthrough"
+        or config.llm_cache_size <= 0
+        or config.workdir is None
+    ):
+        return None
+    return _open_llm_cache(
+        Path(config.workdir) / "data" / "llm_cache.sqlite3", config.llm_cache_size
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _open_llm_cache(path: Path, max_entries: int) -> PersistentCache | None:
+    try:
+        return PersistentCache(path, max_entries)
+    except (sqlite3.Error, OSError) as e:
+        logger.warn(f"Could not open LLM response cache {path}, not caching: {e}")
+        return None
+
+
+def _llm_cache_key(kind: str, **request: Any) -> str:
+    return hashlib.sha256(
+        orjson.dumps([kind, request], option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+def _get_recorded_response(config: Config, key: str) -> Any | None:
+    """
+    Returns the recorded response to a request, if any
+
+    Raises:
+        RuntimeError: if there is none, in replay mode
+    """
+    if config.llm_cache_mode == "passthrough":
+        return None
+    cache = get_llm_cache(config)
+    if cache is None or (cached := cache.get(key)) is None:
+        if config.llm_cache_mode == "replay":
+            raise RuntimeError(
+                "No recorded response to this LLM request (LLM_CACHE_MODE=replay)"
+            )
+        return None
+    logger.debug(f"LLM cache hit; {cache.hits} hits, {cache.misses} misses in total")
+    return orjson.loads(cached)
+
+
+def _record_response(config: Config, key: str, response: Any) -> None:
+    if config.llm_cache_mode != "record":
+        return
+    if (cache := get_llm_cache(config)) is not None:
+        cache.set(key, orjson.dumps(response))
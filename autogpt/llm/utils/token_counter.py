@@ -1,6 +1,10 @@
 """Functions for counting the number of tokens in a message or string."""
 from __future__ import annotations
 
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import List, overload
 
 import tiktoken
@@ -8,6 +12,15 @@ import tiktoken
 from autogpt.llm.base import Message
 from autogpt.logs import logger
 
+REPLY_PRIMING_TOKENS = 3
+"""Tokens added to every request: each reply is primed with <|start|>assistant<|message|>"""
+
+TOKEN_COUNT_CACHE_SIZE = 4096
+"""Maximum number of token counts that are kept by `count_tokens`"""
+
+_token_counts: OrderedDict[tuple[str, bytes], int] = OrderedDict()
+_token_counts_lock = threading.Lock()
+
 
 @overload
 def count_message_tokens(messages: Message, model: str = "gpt-3.5-turbo") -> int:
@@ -37,6 +50,23 @@ def count_message_tokens(
     if isinstance(messages, Message):
         messages = [messages]
 
+    return sum(count_tokens_per_message(messages, model)) + REPLY_PRIMING_TOKENS
+
+
+def count_tokens_per_message(
+    messages: List[Message], model: str = "gpt-3.5-turbo"
+) -> list[int]:
+    """
+    Returns the number of tokens used by each of a list of messages, without the
+    `REPLY_PRIMING_TOKENS` that are added once per request.
+
+    Args:
+        messages (list): A list of messages.
+        model (str): The name of the model to use for tokenization.
+
+    Returns:
+        list[int]: The number of tokens used by each message.
+    """
     if model.startswith("gpt-3.5-turbo"):
         tokens_per_message = (
             4  # every message follows <|start|>{role/name}\n{content}<|end|>\n
@@ -54,20 +84,20 @@ def count_message_tokens(
             " information on how messages are converted to tokens."
         )
     try:
-        encoding = tiktoken.encoding_for_model(encoding_model)
+        encoding = get_encoding(encoding_model)
     except KeyError:
         logger.warn("Warning: model not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
+        encoding = _get_encoding_by_name("cl100k_base")
 
-    num_tokens = 0
+    token_counts = []
     for message in messages:
-        num_tokens += tokens_per_message
+        num_tokens = tokens_per_message
         for key, value in message.raw().items():
-            num_tokens += len(encoding.encode(value))
+            num_tokens += count_tokens(value, encoding)
             if key == "name":
                 num_tokens += tokens_per_name
-    num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
-    return num_tokens
+        token_counts.append(num_tokens)
+    return token_counts
 
 
 def count_string_tokens(string: str, model_name: str) -> int:
@@ -81,5 +111,41 @@ def count_string_tokens(string: str, model_name: str) -> int:
     Returns:
         int: The number of tokens in the text string.
     """
-    encoding = tiktoken.encoding_for_model(model_name)
-    return len(encoding.encode(string))
+    return count_tokens(string, get_encoding(model_name))
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model_name: str) -> tiktoken.Encoding:
+    """
+    Returns the tokenizer of a model. Tokenizers are loaded once per process.
+
+    Raises:
+        KeyError: if the model is unknown
+    """
+    return tiktoken.encoding_for_model(model_name)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding_by_name(encoding_name: str) -> tiktoken.Encoding:
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text: str, encoding: tiktoken.Encoding) -> int:
+    """
+    Returns the number of tokens in a text. The counts of the last
+    `TOKEN_COUNT_CACHE_SIZE` texts are kept, keyed by the encoding and a hash of the
+    text, so that texts that are counted over and over (e.g. the messages of a
+    conversation) are only encoded once.
+    """
+    key = (encoding.name, hashlib.blake2b(text.encode(), digest_size=16).digest())
+    with _token_counts_lock:
+        if (n_tokens := _token_counts.get(key)) is not None:
+            _token_counts.move_to_end(key)
+            return n_tokens
+
+    n_tokens = len(encoding.encode(text))
+    with _token_counts_lock:
+        _token_counts[key] = n_tokens
+        if len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return n_tokens
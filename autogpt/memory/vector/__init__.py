@@ -1,14 +1,19 @@
 from autogpt.config import Config
 from autogpt.logs import logger
 
-from .memory_item import MemoryItem, MemoryItemRelevance
+from .ingestion import IngestionPipeline, MemoryDocument
+from .memory_filter import MemoryFilter
+from .memory_item import MemoryItem, MemoryItemRelevance, hash_content
 from .providers.base import VectorMemoryProvider as VectorMemory
+from .providers.ivf_file import IVFFileMemory
 from .providers.json_file import JSONFileMemory
 from .providers.no_memory import NoMemory
+from .providers.remote import RemoteMemory
+from .providers.segment_file import SegmentFileMemory
 
 # List of supported memory backends
 # Add a backend to this list if the import attempt is successful
-supported_memory = ["json_file", "no_memory"]
+supported_memory = ["json_file", "segment_file", "ivf_file", "remote", "no_memory"]
 
 # try:
 #     from .providers.redis import RedisMemory
@@ -61,6 +66,15 @@ def get_memory(config: Config) -> VectorMemory:
         case "json_file":
             memory = JSONFileMemory(config)
 
+        case "segment_file":
+            memory = SegmentFileMemory(config)
+
+        case "ivf_file":
+            memory = IVFFileMemory(config)
+
+        case "remote":
+            memory = RemoteMemory(config)
+
         case "pinecone":
             raise NotImplementedError(
                 "The Pinecone memory backend has been rendered incompatible by work on "
@@ -141,10 +155,17 @@ def get_supported_memory_backends():
 
 __all__ = [
     "get_memory",
+    "hash_content",
+    "IngestionPipeline",
+    "MemoryDocument",
+    "MemoryFilter",
     "MemoryItem",
     "MemoryItemRelevance",
+    "IVFFileMemory",
     "JSONFileMemory",
     "NoMemory",
+    "RemoteMemory",
+    "SegmentFileMemory",
     "VectorMemory",
     # "RedisMemory",
     # "PineconeMemory",
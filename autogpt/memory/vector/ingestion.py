@@ -0,0 +1,323 @@
+"""Concurrent, batched creation of MemoryItems from many documents"""
+from __future__ import annotations
+
+import dataclasses
+import itertools
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+import ftfy
+
+from autogpt.config import Config
+from autogpt.llm.rate_limiter import RateLimiter
+from autogpt.llm.utils import count_string_tokens
+from autogpt.logs import logger
+from autogpt.processing.text import (
+    chunk_content,
+    extract_relevant_text,
+    split_text,
+    summarize_text,
+)
+
+from .memory_item import MemoryDocType, MemoryItem, hash_content
+from .utils import Embedding, get_embedding
+
+if TYPE_CHECKING:
+    from .providers.base import VectorMemoryProvider
+
+
+@dataclasses.dataclass
+class MemoryDocument:
+    """A document to be turned into a MemoryItem"""
+
+    text: str
+    source_type: MemoryDocType
+    metadata: dict = dataclasses.field(default_factory=dict)
+    how_to_summarize: str | None = None
+    question_for_summary: str | None = None
+    content_hash: str = dataclasses.field(init=False)
+
+    def __post_init__(self):
+        # Fix encoding, e.g. removing unicode surrogates (see issue #778)
+        self.text = ftfy.fix_text(self.text)
+        self.content_hash = hash_content(
+            self.text, self.how_to_summarize, self.question_for_summary
+        )
+
+
+class IngestionPipeline:
+    """
+    Turns documents into MemoryItems with as few, and as many concurrent, API calls
+    as possible:
+
+    * The chunks of all documents are summarized concurrently.
+    * Chunks (and summaries) of many documents are packed into embedding requests
+      of up to `MAX_BATCH_INPUTS` inputs and `MAX_BATCH_TOKENS` tokens, which are
+      sent while the summaries are being made.
+    * At most `concurrency` requests are in flight at a time, and no more than
+      `requests_per_minute` requests are started per minute (if > 0).
+
+    Documents are processed in windows of `window_size` documents, and the MemoryItems
+    of a window are yielded as soon as it is finished.
+    """
+
+    MAX_BATCH_INPUTS = 2048
+    """Maximum number of inputs per embedding request allowed by the OpenAI API"""
+    MAX_BATCH_TOKENS = 100_000
+
+    def __init__(
+        self,
+        config: Config,
+        concurrency: int | None = None,
+        requests_per_minute: int | None = None,
+    ):
+        self.config = config
+        self.concurrency = max(1, concurrency or config.memory_ingestion_concurrency)
+        self.window_size = 4 * self.concurrency
+        self.rate_limiter = RateLimiter(
+            requests_per_minute
+            if requests_per_minute is not None
+            else config.memory_ingestion_requests_per_minute
+        )
+
+    def ingest(
+        self,
+        documents: Iterable[MemoryDocument],
+        memory: VectorMemoryProvider,
+        raise_errors: bool = False,
+    ) -> int:
+        """
+        Upserts MemoryItems for the given documents into the memory as they are
+        finished. Documents of which the memory already holds the same content for the
+        same location are skipped without processing them again.
+
+        Args:
+            raise_errors: if True, stop at the first document that can't be processed.
+                Otherwise, such documents are logged and skipped.
+
+        Returns:
+            int: the number of documents that were added to or replaced in the memory
+        """
+
+        def changed_documents() -> Iterator[MemoryDocument]:
+            for document in documents:
+                location = document.metadata.get("location")
+                if location is not None and memory.find(
+                    document.source_type, location, document.content_hash
+                ):
+                    logger.debug(
+                        f"Skipping unchanged {document.source_type} {location}"
+                    )
+                else:
+                    yield document
+
+        n_added = 0
+        for item in self.process(changed_documents(), raise_errors):
+            memory.upsert(item)
+            n_added += 1
+            logger.debug(
+                f"Ingested {len(item.chunks)} chunks from "
+                f"{item.metadata.get('location', item.metadata['source_type'])}"
+            )
+        return n_added
+
+    def process(
+        self, documents: Iterable[MemoryDocument], raise_errors: bool = False
+    ) -> Iterator[MemoryItem]:
+        """
+        Yields MemoryItems for the given documents, in the order of the documents.
+
+        Args:
+            raise_errors: if True, stop at the first document that can't be processed.
+                Otherwise, such documents are logged and skipped.
+        """
+        documents = iter(documents)
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            while window := list(itertools.islice(documents, self.window_size)):
+                for document, item in zip(
+                    window, self._process_window(window, executor)
+                ):
+                    if isinstance(item, MemoryItem):
+                        yield item
+                    elif raise_errors:
+                        raise item
+                    else:
+                        logger.warn(
+                            f"Could not create memory from {document.source_type} "
+                            f"{document.metadata.get('location', '')}: {item}"
+                        )
+
+    def _process_window(
+        self, documents: list[MemoryDocument], executor: ThreadPoolExecutor
+    ) -> list[MemoryItem | Exception]:
+        results: list[MemoryItem | Exception | None] = [None] * len(documents)
+        jobs: dict[int, _Job] = {}
+        for i, document in enumerate(documents):
+            try:
+                jobs[i] = _Job(
+                    document, self._split(document), self._relevant_text(document)
+                )
+            except Exception as e:
+                results[i] = e
+
+        for job in jobs.values():
+            if job.summary_text is not None:
+                job.summary = executor.submit(
+                    self._summarize, job.summary_text, job.document
+                )
+                continue
+            job.chunk_summaries = [
+                executor.submit(self._summarize, chunk, job.document)
+                for chunk, _ in job.chunks
+            ]
+        e_chunks = iter(
+            self._embed_batched(
+                [chunk for job in jobs.values() for chunk in job.chunks], executor
+            )
+        )
+        for job in jobs.values():
+            job.e_chunks = list(itertools.islice(e_chunks, len(job.chunks)))
+            if job.summary is None:
+                job.summary = (
+                    job.chunk_summaries[0]
+                    if len(job.chunk_summaries) == 1
+                    # All chunk summaries are submitted before this: it can't deadlock
+                    else executor.submit(self._summarize_chunk_summaries, job)
+                )
+
+        # Embed the summaries of all documents in the window together
+        summarized = {i: job for i, job in jobs.items() if not job.summary.exception()}
+        e_summaries = self._embed_batched(
+            [
+                (summary, count_string_tokens(summary, self.config.embedding_model))
+                for summary in (job.summary.result() for job in summarized.values())
+            ],
+            executor,
+        )
+        for job, e_summary in zip(summarized.values(), e_summaries):
+            job.e_summary = e_summary
+
+        for i, job in jobs.items():
+            try:
+                results[i] = job.result()
+            except Exception as e:
+                results[i] = e
+        return results
+
+    def _split(self, document: MemoryDocument) -> list[tuple[str, int]]:
+        logger.debug(f"Memorizing text:\n{'-'*32}\n{document.text}\n{'-'*32}\n")
+
+        model = self.config.embedding_model
+        chunks = list(
+            split_text(document.text, model, self.config)
+            if document.source_type != "code_file"
+            else chunk_content(document.text, model)
+        )
+        logger.debug("Chunks: " + str([chunk for chunk, _ in chunks]))
+        return chunks
+
+    def _relevant_text(self, document: MemoryDocument) -> str | None:
+        """
+        Returns the part of the document that is relevant to its question, which is
+        summarized instead of its chunks, or None if the whole document is relevant
+        """
+        if not (
+            document.question_for_summary
+            and self.config.summarization_extract_max_tokens > 0
+        ):
+            return None
+        text = extract_relevant_text(
+            document.text,
+            document.question_for_summary,
+            self.config.fast_llm,
+            self.config,
+            self.config.summarization_extract_max_tokens,
+        )
+        return text if text != document.text else None
+
+    def _summarize(self, text: str, document: MemoryDocument) -> str:
+        summary, _ = summarize_text(
+            text,
+            self.config,
+            instruction=document.how_to_summarize,
+            question=document.question_for_summary,
+            rate_limiter=self.rate_limiter,
+            # This already runs in one of the `concurrency` workers of the pipeline
+            concurrency=1,
+        )
+        return summary
+
+    def _summarize_chunk_summaries(self, job: _Job) -> str:
+        return self._summarize(
+            "\n\n".join(f.result() for f in job.chunk_summaries), job.document
+        )
+
+    def _embed(self, texts: list[str]) -> list[Embedding]:
+        self.rate_limiter.wait()
+        return get_embedding(texts, self.config)
+
+    def _embed_batched(
+        self, texts: list[tuple[str, int]], executor: ThreadPoolExecutor
+    ) -> list[_BatchedEmbedding]:
+        """
+        Submits the given (text, token length) pairs for embedding in token-bounded
+        batches, and returns a (batch future, index in batch) for each of the texts.
+        """
+        embeddings = []
+        batch: list[str] = []
+        batch_tokens = 0
+        for text, n_tokens in [*texts, (None, 0)]:
+            if batch and (
+                text is None
+                or len(batch) >= self.MAX_BATCH_INPUTS
+                or batch_tokens + n_tokens > self.MAX_BATCH_TOKENS
+            ):
+                future = executor.submit(self._embed, batch)
+                embeddings += [(future, i) for i in range(len(batch))]
+                batch, batch_tokens = [], 0
+            if text is not None:
+                batch.append(text)
+                batch_tokens += n_tokens
+        return embeddings
+
+
+_BatchedEmbedding = tuple[Future[list[Embedding]], int]
+"""A future embedding batch and the index of an embedding in it"""
+
+
+@dataclasses.dataclass
+class _Job:
+    """The pending work for a single document"""
+
+    document: MemoryDocument
+    chunks: list[tuple[str, int]]
+    summary_text: str | None = None
+    """The text that is summarized instead of the chunks, if it is not the document"""
+    chunk_summaries: list[Future[str]] = dataclasses.field(default_factory=list)
+    e_chunks: list[_BatchedEmbedding] = dataclasses.field(default_factory=list)
+    summary: Future[str] | None = None
+    e_summary: _BatchedEmbedding | None = None
+
+    def result(self) -> MemoryItem:
+        """Waits for all pending work and returns the resulting MemoryItem"""
+        summary = self.summary.result()
+        logger.debug("Total summary: " + summary)
+        return MemoryItem(
+            raw_content=self.document.text,
+            summary=summary,
+            chunks=[chunk for chunk, _ in self.chunks],
+            chunk_summaries=[f.result() for f in self.chunk_summaries],
+            e_summary=_batched_embedding_result(self.e_summary),
+            e_chunks=[_batched_embedding_result(e) for e in self.e_chunks],
+            metadata={"created_at": time.time()}
+            | self.document.metadata
+            | {"source_type": self.document.source_type},
+            how_to_summarize=self.document.how_to_summarize,
+            question_for_summary=self.document.question_for_summary,
+        )
+
+
+def _batched_embedding_result(embedding: _BatchedEmbedding) -> Embedding:
+    future, index = embedding
+    return future.result()[index]
@@ -0,0 +1,124 @@
+"""Metadata filters for relevance search, and the postings to evaluate them quickly"""
+from __future__ import annotations
+
+import dataclasses
+import math
+from collections import defaultdict
+
+from .memory_item import MemoryDocType
+
+
+@dataclasses.dataclass(frozen=True)
+class MemoryFilter:
+    """
+    Restricts a relevance search to memories whose metadata matches all of the
+    given criteria. Criteria that are None are not applied.
+
+    The creation time of a memory is taken from its `created_at` metadata, a POSIX
+    timestamp. Memories without it never match a time criterion.
+    """
+
+    source_type: MemoryDocType | None = None
+    location: str | None = None
+    created_after: float | None = None
+    """Inclusive lower bound on the creation time"""
+    created_before: float | None = None
+    """Exclusive upper bound on the creation time"""
+
+    @property
+    def has_time_range(self) -> bool:
+        return self.created_after is not None or self.created_before is not None
+
+    def matches(self, metadata: dict) -> bool:
+        if (
+            self.source_type is not None
+            and metadata.get("source_type") != self.source_type
+        ):
+            return False
+        if self.location is not None and metadata.get("location") != self.location:
+            return False
+        if self.has_time_range:
+            created_at = metadata.get("created_at")
+            if created_at is None:
+                return False
+            if self.created_after is not None and created_at < self.created_after:
+                return False
+            if self.created_before is not None and created_at >= self.created_before:
+                return False
+        return True
+
+
+class MetadataIndex:
+    """
+    Inverted index over the metadata of memories: the IDs of the memories per
+    `source_type`, per `location` and per `TIME_BUCKET_SECONDS` of creation time.
+    """
+
+    TIME_BUCKET_SECONDS = 3600
+
+    def __init__(self) -> None:
+        self.source_types: defaultdict[str, set[int]] = defaultdict(set)
+        self.locations: defaultdict[str, set[int]] = defaultdict(set)
+        self.time_buckets: defaultdict[int, set[int]] = defaultdict(set)
+
+    def add(self, id: int, metadata: dict) -> None:
+        for postings, key in self._keys(metadata):
+            postings[key].add(id)
+
+    def remove(self, id: int, metadata: dict) -> None:
+        for postings, key in self._keys(metadata):
+            if key in postings:
+                postings[key].discard(id)
+                if not postings[key]:
+                    del postings[key]
+
+    def candidates(self, filter: MemoryFilter) -> set[int] | None:
+        """
+        Returns the IDs of the memories that may match the given filter, or None if
+        the filter doesn't restrict any of the indexed fields. Memories in the time
+        buckets at the edges of the filter's time range may fall outside of it, so
+        the candidates must still be checked with `MemoryFilter.matches`.
+        """
+        postings: list[set[int]] = []
+        if filter.source_type is not None:
+            postings.append(self.source_types.get(filter.source_type, set()))
+        if filter.location is not None:
+            postings.append(self.locations.get(filter.location, set()))
+        if filter.has_time_range:
+            first = (
+                self._bucket(filter.created_after)
+                if filter.created_after is not None
+                else None
+            )
+            last = (
+                # The upper bound is exclusive
+                math.ceil(filter.created_before / self.TIME_BUCKET_SECONDS) - 1
+                if filter.created_before is not None
+                else None
+            )
+            postings.append(
+                set().union(
+                    *(
+                        ids
+                        for bucket, ids in self.time_buckets.items()
+                        if (first is None or bucket >= first)
+                        and (last is None or bucket <= last)
+                    )
+                )
+            )
+        if not postings:
+            return None
+
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def _keys(self, metadata: dict):
+        if (source_type := metadata.get("source_type")) is not None:
+            yield self.source_types, source_type
+        if (location := metadata.get("location")) is not None:
+            yield self.locations, location
+        if (created_at := metadata.get("created_at")) is not None:
+            yield self.time_buckets, self._bucket(created_at)
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.TIME_BUCKET_SECONDS)
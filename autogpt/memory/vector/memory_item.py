@@ -1,23 +1,36 @@
 from __future__ import annotations
 
 import dataclasses
+import hashlib
 import json
-from typing import Literal
+from typing import Any, Callable, Literal
 
 import ftfy
 import numpy as np
+import orjson
 
 from autogpt.config import Config
 from autogpt.llm import Message
 from autogpt.llm.utils import count_string_tokens
 from autogpt.logs import logger
-from autogpt.processing.text import chunk_content, split_text, summarize_text
 
 from .utils import Embedding, get_embedding
 
 MemoryDocType = Literal["webpage", "text_file", "code_file", "agent_history"]
 
 
+def hash_content(text: str, *summary_instructions: str | None) -> str:
+    """
+    Hashes the content of a memory together with the instructions that its summaries
+    depend on, so that unchanged content can be recognized without processing it again.
+
+    The text is hashed as it is stored, i.e. after its encoding is fixed with ftfy.
+    """
+    return hashlib.sha256(
+        orjson.dumps([ftfy.fix_text(text), *filter(None, summary_instructions)])
+    ).hexdigest()
+
+
 @dataclasses.dataclass
 class MemoryItem:
     """Memory object containing raw content as well as embeddings"""
@@ -29,6 +42,23 @@ class MemoryItem:
     e_summary: Embedding
     e_chunks: list[Embedding]
     metadata: dict
+    how_to_summarize: str | None = None
+    question_for_summary: str | None = None
+    content_hash: str = dataclasses.field(init=False)
+    """The `hash_content` of the content and the instructions it was summarized with"""
+
+    def __post_init__(self):
+        self.content_hash = hash_content(
+            self.raw_content, self.how_to_summarize, self.question_for_summary
+        )
+
+    @property
+    def source(self) -> tuple[str, str] | None:
+        """The (`source_type`, `location`) of the memory, if it has a location"""
+        location = self.metadata.get("location")
+        if location is None:
+            return None
+        return self.metadata.get("source_type"), location
 
     def relevance_for(self, query: str, e_query: Embedding | None = None):
         return MemoryItemRelevance.of(self, query, e_query)
@@ -42,64 +72,12 @@ class MemoryItem:
         how_to_summarize: str | None = None,
         question_for_summary: str | None = None,
     ):
-        logger.debug(f"Memorizing text:\n{'-'*32}\n{text}\n{'-'*32}\n")
+        from .ingestion import IngestionPipeline, MemoryDocument
 
-        # Fix encoding, e.g. removing unicode surrogates (see issue #778)
-        text = ftfy.fix_text(text)
-
-        chunks = [
-            chunk
-            for chunk, _ in (
-                split_text(text, config.embedding_model, config)
-                if source_type != "code_file"
-                else chunk_content(text, config.embedding_model)
-            )
-        ]
-        logger.debug("Chunks: " + str(chunks))
-
-        chunk_summaries = [
-            summary
-            for summary, _ in [
-                summarize_text(
-                    text_chunk,
-                    config,
-                    instruction=how_to_summarize,
-                    question=question_for_summary,
-                )
-                for text_chunk in chunks
-            ]
-        ]
-        logger.debug("Chunk summaries: " + str(chunk_summaries))
-
-        e_chunks = get_embedding(chunks, config)
-
-        summary = (
-            chunk_summaries[0]
-            if len(chunks) == 1
-            else summarize_text(
-                "\n\n".join(chunk_summaries),
-                config,
-                instruction=how_to_summarize,
-                question=question_for_summary,
-            )[0]
-        )
-        logger.debug("Total summary: " + summary)
-
-        # TODO: investigate search performance of weighted average vs summary
-        # e_average = np.average(e_chunks, axis=0, weights=[len(c) for c in chunks])
-        e_summary = get_embedding(summary, config)
-
-        metadata["source_type"] = source_type
-
-        return MemoryItem(
-            text,
-            summary,
-            chunks,
-            chunk_summaries,
-            e_summary,
-            e_chunks,
-            metadata=metadata,
+        document = MemoryDocument(
+            text, source_type, metadata, how_to_summarize, question_for_summary
         )
+        return next(IngestionPipeline(config).process([document], raise_errors=True))
 
     @staticmethod
     def from_text_file(content: str, path: str, config: Config):
@@ -196,6 +174,60 @@ Metadata: {json.dumps(self.metadata, indent=2)}
         )
 
 
+class LazyMemoryItem(MemoryItem):
+    """
+    MemoryItem of which the content (`raw_content`, `chunks`, `chunk_summaries` and the
+    summary instructions) is not kept in memory, but loaded by its memory backend each
+    time it is accessed. Its `content_hash` is stored by the backend.
+    """
+
+    LAZY_FIELDS = (
+        "raw_content",
+        "chunks",
+        "chunk_summaries",
+        "how_to_summarize",
+        "question_for_summary",
+    )
+
+    def __init__(
+        self,
+        load_content: Callable[[], dict[str, Any]],
+        summary: str,
+        e_summary: Embedding,
+        e_chunks: list[Embedding],
+        metadata: dict,
+        content_hash: str,
+    ):
+        self._load_content = load_content
+        self.summary = summary
+        self.e_summary = e_summary
+        self.e_chunks = e_chunks
+        self.metadata = metadata
+        self.content_hash = content_hash
+
+    def __getattr__(self, name: str):
+        # Only called for attributes that are not set on the instance
+        if name in self.LAZY_FIELDS:
+            return self._load_content()[name]
+        raise AttributeError(f"'{type(self).__name__}' has no attribute '{name}'")
+
+    def materialize(self) -> None:
+        """Loads the content once and keeps it, e.g. before the backend drops it"""
+        if "raw_content" not in self.__dict__:
+            self.__dict__.update(self._load_content())
+
+    def __eq__(self, other: MemoryItem):
+        if self is other:
+            return True
+        # Compare the resident summary embeddings before loading any content
+        if not np.array_equal(
+            np.asarray(self.e_summary, dtype=np.float32),
+            np.asarray(other.e_summary, dtype=np.float32),
+        ):
+            return False
+        return super().__eq__(other)
+
+
 @dataclasses.dataclass
 class MemoryItemRelevance:
     """
@@ -212,7 +244,8 @@ class MemoryItemRelevance:
     def of(
         memory_item: MemoryItem, for_query: str, e_query: Embedding | None = None
     ) -> MemoryItemRelevance:
-        e_query = e_query or get_embedding(for_query)
+        if e_query is None:
+            e_query = get_embedding(for_query)
         _, srs, crs = MemoryItemRelevance.calculate_scores(memory_item, e_query)
         return MemoryItemRelevance(
             for_query=for_query,
@@ -1,7 +1,13 @@
+from .ivf_file import IVFFileMemory
 from .json_file import JSONFileMemory
 from .no_memory import NoMemory
+from .remote import RemoteMemory
+from .segment_file import SegmentFileMemory
 
 __all__ = [
+    "IVFFileMemory",
     "JSONFileMemory",
     "NoMemory",
+    "RemoteMemory",
+    "SegmentFileMemory",
 ]
@@ -8,6 +8,7 @@ from autogpt.config.config import Config
 from autogpt.logs import logger
 
 from .. import MemoryItem, MemoryItemRelevance
+from ..memory_filter import MemoryFilter
 from ..utils import Embedding, get_embedding
 
 
@@ -16,21 +17,28 @@ class VectorMemoryProvider(MutableSet[MemoryItem]):
     def __init__(self, config: Config):
         pass
 
-    def get(self, query: str, config: Config) -> MemoryItemRelevance | None:
+    def get(
+        self, query: str, config: Config, filter: MemoryFilter | None = None
+    ) -> MemoryItemRelevance | None:
         """
         Gets the data from the memory that is most relevant to the given query.
 
         Args:
             query: The query used to retrieve information.
             config: The config Object.
+            filter: Only consider memories whose metadata matches this filter.
 
         Returns: The most relevant Memory
         """
-        result = self.get_relevant(query, 1, config)
+        result = self.get_relevant(query, 1, config, filter)
         return result[0] if result else None
 
     def get_relevant(
-        self, query: str, k: int, config: Config
+        self,
+        query: str,
+        k: int,
+        config: Config,
+        filter: MemoryFilter | None = None,
     ) -> Sequence[MemoryItemRelevance]:
         """
         Returns the top-k most relevant memories for the given query
@@ -39,6 +47,7 @@ class VectorMemoryProvider(MutableSet[MemoryItem]):
             query: the query to compare stored memories to
             k: the number of relevant memories to fetch
             config: The config Object.
+            filter: only consider memories whose metadata matches this filter
 
         Returns:
             list[MemoryItemRelevance] containing the top [k] relevant memories
@@ -51,23 +60,96 @@ class VectorMemoryProvider(MutableSet[MemoryItem]):
             f"{len(self)} memories in index"
         )
 
-        relevances = self.score_memories_for_relevance(query, config)
+        relevances = self.score_memories_for_relevance(query, config, filter)
         logger.debug(f"Memory relevance scores: {[str(r) for r in relevances]}")
+        return _top_k(relevances, k)
+
+    def get_relevant_batch(
+        self,
+        queries: Sequence[str],
+        k: int,
+        config: Config,
+        filter: MemoryFilter | None = None,
+    ) -> list[Sequence[MemoryItemRelevance]]:
+        """
+        Returns the top-k most relevant memories for each of the given queries.
+        The queries are embedded in a single request.
+        Implementations may override this function to also score them together.
+        """
+        memories = [m for m in self if filter is None or filter.matches(m.metadata)]
+        if not memories or not queries or k < 1:
+            return [[] for _ in queries]
 
-        # take last k items and reverse
-        top_k_indices = np.argsort([r.score for r in relevances])[-k:][::-1]
-
-        return [relevances[i] for i in top_k_indices]
+        e_queries: list[Embedding] = get_embedding(list(queries), config)
+        return [
+            _top_k([m.relevance_for(query, e_query) for m in memories], k)
+            for query, e_query in zip(queries, e_queries)
+        ]
 
     def score_memories_for_relevance(
-        self, for_query: str, config: Config
+        self, for_query: str, config: Config, filter: MemoryFilter | None = None
     ) -> Sequence[MemoryItemRelevance]:
         """
-        Returns MemoryItemRelevance for every memory in the index.
+        Returns MemoryItemRelevance for every memory in the index that matches the
+        filter. Memories are filtered before they are scored.
         Implementations may override this function for performance purposes.
         """
+        memories = [m for m in self if filter is None or filter.matches(m.metadata)]
+        if not memories:
+            return []
         e_query: Embedding = get_embedding(for_query, config)
-        return [m.relevance_for(for_query, e_query) for m in self]
+        return [m.relevance_for(for_query, e_query) for m in memories]
+
+    def find(
+        self, source_type: str, location: str, content_hash: str | None = None
+    ) -> MemoryItem | None:
+        """
+        Returns the memory of the given source, if there is one.
+        Implementations may override `_find_by_source` for performance purposes.
+
+        Args:
+            source_type: the `source_type` of the memory
+            location: the `location` of the memory, e.g. a file path or URL
+            content_hash: if given, only return the memory if its content hash matches
+                (see `hash_content`), i.e. if its content is unchanged
+        """
+        memory = self._find_by_source(source_type, location)
+        if memory and content_hash is not None and memory.content_hash != content_hash:
+            return None
+        return memory
+
+    def upsert(self, item: MemoryItem) -> MemoryItem:
+        """
+        Adds the item to the memory, replacing the memory of the same source
+        (`source_type` and `location`) if there is one. If that memory has the same
+        content, it is kept as is.
+
+        Returns:
+            MemoryItem: the memory that is now stored for the item's source
+        """
+        existing = self.find(*item.source) if item.source is not None else None
+        if existing is None:
+            self.add(item)
+        elif existing.content_hash == item.content_hash:
+            return existing
+        else:
+            self._replace(existing, item)
+        return item
+
+    def _find_by_source(self, source_type: str, location: str) -> MemoryItem | None:
+        return next(
+            (
+                m
+                for m in self
+                if m.metadata.get("source_type") == source_type
+                and m.metadata.get("location") == location
+            ),
+            None,
+        )
+
+    def _replace(self, old: MemoryItem, new: MemoryItem) -> None:
+        self.discard(old)
+        self.add(new)
 
     def get_stats(self) -> tuple[int, int]:
         """
@@ -75,3 +157,18 @@ class VectorMemoryProvider(MutableSet[MemoryItem]):
             tuple (n_memories: int, n_chunks: int): the stats of the memory index
         """
         return len(self), functools.reduce(lambda t, m: t + len(m.e_chunks), self, 0)
+
+
+def _top_k(
+    relevances: Sequence[MemoryItemRelevance], k: int
+) -> list[MemoryItemRelevance]:
+    if not relevances or k < 1:
+        return []
+
+    # select the top k without sorting all scores, then order those k
+    scores = np.array([r.score for r in relevances])
+    k = min(k, len(scores))
+    top_k_indices = np.argpartition(-scores, k - 1)[:k]
+    top_k_indices = top_k_indices[np.argsort(-scores[top_k_indices])]
+
+    return [relevances[i] for i in top_k_indices]
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import contextlib
+import os
+from array import array
+from typing import Sequence
+
+import numpy as np
+
+from autogpt.config import Config
+from autogpt.logs import logger
+
+from ..memory_filter import MemoryFilter
+from ..memory_item import MemoryItem, MemoryItemRelevance
+from ..utils import get_embedding
+from .segment_file import SegmentFileMemory, SegmentFiles, SegmentRecord
+
+
+class IVFFileMemory(SegmentFileMemory):
+    """
+    Memory backend with approximate nearest neighbour search over segment files.
+
+    Embedding rows are partitioned into `n_lists` clusters by (spherical) k-means.
+    A query is only compared to the rows in the `nprobe` clusters whose centroids are
+    most similar to it, which trades some recall for a large reduction in latency on
+    big indexes. Raising `nprobe` increases recall at the cost of latency;
+    `nprobe == n_lists` is equivalent to a brute force search.
+
+    New rows are assigned to their nearest centroid as they are added, and discarded
+    rows are skipped at query time. The clusters are retrained when the index has
+    grown by `RETRAIN_GROWTH_FACTOR` since the last training.
+    Until the index holds `MIN_TRAINING_ROWS` rows, it is searched brute force.
+
+    Filtered searches score the rows of the matching memories exactly when there
+    are fewer of them than the probed clusters would hold, and only score the
+    matching rows within the probed clusters otherwise.
+    """
+
+    MIN_TRAINING_ROWS = 4096
+    RETRAIN_GROWTH_FACTOR = 2.0
+    KMEANS_ITERATIONS = 10
+    TRAINING_SAMPLES_PER_LIST = 32
+    ASSIGNMENT_BATCH_SIZE = 16384
+
+    centroids: np.ndarray | None
+    """(n_lists, dimensions) matrix of normalized cluster centroids"""
+
+    def __init__(self, config: Config) -> None:
+        self.nprobe = config.memory_ivf_nprobe
+        self.centroids = None
+        self._n_training_rows = 0
+        super().__init__(config)
+
+    @property
+    def ivf_path(self):
+        return self.path / f"ivf.{self.generation}.npz"
+
+    @property
+    def n_lists(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def add(self, item: MemoryItem):
+        n_memories = super().add(item)
+        if self._n_rows >= max(
+            self.MIN_TRAINING_ROWS,
+            self._n_training_rows * self.RETRAIN_GROWTH_FACTOR,
+        ):
+            self.train()
+        return n_memories
+
+    def clear(self):
+        self.centroids = None
+        self._n_training_rows = 0
+        self.ivf_path.unlink(missing_ok=True)
+        super().clear()
+
+    def get_relevant(
+        self,
+        query: str,
+        k: int,
+        config: Config,
+        filter: MemoryFilter | None = None,
+    ) -> Sequence[MemoryItemRelevance]:
+        """
+        Returns the (approximate) top-k most relevant memories for the given query.
+
+        Only the rows in the `nprobe` clusters nearest to the query are scored.
+        The relevance scores of the returned memories are exact.
+        """
+        if self.centroids is None:
+            return super().get_relevant(query, k, config, filter)
+        if len(self) < 1 or k < 1:
+            return []
+
+        allowed_rows = None
+        if filter is not None:
+            allowed_rows = self._filter_rows(filter)
+            if len(allowed_rows) == 0:
+                return []
+            if self._scan_allowed_rows(allowed_rows):
+                logger.debug(
+                    f"Searching for {k} relevant memories for query '{query}' "
+                    f"in the {len(allowed_rows)} embedding rows matching {filter}"
+                )
+                e_query = np.asarray(
+                    get_embedding(query, config), dtype=self.EMBEDDING_DTYPE
+                )
+                return self._score_rows([query], e_query[None], k, allowed_rows)[0]
+
+        logger.debug(
+            f"Searching for {k} relevant memories for query '{query}' "
+            f"in {min(self.nprobe, self.n_lists)} of {self.n_lists} clusters; "
+            f"{len(self)} memories in index"
+        )
+
+        e_query = np.asarray(get_embedding(query, config), dtype=self.EMBEDDING_DTYPE)
+        return self._search(query, e_query, k, allowed_rows)
+
+    def get_relevant_batch(
+        self,
+        queries: Sequence[str],
+        k: int,
+        config: Config,
+        filter: MemoryFilter | None = None,
+    ) -> list[Sequence[MemoryItemRelevance]]:
+        """
+        Returns the (approximate) top-k most relevant memories for each of the given
+        queries. The queries are embedded in one request; each probes its own
+        clusters.
+        """
+        if self.centroids is None:
+            return super().get_relevant_batch(queries, k, config, filter)
+        if len(self) < 1 or k < 1 or not queries:
+            return [[] for _ in queries]
+
+        allowed_rows = None
+        if filter is not None:
+            allowed_rows = self._filter_rows(filter)
+            if len(allowed_rows) == 0:
+                return [[] for _ in queries]
+
+        e_queries = np.asarray(
+            get_embedding(list(queries), config), dtype=self.EMBEDDING_DTYPE
+        )
+        if allowed_rows is not None and self._scan_allowed_rows(allowed_rows):
+            return self._score_rows(queries, e_queries, k, allowed_rows)
+        return [
+            self._search(query, e_query, k, allowed_rows)
+            for query, e_query in zip(queries, e_queries)
+        ]
+
+    def train(self) -> None:
+        """(Re)trains the cluster centroids and reassigns all rows to them"""
+        live_rows = np.flatnonzero(
+            np.frombuffer(self._row_memory_ids, dtype=np.int64) != self.DEAD_ROW
+        )
+        if len(live_rows) == 0:
+            return
+
+        rng = np.random.default_rng(0)
+        n_lists = max(1, int(np.sqrt(len(live_rows))))
+        n_samples = min(len(live_rows), n_lists * self.TRAINING_SAMPLES_PER_LIST)
+        logger.debug(f"Training {n_lists} IVF clusters on {n_samples} sample rows")
+        samples = _normalize(
+            self.embeddings[np.sort(rng.choice(live_rows, n_samples, replace=False))]
+        )
+
+        centroids = samples[rng.choice(n_samples, n_lists, replace=False)]
+        for _ in range(self.KMEANS_ITERATIONS):
+            assignments = np.argmax(samples @ centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(n_lists))
+            counts = np.diff(bounds, append=n_samples)
+            non_empty = counts > 0
+            sums = samples[rng.choice(n_samples, n_lists)]  # re-seeds empty clusters
+            sums[non_empty] = np.add.reduceat(samples[order], bounds[non_empty])
+            centroids = _normalize(sums)
+
+        self.centroids = centroids
+        self._n_training_rows = self._n_rows
+        self._reset_lists()
+        embeddings = self.embeddings
+        for start in range(0, self._n_rows, self.ASSIGNMENT_BATCH_SIZE):
+            self._assign_rows(
+                start, embeddings[start : start + self.ASSIGNMENT_BATCH_SIZE]
+            )
+        self._save_ivf_index()
+
+    def load_index(self):
+        super().load_index()
+        if self._n_rows < self.MIN_TRAINING_ROWS:
+            return
+
+        try:
+            with np.load(self.ivf_path) as ivf_index:
+                centroids = ivf_index["centroids"]
+                assignments = ivf_index["assignments"]
+            if centroids.shape[1] != self.dimensions or len(assignments) > self._n_rows:
+                raise ValueError("IVF index doesn't match the segments")
+        except Exception as e:
+            logger.warn(f"Could not load IVF index, training a new one: {e}")
+            self.train()
+            return
+
+        self.centroids = centroids
+        self._n_training_rows = len(assignments)
+        self._reset_lists()
+        self._add_to_lists(0, assignments)
+        # Assign rows that were added after the index was last saved
+        self._assign_rows(len(assignments), self.embeddings[len(assignments) :])
+
+    def compact(self):
+        super().compact()
+        if self.centroids is not None:
+            self._save_ivf_index()
+
+    def _scan_allowed_rows(self, allowed_rows: np.ndarray) -> bool:
+        """Whether scoring the rows matching a filter beats probing the clusters"""
+        probed_rows = self._n_rows * min(self.nprobe, self.n_lists) / self.n_lists
+        return len(allowed_rows) <= probed_rows
+
+    def _search(
+        self,
+        query: str,
+        e_query: np.ndarray,
+        k: int,
+        allowed_rows: np.ndarray | None = None,
+    ) -> list[MemoryItemRelevance]:
+        nprobe = max(1, min(self.nprobe, self.n_lists))
+        probed_lists = np.argpartition(-(self.centroids @ e_query), nprobe - 1)[:nprobe]
+        candidate_rows = np.concatenate(
+            [np.frombuffer(self._lists[i], dtype=np.int64) for i in probed_lists]
+        )
+        candidate_memory_ids = np.frombuffer(self._row_memory_ids, dtype=np.int64)[
+            candidate_rows
+        ]
+        live = candidate_memory_ids != self.DEAD_ROW
+        if allowed_rows is not None:
+            live &= np.isin(candidate_rows, allowed_rows, assume_unique=True)
+        candidate_rows = candidate_rows[live]
+        candidate_memory_ids = candidate_memory_ids[live]
+        if len(candidate_rows) == 0:
+            return []
+
+        # Reading rows in segment order keeps access to the memory map sequential
+        order = np.argsort(candidate_rows)
+        candidate_rows = candidate_rows[order]
+        candidate_memory_ids = candidate_memory_ids[order]
+        scores = self._search_scores(e_query, candidate_rows)
+
+        # Best scoring row per memory, then the top k of those
+        by_score = np.argsort(-scores, kind="stable")
+        memory_ids, first = np.unique(candidate_memory_ids[by_score], return_index=True)
+        return self._top_k(query, e_query, k, memory_ids, scores[by_score[first]])
+
+    def _reset_state(self) -> None:
+        super()._reset_state()
+        self._reset_lists()
+
+    def _reset_lists(self) -> None:
+        self._row_lists = array("i")
+        """The cluster that each embedding row is assigned to"""
+        self._lists = [array("q") for _ in range(self.n_lists)]
+        """The inverted lists: embedding rows per cluster"""
+
+    def _write_item(
+        self, item: MemoryItem, files: SegmentFiles, id: int | None = None
+    ) -> SegmentRecord:
+        record = super()._write_item(item, files, id)
+        if self.centroids is not None:
+            e_summary = np.asarray(item.e_summary, dtype=self.EMBEDDING_DTYPE)
+            e_chunks = np.asarray(item.e_chunks, dtype=self.EMBEDDING_DTYPE)
+            self._assign_rows(
+                record.row, np.vstack([e_summary, e_chunks.reshape(-1, len(e_summary))])
+            )
+        return record
+
+    def _assign_rows(self, start: int, embeddings: np.ndarray) -> None:
+        """Assigns the given consecutive embedding rows to their nearest cluster"""
+        if len(embeddings):
+            self._add_to_lists(start, np.argmax(embeddings @ self.centroids.T, axis=1))
+
+    def _add_to_lists(self, start: int, assignments: np.ndarray) -> None:
+        """Adds consecutive rows, starting at `start`, to the given clusters"""
+        if len(self._row_lists) != start:
+            raise ValueError(f"Can't assign rows from {start}: rows out of sequence")
+
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(self.n_lists + 1))
+        rows = order.astype(np.int64) + start
+        for list_id in np.flatnonzero(np.diff(bounds)):
+            self._lists[list_id].frombytes(
+                rows[bounds[list_id] : bounds[list_id + 1]].tobytes()
+            )
+        self._row_lists.frombytes(assignments.astype(np.int32).tobytes())
+
+    def _save_ivf_index(self) -> None:
+        tmp_path = self.ivf_path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp_path,
+            centroids=self.centroids,
+            assignments=np.frombuffer(self._row_lists, dtype=np.int32),
+        )
+        os.replace(tmp_path, self.ivf_path)
+
+    def _remove_stale_segments(self) -> None:
+        super()._remove_stale_segments()
+        for ivf_index in self.path.glob("ivf.*.npz"):
+            if ivf_index != self.ivf_path:
+                with contextlib.suppress(PermissionError):
+                    ivf_index.unlink(missing_ok=True)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections import defaultdict
 from pathlib import Path
 from typing import Iterator
 
@@ -13,7 +14,12 @@ from .base import VectorMemoryProvider
 
 
 class JSONFileMemory(VectorMemoryProvider):
-    """Memory backend that stores memories in a JSON file"""
+    """
+    Memory backend that stores memories in a JSON file.
+
+    Memories are indexed by source (`source_type` and `location`) and content hash,
+    so that containment checks and upserts don't have to scan all memories.
+    """
 
     SAVE_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SERIALIZE_DATACLASS
 
@@ -36,6 +42,10 @@ class JSONFileMemory(VectorMemoryProvider):
         )
 
         self.memories = []
+        self._by_source: defaultdict[tuple[str, str], list[MemoryItem]] = defaultdict(
+            list
+        )
+        self._by_hash: defaultdict[str, list[MemoryItem]] = defaultdict(list)
         try:
             self.load_index()
             logger.debug(f"Loaded {len(self.memories)} MemoryItems from file")
@@ -47,26 +57,31 @@ class JSONFileMemory(VectorMemoryProvider):
         return iter(self.memories)
 
     def __contains__(self, x: MemoryItem) -> bool:
-        return x in self.memories
+        return self._find_stored(x) is not None
 
     def __len__(self) -> int:
         return len(self.memories)
 
     def add(self, item: MemoryItem):
         self.memories.append(item)
+        self._index(item)
         logger.debug(f"Adding item to memory: {item.dump()}")
         self.save_index()
         return len(self.memories)
 
     def discard(self, item: MemoryItem):
-        try:
-            self.remove(item)
-        except:
-            pass
+        memory = self._find_stored(item)
+        if memory is None:
+            return
+        del self.memories[self._position(memory)]
+        self._unindex(memory)
+        self.save_index()
 
     def clear(self):
         """Clears the data in memory."""
         self.memories.clear()
+        self._by_source.clear()
+        self._by_hash.clear()
         self.save_index()
 
     def load_index(self):
@@ -78,9 +93,53 @@ class JSONFileMemory(VectorMemoryProvider):
             logger.debug(f"Loading memories from index file '{self.file_path}'")
             json_index = orjson.loads(f.read())
             for memory_item_dict in json_index:
-                self.memories.append(MemoryItem(**memory_item_dict))
+                # The content hash is computed from the other fields
+                memory_item_dict.pop("content_hash", None)
+                memory = MemoryItem(**memory_item_dict)
+                self.memories.append(memory)
+                self._index(memory)
 
     def save_index(self):
         logger.debug(f"Saving memory index to file {self.file_path}")
         with self.file_path.open("wb") as f:
             return f.write(orjson.dumps(self.memories, option=self.SAVE_OPTIONS))
+
+    def _find_by_source(self, source_type: str, location: str) -> MemoryItem | None:
+        # The last added memory of the source, if several were added with `add`
+        memories = self._by_source.get((source_type, location))
+        return memories[-1] if memories else None
+
+    def _replace(self, old: MemoryItem, new: MemoryItem) -> None:
+        """Replaces the old memory with the new one in place, saving the index once"""
+        logger.debug(f"Replacing item in memory: {new.dump()}")
+        self.memories[self._position(old)] = new
+        self._unindex(old)
+        self._index(new)
+        self.save_index()
+
+    def _find_stored(self, item: MemoryItem) -> MemoryItem | None:
+        """Returns the stored memory that is (equal to) the given item"""
+        candidates = self._by_hash.get(item.content_hash, [])
+        for memory in candidates:
+            if memory is item:
+                return memory
+        return next((m for m in candidates if m == item), None)
+
+    def _position(self, memory: MemoryItem) -> int:
+        return next(i for i, m in enumerate(self.memories) if m is memory)
+
+    def _index(self, memory: MemoryItem) -> None:
+        self._by_hash[memory.content_hash].append(memory)
+        if memory.source is not None:
+            self._by_source[memory.source].append(memory)
+
+    def _unindex(self, memory: MemoryItem) -> None:
+        candidates = self._by_hash[memory.content_hash]
+        del candidates[next(i for i, m in enumerate(candidates) if m is memory)]
+        if not candidates:
+            del self._by_hash[memory.content_hash]
+        if memory.source is not None:
+            memories = self._by_source[memory.source]
+            del memories[next(i for i, m in enumerate(memories) if m is memory)]
+            if not memories:
+                del self._by_source[memory.source]
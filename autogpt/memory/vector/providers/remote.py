@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import ipaddress
+import re
+import threading
+from multiprocessing.connection import Client
+from typing import Any, Iterator, Sequence
+
+from autogpt.config import Config
+from autogpt.logs import logger
+
+from ..memory_filter import MemoryFilter
+from ..memory_item import MemoryItem, MemoryItemRelevance
+from .base import VectorMemoryProvider
+
+MemoryServerAddress = str | tuple[str, int]
+
+
+def memory_server_address(config: Config) -> MemoryServerAddress:
+    """
+    Returns the address of the memory server: the path of a Unix socket, or a
+    (host, port) tuple if `memory_server_address` has the form `host:port`
+
+    Raises:
+        ValueError: if the host is not a loopback address: the server executes the
+            requests that it receives, so it must not be reachable from other hosts
+    """
+    address = config.memory_server_address or str(
+        config.workspace_path / "memory_server.sock"
+    )
+    if match := re.fullmatch(r"([\w.-]+):(\d+)", address):
+        host = match[1]
+        if not _is_loopback(host):
+            raise ValueError(
+                f"The memory server can only listen on localhost, not on '{host}'"
+            )
+        return host, int(match[2])
+    return address
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def memory_server_authkey(config: Config) -> bytes | None:
+    return (
+        config.memory_server_authkey.encode() if config.memory_server_authkey else None
+    )
+
+
+class RemoteMemory(VectorMemoryProvider):
+    """
+    Memory backend that forwards all operations to a memory server (see
+    `autogpt.memory.vector.server`), so that multiple agents can share one resident
+    index. The server stores its indexes under the `memory_index` of the client.
+    """
+
+    def __init__(self, config: Config) -> None:
+        """Initialize a class instance
+
+        Args:
+            config: Config object
+
+        Returns:
+            None
+        """
+        self.address = memory_server_address(config)
+        self.index = config.memory_index
+        try:
+            self._connection = Client(
+                self.address, authkey=memory_server_authkey(config)
+            )
+        except (OSError, EOFError) as e:
+            raise ConnectionError(
+                f"Could not connect to the memory server at {self.address}; "
+                "start it with `python -m autogpt memory-server`"
+            ) from e
+        self._lock = threading.Lock()
+        logger.debug(
+            f"Initialized {__class__.__name__} with memory server {self.address}"
+        )
+
+    def __iter__(self) -> Iterator[MemoryItem]:
+        return iter(self._call("list"))
+
+    def __contains__(self, x: MemoryItem) -> bool:
+        return self._call("__contains__", x)
+
+    def __len__(self) -> int:
+        return self._call("__len__")
+
+    def add(self, item: MemoryItem):
+        return self._call("add", item)
+
+    def discard(self, item: MemoryItem):
+        self._call("discard", item)
+
+    def clear(self):
+        """Clears the data in memory."""
+        self._call("clear")
+
+    def get_relevant(
+        self,
+        query: str,
+        k: int,
+        config: Config,
+        filter: MemoryFilter | None = None,
+    ) -> Sequence[MemoryItemRelevance]:
+        """
+        Returns the top-k most relevant memories for the given query. The server
+        embeds the query, and batches it with concurrent queries of other clients.
+        """
+        return self._call("get_relevant", query, k, filter)
+
+    def get_relevant_batch(
+        self,
+        queries: Sequence[str],
+        k: int,
+        config: Config,
+        filter: MemoryFilter | None = None,
+    ) -> list[Sequence[MemoryItemRelevance]]:
+        return self._call("get_relevant_batch", list(queries), k, filter)
+
+    def score_memories_for_relevance(
+        self, for_query: str, config: Config, filter: MemoryFilter | None = None
+    ) -> Sequence[MemoryItemRelevance]:
+        return self._call("score_memories_for_relevance", for_query, filter)
+
+    def find(
+        self, source_type: str, location: str, content_hash: str | None = None
+    ) -> MemoryItem | None:
+        return self._call("find", source_type, location, content_hash)
+
+    def upsert(self, item: MemoryItem) -> MemoryItem:
+        return self._call("upsert", item)
+
+    def get_stats(self) -> tuple[int, int]:
+        return self._call("get_stats")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _call(self, method: str, *args: Any) -> Any:
+        """Calls a method of the server-side memory, and returns its result"""
+        with self._lock:
+            self._connection.send((self.index, method, args))
+            ok, result = self._connection.recv()
+        if not ok:
+            raise result
+        return result
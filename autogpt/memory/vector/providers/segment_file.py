@@ -0,0 +1,778 @@
+from __future__ import annotations
+
+import contextlib
+import os
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, Sequence
+
+import numpy as np
+import orjson
+
+from autogpt.config import Config
+from autogpt.logs import logger
+
+from ..memory_filter import MemoryFilter, MetadataIndex
+from ..memory_item import LazyMemoryItem, MemoryItem, MemoryItemRelevance
+from ..utils import get_embedding
+from .base import VectorMemoryProvider
+
+
+@dataclass
+class SegmentRecord:
+    """Location of a memory's data in the segment files"""
+
+    id: int
+    generation: int
+    """Generation of the segments that hold the record"""
+    row: int
+    """Index of the first embedding row (the summary embedding) of the memory"""
+    n_rows: int
+    """Number of embedding rows of the memory: 1 summary row + 1 row per chunk"""
+    content_offset: int
+    """Offset of the memory's content record in the content segment"""
+    content_length: int
+    content_hash: str = ""
+    """The `content_hash` of the memory, stored so its content isn't read to index it"""
+
+
+@dataclass
+class SegmentFiles:
+    """The segment files of one generation, opened for appending"""
+
+    log: BinaryIO
+    embeddings: BinaryIO
+    content: BinaryIO
+    quantized: BinaryIO | None = None
+    scales: BinaryIO | None = None
+
+
+class SegmentFileMemory(VectorMemoryProvider):
+    """
+    Memory backend that stores memories in append-only segment files.
+
+    Summaries and metadata are appended to a JSON lines log, while embeddings are
+    appended to a separate segment of raw float32 rows and the bulk of the content
+    (raw content, chunks and chunk summaries) to a content segment. Adding, discarding
+    and clearing memories only writes the records involved. Discarded records are left
+    in place until the share of dead embedding rows exceeds `COMPACTION_THRESHOLD`, at
+    which point all segments are rewritten without them.
+
+    Memories loaded from disk are `LazyMemoryItem`s: only their summary, metadata and
+    (memory-mapped) embeddings are resident, and their content is read from the
+    content segment by offset when it is accessed.
+
+    The embedding segment is memory-mapped as one contiguous matrix, with a row index
+    mapping each row to its memory and chunk, so relevance search is a single
+    matrix-vector product. A `MetadataIndex` is kept alongside it, so that filtered
+    searches only score the rows of the memories that match the filter.
+
+    With a `memory_embedding_dtype` of float16 or int8 (scalar-quantized with a scale
+    per row), searches scan a quantized copy of the embedding segment, which is 2 or
+    4 times smaller than the float32 segment. The top `memory_rescore_factor` * k
+    memories are then re-ranked by their float32 embeddings, which are only read
+    for those memories.
+    """
+
+    FORMAT_VERSION = 2
+    """Version 1 logs, which hold the content of items inline, are migrated on load"""
+    LOG_FILE_NAME = "items.log"
+    EMBEDDING_DTYPE = np.float32
+    SEARCH_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+    """Supported values of `memory_embedding_dtype`"""
+    SCORING_BLOCK_ROWS = 512
+    """Rows converted to float32 at a time; small blocks stay in the CPU cache"""
+
+    COMPACTION_THRESHOLD = 0.5
+    COMPACTION_MIN_ROWS = 256
+    """Don't bother compacting segments smaller than this number of rows"""
+
+    SUMMARY_ROW = -1
+    """Chunk index of the summary embedding row of a memory"""
+    DEAD_ROW = -1
+    """Memory ID of embedding rows that are not referenced by any memory"""
+
+    path: Path
+    log_path: Path
+    entries: dict[int, tuple[SegmentRecord, MemoryItem]]
+
+    def __init__(self, config: Config) -> None:
+        """Initialize a class instance
+
+        Args:
+            config: Config object
+
+        Returns:
+            None
+        """
+        if config.memory_embedding_dtype not in self.SEARCH_DTYPES:
+            raise ValueError(
+                f"Unsupported memory embedding dtype '{config.memory_embedding_dtype}'"
+                f"; choose one of {', '.join(self.SEARCH_DTYPES)}"
+            )
+        self.search_dtype = np.dtype(self.SEARCH_DTYPES[config.memory_embedding_dtype])
+        self.rescore_factor = config.memory_rescore_factor
+
+        self.path = config.workspace_path / f"{config.memory_index}.segments"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.path / self.LOG_FILE_NAME
+        self.log_path.touch()
+        logger.debug(
+            f"Initialized {__class__.__name__} with segment directory {self.path}"
+        )
+
+        self.generation = 0
+        self._reset_state()
+        try:
+            self.load_index()
+            logger.debug(f"Loaded {len(self)} MemoryItems from segments")
+        except Exception as e:
+            logger.warn(f"Could not load MemoryItems from segments: {e}")
+            self.clear()
+
+    @property
+    def embeddings_path(self) -> Path:
+        """The embedding segment belonging to the current generation of the log"""
+        return self.path / f"embeddings.{self.generation}.f32"
+
+    @property
+    def quantized(self) -> bool:
+        return self.search_dtype != self.EMBEDDING_DTYPE
+
+    @property
+    def quantized_path(self) -> Path:
+        """The embedding segment in the search dtype, if that is not float32"""
+        suffix = "i8" if self.search_dtype == np.int8 else "f16"
+        return self.path / f"embeddings.{self.generation}.{suffix}"
+
+    @property
+    def scales_path(self) -> Path:
+        """The scale factors of the rows in the int8 embedding segment"""
+        return self.path / f"scales.{self.generation}.f32"
+
+    @property
+    def content_path(self) -> Path:
+        """The content segment belonging to the current generation of the log"""
+        return self._content_path(self.generation)
+
+    @property
+    def memories(self) -> list[MemoryItem]:
+        return [memory for _, memory in self.entries.values()]
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Memory-mapped matrix of all rows in the embedding segment, including
+        rows of discarded memories that have not been compacted away yet"""
+        if self._embeddings is None or len(self._embeddings) != self._n_rows:
+            self._embeddings = self._map_segment(
+                self.embeddings_path, self.EMBEDDING_DTYPE, self.dimensions
+            )
+        return self._embeddings
+
+    @property
+    def quantized_embeddings(self) -> np.ndarray:
+        """Memory-mapped matrix of all rows in the quantized embedding segment"""
+        if self._quantized is None or len(self._quantized) != self._n_rows:
+            self._quantized = self._map_segment(
+                self.quantized_path, self.search_dtype, self.dimensions
+            )
+        return self._quantized
+
+    @property
+    def scales(self) -> np.ndarray:
+        """Memory-mapped vector of the scale factors of the int8 embedding rows"""
+        if self._scales is None or len(self._scales) != self._n_rows:
+            self._scales = self._map_segment(self.scales_path, np.float32)
+        return self._scales
+
+    def __iter__(self) -> Iterator[MemoryItem]:
+        return iter(self.memories)
+
+    def __contains__(self, x: MemoryItem) -> bool:
+        return self._find_id(x) is not None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, item: MemoryItem):
+        logger.debug(f"Adding item to memory: {item.dump()}")
+        with self._open_segments("ab") as files:
+            self._write_item(item, files)
+        return len(self)
+
+    def discard(self, item: MemoryItem):
+        id = self._find_id(item)
+        if id is None:
+            return
+
+        record, memory = self.entries[id]
+        if isinstance(memory, LazyMemoryItem):
+            # Its content may be compacted away, so hand it to its holders now
+            memory.materialize()
+        del self.entries[id]
+        self._unindex_memory(id, memory)
+        with self.log_path.open("ab") as log:
+            self._write_log_entry(log, {"op": "discard", "id": record.id})
+        for row in range(record.row, record.row + record.n_rows):
+            self._row_memory_ids[row] = self.DEAD_ROW
+        self._n_dead_rows += record.n_rows
+
+        if (
+            self._n_rows >= self.COMPACTION_MIN_ROWS
+            and self._n_dead_rows / self._n_rows > self.COMPACTION_THRESHOLD
+        ):
+            self.compact()
+
+    def clear(self):
+        """Clears the data in memory."""
+        self._reset_state()
+        self.log_path.write_bytes(b"")
+        for segment in self._segment_paths():
+            segment.write_bytes(b"")
+        self._remove_stale_segments()
+
+    def get_relevant(
+        self,
+        query: str,
+        k: int,
+        config: Config,
+        filter: MemoryFilter | None = None,
+    ) -> Sequence[MemoryItemRelevance]:
+        """
+        Returns the top-k most relevant memories for the given query.
+
+        Scores all embedding rows (or, given a filter, only the rows of the matching
+        memories) with one matrix-vector product and only constructs
+        MemoryItemRelevance objects for the top-k memories.
+        """
+        if len(self) < 1 or k < 1:
+            return []
+
+        rows = None
+        if filter is not None:
+            rows = self._filter_rows(filter)
+            if len(rows) == 0:
+                return []
+
+        logger.debug(
+            f"Searching for {k} relevant memories for query '{query}'; "
+            f"{len(self)} memories in index"
+            + (f", {len(rows)} embedding rows match {filter}" if filter else "")
+        )
+
+        e_query = np.asarray(get_embedding(query, config), dtype=self.EMBEDDING_DTYPE)
+        return self._score_rows([query], e_query[None], k, rows)[0]
+
+    def get_relevant_batch(
+        self,
+        queries: Sequence[str],
+        k: int,
+        config: Config,
+        filter: MemoryFilter | None = None,
+    ) -> list[Sequence[MemoryItemRelevance]]:
+        """
+        Returns the top-k most relevant memories for each of the given queries.
+
+        The queries are embedded in one request and scored in one pass over the
+        embedding rows, with a matrix-matrix product.
+        """
+        if len(self) < 1 or k < 1 or not queries:
+            return [[] for _ in queries]
+
+        rows = None
+        if filter is not None:
+            rows = self._filter_rows(filter)
+            if len(rows) == 0:
+                return [[] for _ in queries]
+
+        logger.debug(
+            f"Searching for {k} relevant memories for {len(queries)} queries; "
+            f"{len(self)} memories in index"
+            + (f", {len(rows)} embedding rows match {filter}" if filter else "")
+        )
+
+        e_queries = np.asarray(
+            get_embedding(list(queries), config), dtype=self.EMBEDDING_DTYPE
+        )
+        return self._score_rows(queries, e_queries, k, rows)
+
+    def _filter_rows(self, filter: MemoryFilter) -> np.ndarray:
+        """Returns the embedding rows of the memories that match the filter, in order"""
+        candidates = self._metadata_index.candidates(filter)
+        records = [
+            self.entries[id][0]
+            for id in (self.entries if candidates is None else candidates)
+            if filter.matches(self.entries[id][1].metadata)
+        ]
+        if not records:
+            return np.empty(0, dtype=np.int64)
+        records.sort(key=lambda r: r.row)
+        return np.concatenate([np.arange(r.row, r.row + r.n_rows) for r in records])
+
+    def _score_rows(
+        self,
+        queries: Sequence[str],
+        e_queries: np.ndarray,
+        k: int,
+        rows: np.ndarray | None = None,
+    ) -> list[list[MemoryItemRelevance]]:
+        """
+        Scores the given embedding rows (default: all) against each of the queries,
+        and returns the top-k memories among them per query. `rows` must hold all
+        rows of the memories involved, in segment order.
+        """
+        row_memory_ids = np.frombuffer(self._row_memory_ids, dtype=np.int64)
+        row_chunks = np.frombuffer(self._row_chunks, dtype=np.int32)
+        if rows is None:
+            row_memory_ids = row_memory_ids.copy()
+            row_chunks = row_chunks.copy()
+        else:
+            row_memory_ids = row_memory_ids[rows]
+            row_chunks = row_chunks[rows]
+        live_rows = row_memory_ids != self.DEAD_ROW
+        scores = self._search_scores(e_queries, rows)
+        scores[~live_rows] = -np.inf
+
+        # Rows of a memory are contiguous and start with its summary row,
+        # so the aggregate (max) score per memory can be reduced in one go
+        memory_rows = np.flatnonzero(live_rows & (row_chunks == self.SUMMARY_ROW))
+        memory_scores = np.maximum.reduceat(scores, memory_rows, axis=0)
+        memory_ids = row_memory_ids[memory_rows]
+        return [
+            self._top_k(query, e_query, k, memory_ids, memory_scores[:, i])
+            for i, (query, e_query) in enumerate(zip(queries, e_queries))
+        ]
+
+    def _search_scores(
+        self, e_query: np.ndarray, rows: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        Scores the given embedding rows (default: all) in the search dtype, against
+        one query embedding or a matrix of them (one score column per query)
+        """
+        if not self.quantized:
+            embeddings = self.embeddings if rows is None else self.embeddings[rows]
+            return np.asarray(embeddings @ e_query.T)
+
+        quantized = self.quantized_embeddings
+        n_rows = len(quantized) if rows is None else len(rows)
+        scores = np.empty((n_rows, *e_query.shape[:-1]), dtype=np.float32)
+        # numpy has no fast matrix product for float16 and int8,
+        # so the rows are converted to float32 one block at a time
+        for start in range(0, n_rows, self.SCORING_BLOCK_ROWS):
+            block = slice(start, start + self.SCORING_BLOCK_ROWS)
+            block_rows = quantized[block] if rows is None else quantized[rows[block]]
+            scores[block] = block_rows.astype(np.float32) @ e_query.T
+        if self.search_dtype == np.int8:
+            scales = self.scales if rows is None else self.scales[rows]
+            scores *= scales.reshape(-1, *[1] * (scores.ndim - 1))
+        return scores
+
+    def _top_k(
+        self,
+        query: str,
+        e_query: np.ndarray,
+        k: int,
+        memory_ids: np.ndarray,
+        memory_scores: np.ndarray,
+    ) -> list[MemoryItemRelevance]:
+        """
+        Returns the top-k of the given memories by their scores, with exact relevance
+        scores. If the scores were computed on quantized embeddings, the top
+        `rescore_factor` * k memories are re-ranked by their exact scores first.
+        """
+        n_candidates = k * max(1, self.rescore_factor) if self.quantized else k
+        n_candidates = min(n_candidates, len(memory_ids))
+        top = np.argpartition(-memory_scores, n_candidates - 1)[:n_candidates]
+        top = top[np.argsort(-memory_scores[top], kind="stable")]
+
+        results = [self._relevance(query, e_query, int(id)) for id in memory_ids[top]]
+        if n_candidates > k:
+            results.sort(key=lambda r: r.score, reverse=True)
+        return results[:k]
+
+    def _relevance(
+        self, query: str, e_query: np.ndarray, id: int
+    ) -> MemoryItemRelevance:
+        """Scores the memory with the given ID against the query in float32"""
+        record, memory = self.entries[id]
+        scores = np.asarray(
+            self.embeddings[record.row : record.row + record.n_rows] @ e_query
+        )
+        return MemoryItemRelevance(
+            memory_item=memory,
+            for_query=query,
+            summary_relevance_score=float(scores[0]),
+            chunk_relevance_scores=scores[1:].tolist(),
+        )
+
+    def get_stats(self) -> tuple[int, int]:
+        """
+        Returns:
+            tuple (n_memories: int, n_chunks: int): the stats of the memory index
+        """
+        return len(self), sum(r.n_rows - 1 for r, _ in self.entries.values())
+
+    def load_index(self):
+        """Loads all memories by replaying the log and mapping the embedding segment"""
+        logger.debug(f"Loading memories from segment directory '{self.path}'")
+
+        header = None
+        items: dict[int, tuple[SegmentRecord, dict]] = {}
+        with self.log_path.open("r+b") as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Cut off the partial record left behind by an interrupted write
+                    logger.warn(f"Truncating incomplete record in {self.log_path}")
+                    f.truncate(offset)
+                    break
+                offset += len(line)
+
+                try:
+                    entry = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    logger.warn(f"Skipping unreadable record in {self.log_path}")
+                    continue
+
+                match entry["op"]:
+                    case "header":
+                        header = entry
+                    case "add":
+                        content_offset, content_length = entry.get("content", (0, 0))
+                        record = SegmentRecord(
+                            id=entry["id"],
+                            generation=0,  # known once the header has been read
+                            row=entry["row"],
+                            n_rows=entry["n_rows"],
+                            content_offset=content_offset,
+                            content_length=content_length,
+                            content_hash=entry.get("content_hash", ""),
+                        )
+                        items[record.id] = (record, entry)
+                        self._next_id = max(self._next_id, record.id + 1)
+                    case "discard":
+                        items.pop(entry["id"], None)
+
+        if header is None:
+            if items:
+                raise ValueError(f"{self.log_path} has no header record")
+            self.clear()
+            return
+        if header["version"] not in (1, self.FORMAT_VERSION):
+            raise ValueError(f"Unsupported segment format version {header['version']}")
+        self.generation = header["generation"]
+        self.dimensions = header["dimensions"]
+
+        row_size = self.dimensions * np.dtype(self.EMBEDDING_DTYPE).itemsize
+        segment_size = self.embeddings_path.stat().st_size
+        self._n_rows = segment_size // row_size
+        if segment_size % row_size:
+            # Cut off the partial row left behind by an interrupted write
+            with self.embeddings_path.open("r+b") as f:
+                f.truncate(self._n_rows * row_size)
+
+        self.content_path.touch()
+        content_size = self.content_path.stat().st_size
+        if self.quantized:
+            self._sync_quantized_segments()
+
+        self._row_memory_ids = array("q", [self.DEAD_ROW]) * self._n_rows
+        self._row_chunks = array("i", [self.SUMMARY_ROW]) * self._n_rows
+        embeddings = self.embeddings
+        for record, entry in items.values():
+            record.generation = self.generation
+            if record.row + record.n_rows > self._n_rows:
+                raise ValueError(f"Record {record.id} refers to missing embeddings")
+            e_summary = embeddings[record.row]
+            e_chunks = embeddings[record.row + 1 : record.row + record.n_rows]
+            if header["version"] == 1:
+                memory = MemoryItem(
+                    **entry["item"], e_summary=e_summary, e_chunks=e_chunks
+                )
+            elif record.content_offset + record.content_length > content_size:
+                raise ValueError(f"Record {record.id} refers to missing content")
+            else:
+                memory = LazyMemoryItem(
+                    partial(self._read_content, record.id),
+                    summary=entry["summary"],
+                    e_summary=e_summary,
+                    e_chunks=e_chunks,
+                    metadata=entry["metadata"],
+                    content_hash=record.content_hash,
+                )
+            self._index_rows(record)
+            self.entries[record.id] = (record, memory)
+            self._index_memory(record.id, memory)
+        self._n_dead_rows = self._n_rows - sum(r.n_rows for r, _ in items.values())
+        self._remove_stale_segments()
+
+        if header["version"] == 1:
+            logger.info(f"Migrating memory segments in {self.path} to the new format")
+            self.compact()
+
+    def compact(self):
+        """Rewrites the segments, leaving out the records of discarded memories.
+
+        The compacted embeddings are written to a segment of the next generation, and
+        the log is replaced atomically to switch over to it.
+        """
+        logger.debug(
+            f"Compacting memory segments: {self._n_dead_rows} of {self._n_rows} "
+            "embedding rows are no longer referenced"
+        )
+        entries = self.entries
+        self.generation += 1
+        self._reset_state()
+        # Lazily loaded memories read their content through their current record,
+        # which is only replaced once the memory has been rewritten
+        self.entries = entries
+
+        tmp_log_path = self.log_path.with_suffix(".tmp")
+        with self._open_segments("wb", log_path=tmp_log_path) as files:
+            for id, (_, memory) in list(entries.items()):
+                self._write_item(memory, files, id=id)
+        os.replace(tmp_log_path, self.log_path)
+        self._remove_stale_segments()
+
+    def _reset_state(self) -> None:
+        self.entries = {}
+        self.dimensions: int | None = None
+        self._embeddings: np.ndarray | None = None
+        self._quantized: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+        self._row_memory_ids = array("q")
+        self._row_chunks = array("i")
+        self._metadata_index = MetadataIndex()
+        self._by_source: defaultdict[tuple[str, str], set[int]] = defaultdict(set)
+        self._by_hash: defaultdict[str, set[int]] = defaultdict(set)
+        self._next_id = 0
+        self._n_rows = 0
+        self._n_dead_rows = 0
+
+    def _find_by_source(self, source_type: str, location: str) -> MemoryItem | None:
+        ids = self._by_source.get((source_type, location))
+        # The last added memory of the source, if several were added with `add`
+        return self.entries[max(ids)][1] if ids else None
+
+    def _find_id(self, item: MemoryItem) -> int | None:
+        """Returns the ID of the stored memory that is (equal to) the given item"""
+        candidates = self._by_hash.get(item.content_hash, set())
+        # Prefer an identity match over the (expensive) MemoryItem.__eq__
+        for id in candidates:
+            if self.entries[id][1] is item:
+                return id
+        return next((id for id in candidates if self.entries[id][1] == item), None)
+
+    def _index_memory(self, id: int, memory: MemoryItem) -> None:
+        self._metadata_index.add(id, memory.metadata)
+        self._by_hash[memory.content_hash].add(id)
+        if memory.source is not None:
+            self._by_source[memory.source].add(id)
+
+    def _unindex_memory(self, id: int, memory: MemoryItem) -> None:
+        self._metadata_index.remove(id, memory.metadata)
+        self._by_hash[memory.content_hash].discard(id)
+        if not self._by_hash[memory.content_hash]:
+            del self._by_hash[memory.content_hash]
+        if memory.source is not None:
+            self._by_source[memory.source].discard(id)
+            if not self._by_source[memory.source]:
+                del self._by_source[memory.source]
+
+    def _index_rows(self, record: SegmentRecord) -> None:
+        """Maps the embedding rows of the given record to its memory and chunks"""
+        for i in range(record.n_rows):
+            self._row_memory_ids[record.row + i] = record.id
+            self._row_chunks[record.row + i] = i - 1  # first row is SUMMARY_ROW
+
+    def _map_segment(
+        self, path: Path, dtype: np.dtype, dimensions: int | None = None
+    ) -> np.ndarray:
+        shape = (self._n_rows,) if dimensions is None else (self._n_rows, dimensions)
+        if not self._n_rows:
+            return np.empty((0,) + shape[1:], dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+    def _segment_paths(self) -> list[Path]:
+        """The data segments of the current generation"""
+        segments = [self.embeddings_path, self.content_path]
+        if self.quantized:
+            segments.append(self.quantized_path)
+        if self.search_dtype == np.int8:
+            segments.append(self.scales_path)
+        return segments
+
+    @contextlib.contextmanager
+    def _open_segments(
+        self, mode: str, log_path: Path | None = None
+    ) -> Iterator[SegmentFiles]:
+        log_path = log_path or self.log_path
+        with contextlib.ExitStack() as stack:
+            files = SegmentFiles(
+                log=stack.enter_context(log_path.open(mode)),
+                embeddings=stack.enter_context(self.embeddings_path.open(mode)),
+                content=stack.enter_context(self.content_path.open(mode)),
+            )
+            if self.quantized:
+                files.quantized = stack.enter_context(self.quantized_path.open(mode))
+            if self.search_dtype == np.int8:
+                files.scales = stack.enter_context(self.scales_path.open(mode))
+            yield files
+
+    def _quantize(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray | None]:
+        """Converts float32 rows to the search dtype, with a scale per row for int8"""
+        if self.search_dtype != np.int8:
+            return rows.astype(self.search_dtype), None
+        scales = (np.abs(rows).max(axis=1) / 127).astype(np.float32)
+        quantized = np.rint(rows / np.where(scales > 0, scales, 1)[:, np.newaxis])
+        return quantized.astype(np.int8), scales
+
+    def _write_quantized_rows(
+        self, rows: np.ndarray, quantized_file: BinaryIO, scales_file: BinaryIO | None
+    ) -> None:
+        quantized, scales = self._quantize(rows)
+        quantized_file.write(quantized.tobytes())
+        quantized_file.flush()
+        if scales_file is not None:
+            scales_file.write(scales.tobytes())
+            scales_file.flush()
+
+    def _sync_quantized_segments(self) -> None:
+        """
+        Makes the quantized segments hold exactly the rows of the embedding segment,
+        converting the rows that they miss, e.g. after the search dtype was changed
+        """
+        row_sizes = {self.quantized_path: self.dimensions * self.search_dtype.itemsize}
+        if self.search_dtype == np.int8:
+            row_sizes[self.scales_path] = np.dtype(np.float32).itemsize
+        n_synced = self._n_rows
+        for path, row_size in row_sizes.items():
+            path.touch()
+            n_synced = min(n_synced, path.stat().st_size // row_size)
+        for path, row_size in row_sizes.items():
+            with path.open("r+b") as f:
+                f.truncate(n_synced * row_size)
+        if n_synced == self._n_rows:
+            return
+
+        logger.info(
+            f"Converting {self._n_rows - n_synced} embedding rows in {self.path} "
+            f"to {self.search_dtype}"
+        )
+        with contextlib.ExitStack() as stack:
+            quantized = stack.enter_context(self.quantized_path.open("ab"))
+            scales = (
+                stack.enter_context(self.scales_path.open("ab"))
+                if self.search_dtype == np.int8
+                else None
+            )
+            embeddings = self.embeddings
+            for start in range(n_synced, self._n_rows, self.SCORING_BLOCK_ROWS):
+                rows = np.asarray(embeddings[start : start + self.SCORING_BLOCK_ROWS])
+                self._write_quantized_rows(rows, quantized, scales)
+
+    def _content_path(self, generation: int) -> Path:
+        return self.path / f"content.{generation}.jsonl"
+
+    def _read_content(self, id: int) -> dict[str, Any]:
+        """Reads the content of the memory with the given ID from the content segment"""
+        if id not in self.entries:
+            raise LookupError(f"Memory {id} is no longer stored in {self.path}")
+        record, _ = self.entries[id]
+        with self._content_path(record.generation).open("rb") as f:
+            f.seek(record.content_offset)
+            return orjson.loads(f.read(record.content_length))
+
+    def _write_item(
+        self, item: MemoryItem, files: SegmentFiles, id: int | None = None
+    ) -> SegmentRecord:
+        e_summary = np.asarray(item.e_summary, dtype=self.EMBEDDING_DTYPE)
+        e_chunks = np.asarray(item.e_chunks, dtype=self.EMBEDDING_DTYPE).reshape(
+            -1, e_summary.shape[0]
+        )
+        if self.dimensions is None:
+            self.dimensions = e_summary.shape[0]
+            self._write_log_entry(
+                files.log,
+                {
+                    "op": "header",
+                    "version": self.FORMAT_VERSION,
+                    "generation": self.generation,
+                    "dimensions": self.dimensions,
+                },
+            )
+        elif e_summary.shape[0] != self.dimensions:
+            raise ValueError(
+                f"Embedding has {e_summary.shape[0]} dimensions; "
+                f"this index stores {self.dimensions}-dimensional embeddings"
+            )
+
+        content = orjson.dumps(
+            {field: getattr(item, field) for field in LazyMemoryItem.LAZY_FIELDS}
+        )
+        record = SegmentRecord(
+            id=self._next_id if id is None else id,
+            generation=self.generation,
+            row=self._n_rows,
+            n_rows=1 + len(e_chunks),
+            content_offset=files.content.seek(0, os.SEEK_END),
+            content_length=len(content),
+            content_hash=item.content_hash,
+        )
+        # Content and embeddings are written before the log record that references
+        # them, so an interrupted write leaves only unreferenced data behind
+        files.content.write(content + b"\n")
+        files.content.flush()
+        files.embeddings.write(e_summary.tobytes())
+        files.embeddings.write(e_chunks.tobytes())
+        files.embeddings.flush()
+        if files.quantized is not None:
+            self._write_quantized_rows(
+                np.vstack([e_summary, e_chunks]), files.quantized, files.scales
+            )
+        self._write_log_entry(
+            files.log,
+            {
+                "op": "add",
+                "id": record.id,
+                "row": record.row,
+                "n_rows": record.n_rows,
+                "content": [record.content_offset, record.content_length],
+                "summary": item.summary,
+                "metadata": item.metadata,
+                "content_hash": record.content_hash,
+            },
+        )
+
+        self._next_id = max(self._next_id, record.id + 1)
+        self._n_rows += record.n_rows
+        self._row_memory_ids.extend([self.DEAD_ROW] * record.n_rows)
+        self._row_chunks.extend([self.SUMMARY_ROW] * record.n_rows)
+        self._index_rows(record)
+        self.entries[record.id] = (record, item)
+        self._index_memory(record.id, item)
+        return record
+
+    def _write_log_entry(self, log: BinaryIO, entry: dict) -> None:
+        log.write(orjson.dumps(entry, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n")
+        log.flush()
+
+    def _remove_stale_segments(self) -> None:
+        """Removes segments that don't belong to the current generation"""
+        current = self._segment_paths()
+        for segment in [
+            *self.path.glob("embeddings.*"),
+            *self.path.glob("scales.*.f32"),
+            *self.path.glob("content.*.jsonl"),
+        ]:
+            if segment not in current:
+                # Segments may still be mapped by memories loaded from them,
+                # which prevents deleting them on some platforms
+                with contextlib.suppress(PermissionError):
+                    segment.unlink(missing_ok=True)
+        for segment in current:
+            segment.touch()
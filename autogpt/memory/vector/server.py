@@ -0,0 +1,253 @@
+"""
+Memory server: a long-lived process that owns the memory indexes, so that multiple
+agents can share one resident index through the `remote` memory backend.
+
+Clients connect over a Unix socket or a localhost TCP port (`MEMORY_SERVER_ADDRESS`)
+and call the methods of the server-side `VectorMemoryProvider` of their
+`memory_index`. Requests are executed one at a time and in order of arrival, by a
+single worker thread; relevance searches that arrive while the worker is busy are
+batched, so that their queries are embedded in one request and scored in one pass
+over the index.
+"""
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import os
+import queue
+import threading
+from collections import defaultdict
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from autogpt.config import Config
+from autogpt.logs import logger
+
+from . import get_memory
+from .memory_filter import MemoryFilter
+from .memory_item import LazyMemoryItem, MemoryItem, MemoryItemRelevance
+from .providers.base import VectorMemoryProvider
+from .providers.remote import memory_server_address, memory_server_authkey
+
+SERVED_METHODS = {
+    "__contains__",
+    "__len__",
+    "add",
+    "clear",
+    "discard",
+    "find",
+    "get_relevant",
+    "get_relevant_batch",
+    "get_stats",
+    "list",
+    "score_memories_for_relevance",
+    "upsert",
+}
+
+
+@dataclasses.dataclass
+class MemoryRequest:
+    """A method call of a client, and its response once it has been executed"""
+
+    index: str
+    method: str
+    args: tuple
+    response: tuple[bool, Any] | None = None
+    done: threading.Event = dataclasses.field(default_factory=threading.Event)
+
+    def respond(self, ok: bool, result: Any) -> None:
+        self.response = (ok, result)
+        self.done.set()
+
+
+class MemoryServer:
+    """
+    Serves the memory indexes in the workspace of the given config, in the backend
+    given by `memory_server_backend`, at `memory_server_address`.
+    """
+
+    MAX_BATCH_SIZE = 64
+    """Maximum number of requests that are taken from the queue at once"""
+
+    def __init__(self, config: Config) -> None:
+        if config.memory_server_backend == "remote":
+            raise ValueError("The memory server can't use the remote memory backend")
+
+        self.config = config
+        self.address = memory_server_address(config)
+        self.authkey = memory_server_authkey(config)
+        if not isinstance(self.address, str) and not self.authkey:
+            raise ValueError(
+                "Set MEMORY_SERVER_AUTHKEY to serve memory on a TCP port, "
+                "or use a Unix socket"
+            )
+        self.indexes: dict[str, VectorMemoryProvider] = {}
+        self._requests: queue.Queue[MemoryRequest] = queue.Queue()
+        self._listener: Listener | None = None
+        self._stopped = threading.Event()
+
+    def serve_forever(self) -> None:
+        """Accepts connections until `shutdown` is called"""
+        if isinstance(self.address, str):
+            # Remove the socket left behind by a server that wasn't shut down cleanly
+            Path(self.address).unlink(missing_ok=True)
+            # Only the user that runs the server may connect to its socket
+            umask = os.umask(0o177)
+            try:
+                self._listener = Listener(self.address, authkey=self.authkey)
+            finally:
+                os.umask(umask)
+        else:
+            self._listener = Listener(self.address, authkey=self.authkey)
+        logger.info(f"Memory server listening at {self.address}")
+
+        threading.Thread(target=self._process_requests, daemon=True).start()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    connection = self._listener.accept()
+                except (OSError, EOFError) as e:
+                    if not self._stopped.is_set():
+                        logger.warn(f"Rejected memory client connection: {e}")
+                    continue
+                threading.Thread(
+                    target=self._serve_connection, args=(connection,), daemon=True
+                ).start()
+        finally:
+            self._listener.close()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        # Wake up the accept() call in serve_forever
+        with contextlib.suppress(Exception):
+            Client(self.address, authkey=self.authkey).close()
+
+    def _serve_connection(self, connection: Connection) -> None:
+        """Queues the requests of one client, and sends back the responses"""
+        with connection:
+            while True:
+                try:
+                    index, method, args = connection.recv()
+                except (EOFError, OSError):
+                    return
+                request = MemoryRequest(index, method, args)
+                self._requests.put(request)
+                request.done.wait()
+                try:
+                    connection.send(request.response)
+                except (OSError, ValueError):
+                    return
+                except Exception as e:
+                    # The result or error could not be pickled
+                    connection.send((False, RuntimeError(str(e))))
+
+    def _process_requests(self) -> None:
+        while True:
+            requests = [self._requests.get()]
+            with contextlib.suppress(queue.Empty):
+                while len(requests) < self.MAX_BATCH_SIZE:
+                    requests.append(self._requests.get_nowait())
+            self._process_batch(requests)
+
+    def _process_batch(self, requests: list[MemoryRequest]) -> None:
+        """
+        Executes the requests in order, except that consecutive relevance searches
+        in the same index with the same k and filter are executed as one batch
+        """
+        searches: defaultdict[
+            tuple[str, int, MemoryFilter | None], list[MemoryRequest]
+        ] = defaultdict(list)
+        for request in requests:
+            if request.method == "get_relevant" and len(request.args) == 3:
+                query, k, filter = request.args
+                searches[(request.index, k, filter)].append(request)
+                continue
+            self._search(searches)
+            searches.clear()
+            self._execute(request)
+        self._search(searches)
+
+    def _search(
+        self,
+        searches: dict[tuple[str, int, MemoryFilter | None], list[MemoryRequest]],
+    ) -> None:
+        for (index, k, filter), requests in searches.items():
+            if len(requests) == 1:
+                self._execute(requests[0])
+                continue
+
+            logger.debug(f"Searching {index} for a batch of {len(requests)} queries")
+            try:
+                results = self._get_index(index).get_relevant_batch(
+                    [r.args[0] for r in requests], k, self.config, filter
+                )
+                responses = [(True, _transferable(result)) for result in results]
+            except Exception as e:
+                responses = [(False, e)] * len(requests)
+            for request, response in zip(requests, responses):
+                request.respond(*response)
+
+    def _execute(self, request: MemoryRequest) -> None:
+        try:
+            if request.method not in SERVED_METHODS:
+                raise ValueError(f"Unknown memory server method '{request.method}'")
+            memory = self._get_index(request.index)
+            match request.method:
+                case "list":
+                    result = list(memory)
+                case "get_relevant" | "get_relevant_batch":
+                    result = getattr(memory, request.method)(
+                        *request.args[:2], self.config, *request.args[2:]
+                    )
+                case "score_memories_for_relevance":
+                    result = memory.score_memories_for_relevance(
+                        request.args[0], self.config, *request.args[1:]
+                    )
+                case _:
+                    result = getattr(memory, request.method)(*request.args)
+            response = True, _transferable(result)
+        except Exception as e:
+            response = False, e
+        request.respond(*response)
+
+    def _get_index(self, index: str) -> VectorMemoryProvider:
+        if index not in self.indexes:
+            logger.info(f"Loading memory index '{index}'")
+            self.indexes[index] = get_memory(
+                self.config.copy(
+                    update={
+                        "memory_backend": self.config.memory_server_backend,
+                        "memory_index": index,
+                    }
+                )
+            )
+        return self.indexes[index]
+
+
+def _transferable(result: Any) -> Any:
+    """
+    Converts the MemoryItems in a result to plain MemoryItems that can be sent
+    to a client: lazy items hold a reference to their memory backend
+    """
+    if isinstance(result, list):
+        return [_transferable(r) for r in result]
+    if isinstance(result, MemoryItemRelevance):
+        return dataclasses.replace(
+            result, memory_item=_transferable(result.memory_item)
+        )
+    if isinstance(result, LazyMemoryItem):
+        return MemoryItem(
+            raw_content=result.raw_content,
+            summary=result.summary,
+            chunks=result.chunks,
+            chunk_summaries=result.chunk_summaries,
+            e_summary=np.array(result.e_summary),
+            e_chunks=[np.array(e) for e in result.e_chunks],
+            metadata=result.metadata,
+            how_to_summarize=result.how_to_summarize,
+            question_for_summary=result.question_for_summary,
+        )
+    return result
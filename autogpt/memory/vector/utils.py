@@ -1,8 +1,15 @@
+import functools
+import hashlib
+import sqlite3
+import unicodedata
 from contextlib import suppress
+from pathlib import Path
 from typing import Any, overload
 
 import numpy as np
+import orjson
 
+from autogpt.cache import PersistentCache
 from autogpt.config import Config
 from autogpt.llm.base import TText
 from autogpt.llm.providers import openai as iopenai
@@ -27,6 +34,10 @@ def get_embedding(
 ) -> Embedding | list[Embedding]:
     """Get an embedding from the ada model.
 
+    Embeddings are cached on disk, keyed by model and normalized input (see
+    `_normalize_text`), so that inputs that have been embedded before don't need
+    another API call. See `get_embedding_cache`.
+
     Args:
         input: Input text to get embeddings for, encoded as a string or array of tokens.
             Multiple inputs may be given as a list of strings or token arrays.
@@ -48,24 +59,86 @@ def get_embedding(
         with suppress(NotImplementedError):
             return [_get_embedding_with_plugin(i, config) for i in input]
 
+    inputs = input if multiple else [input]
+    cache = get_embedding_cache(config)
+    if cache is None:
+        embeddings = _create_embeddings(inputs, config)
+        return embeddings if multiple else embeddings[0]
+
+    model = config.embedding_model
+    keys = [_embedding_cache_key(model, i) for i in inputs]
+    cached = cache.get_many(keys)
+    missing = {key: i for key, i in zip(keys, inputs) if key not in cached}
+    if missing:
+        new_embeddings = {
+            key: np.asarray(embedding, dtype=np.float32).tobytes()
+            for key, embedding in zip(
+                missing, _create_embeddings(list(missing.values()), config)
+            )
+        }
+        cache.set_many(new_embeddings)
+        cached.update(new_embeddings)
+    logger.debug(
+        f"Embedding cache: {len(inputs) - len(missing)} of {len(inputs)} hits; "
+        f"{cache.hits} hits, {cache.misses} misses in total"
+    )
+
+    # Copied, because arrays on the buffers of the cached bytes are read-only
+    embeddings = [np.frombuffer(cached[key], dtype=np.float32).copy() for key in keys]
+    return embeddings if multiple else embeddings[0]
+
+
+def get_embedding_cache(config: Config) -> PersistentCache | None:
+    """Returns the embedding cache, or None if it is disabled or unavailable"""
+    if config.embedding_cache_size <= 0 or config.workdir is None:
+        return None
+    return _open_embedding_cache(
+        Path(config.workdir) / "data" / "embedding_cache.sqlite3",
+        config.embedding_cache_size,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _open_embedding_cache(path: Path, max_entries: int) -> PersistentCache | None:
+    try:
+        return PersistentCache(path, max_entries)
+    except (sqlite3.Error, OSError) as e:
+        logger.warn(f"Could not open embedding cache {path}, not caching: {e}")
+        return None
+
+
+def _normalize_text(text: str) -> str:
+    """
+    Normalizes the Unicode composition and the whitespace of a text, so that variants
+    of a text that differ only in those share their cached embedding
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def _embedding_cache_key(model: str, input: str | TText) -> str:
+    if isinstance(input, str):
+        input = _normalize_text(input)
+    return hashlib.sha256(orjson.dumps([model, input])).hexdigest()
+
+
+def _create_embeddings(
+    inputs: list[str] | list[TText], config: Config
+) -> list[Embedding]:
     model = config.embedding_model
     kwargs = {"model": model}
     kwargs.update(config.get_openai_credentials(model))
 
     logger.debug(
-        f"Getting embedding{f's for {len(input)} inputs' if multiple else ''}"
+        f"Getting embedding{f's for {len(inputs)} inputs' if len(inputs) > 1 else ''}"
         f" with model '{model}'"
         + (f" via Azure deployment '{kwargs['engine']}'" if config.use_azure else "")
     )
 
     embeddings = iopenai.create_embedding(
-        input,
+        inputs,
         **kwargs,
     ).data
 
-    if not multiple:
-        return embeddings[0]["embedding"]
-
     embeddings = sorted(embeddings, key=lambda x: x["index"])
     return [d["embedding"] for d in embeddings]
 
@@ -1,17 +1,104 @@
 """Text processing functions"""
-from math import ceil
-from typing import Optional
-
+import hashlib
+import re
+import sqlite3
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import accumulate
+from math import ceil, log
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import orjson
 import spacy
-import tiktoken
 
+from autogpt.cache import PersistentCache
 from autogpt.config import Config
 from autogpt.llm.base import ChatSequence
 from autogpt.llm.providers.openai import OPEN_AI_MODELS
-from autogpt.llm.utils import count_string_tokens, create_chat_completion
+from autogpt.llm.rate_limiter import RateLimiter
+from autogpt.llm.utils import count_string_tokens, create_chat_completion, get_encoding
 from autogpt.logs import logger
 from autogpt.utils import batch
 
+SENTENCE_BLOCK_CHARS = 100_000
+"""Number of characters of a text that is segmented into sentences at a time"""
+
+PASSAGE_MAX_TOKENS = 128
+"""Longer sentences are split into passages when ranking them for relevance"""
+
+
+@lru_cache(maxsize=None)
+def load_sentence_segmenter(
+    model: str, sentencizer_only: bool = False
+) -> spacy.language.Language:
+    """
+    Returns the spaCy pipeline that splits texts into sentences. Pipelines are loaded
+    once per process.
+
+    Args:
+        model (str): The spaCy language model, e.g. "en_core_web_sm"
+        sentencizer_only (bool): Only use the rule-based sentencizer, with the
+            tokenizer of the model's language, instead of loading the whole model
+    """
+    if sentencizer_only:
+        nlp = spacy.blank(model.split("_")[0])
+    else:
+        nlp = spacy.load(model)
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
+def iter_sentences(
+    text: str,
+    nlp: spacy.language.Language,
+    block_chars: int = SENTENCE_BLOCK_CHARS,
+) -> Iterator[str]:
+    """
+    Splits a text into sentences, and yields them as they are found. The text is
+    segmented one block of about `block_chars` characters at a time, so a huge text
+    is never held as a whole spaCy Doc.
+
+    Args:
+        text (str): The text to split
+        nlp (Language): The spaCy pipeline, see `load_sentence_segmenter`
+        block_chars (int): The number of characters to segment at a time
+
+    Yields:
+        str: The next sentence, stripped of surrounding whitespace
+    """
+    for start, end in iter_sentence_spans(text, nlp, block_chars):
+        yield text[start:end].strip()
+
+
+def iter_sentence_spans(
+    text: str,
+    nlp: spacy.language.Language,
+    block_chars: int = SENTENCE_BLOCK_CHARS,
+) -> Iterator[tuple[int, int]]:
+    """Like `iter_sentences`, but yields the (start, end) offsets of the sentences"""
+    start = 0  # of the current block
+    read = 0  # end of the text that has been read into blocks
+    while read < len(text):
+        end = min(read + block_chars, len(text))
+        if end < len(text):
+            # don't cut words in half
+            space = text.rfind(" ", read, end)
+            if space > read:
+                end = space
+        read = end
+
+        sentences = list(nlp(text[start:end]).sents)
+        next_start = end
+        if sentences and end < len(text) and end - start < 2 * block_chars:
+            # the last sentence may continue in the next block
+            next_start = start + sentences.pop().start_char
+        for sentence in sentences:
+            yield start + sentence.start_char, start + sentence.end_char
+        start = next_start
+
 
 def _max_chunk_length(model: str, max: Optional[int] = None) -> int:
     model_max_input_tokens = OPEN_AI_MODELS[model].max_tokens - 1
@@ -38,16 +125,16 @@ def chunk_content(
 
     MAX_OVERLAP = 200  # limit overlap to save tokens
 
-    if not must_chunk_content(content, for_model, max_chunk_length):
-        yield content, count_string_tokens(content, for_model)
-        return
-
-    max_chunk_length = max_chunk_length or _max_chunk_length(for_model)
+    max_chunk_length = _max_chunk_length(for_model, max_chunk_length)
 
-    tokenizer = tiktoken.encoding_for_model(for_model)
+    tokenizer = get_encoding(for_model)
 
     tokenized_text = tokenizer.encode(content)
     total_length = len(tokenized_text)
+    if total_length <= max_chunk_length:
+        yield content, total_length
+        return
+
     n_chunks = ceil(total_length / max_chunk_length)
 
     chunk_length = ceil(total_length / n_chunks)
@@ -62,14 +149,26 @@ def summarize_text(
     config: Config,
     instruction: Optional[str] = None,
     question: Optional[str] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    concurrency: Optional[int] = None,
 ) -> tuple[str, None | list[tuple[str, str]]]:
     """Summarize text using the OpenAI API
 
+    Text that doesn't fit in one request is split into chunks, which are summarized
+    concurrently (up to `concurrency` at a time). The chunk summaries
+    are then merged into one summary; see `_reduce_summaries`. If a question is given,
+    such a text is first cut down to the sentences that are most relevant to the
+    question, see `extract_relevant_text`.
+
     Args:
         text (str): The text to summarize
         config (Config): The config object
         instruction (str): Additional instruction for summarization, e.g. "focus on information related to polar bears", "omit personal information contained in the text"
         question (str): Question to answer in the summary
+        rate_limiter (RateLimiter): Limits the rate of the summarization requests.
+            Defaults to a limiter of `summarization_requests_per_minute`.
+        concurrency (int): Maximum number of summarization requests in flight at a
+            time. Defaults to `summarization_concurrency`.
 
     Returns:
         str: The summary of the text
@@ -90,7 +189,8 @@ def summarize_text(
             "Do not directly answer the question itself"
         )
 
-    summarization_prompt = ChatSequence.for_model(model)
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(config.summarization_requests_per_minute)
 
     token_length = count_string_tokens(text, model)
     logger.info(f"Text length: {token_length} tokens")
@@ -99,47 +199,256 @@ def summarize_text(
     max_chunk_length = _max_chunk_length(model) - 550
     logger.info(f"Max chunk length: {max_chunk_length} tokens")
 
-    if not must_chunk_content(text, model, max_chunk_length):
-        # summarization_prompt.add("user", text)
-        summarization_prompt.add(
-            "user",
-            "Write a concise summary of the following text"
-            f"{f'; {instruction}' if instruction is not None else ''}:"
-            "\n\n\n"
-            f'LITERAL TEXT: """{text}"""'
-            "\n\n\n"
-            "CONCISE SUMMARY: The text is best summarized as"
-            # "Only respond with a concise summary or description of the user message."
+    if (
+        question
+        and token_length > max_chunk_length
+        and config.summarization_extract_max_tokens > 0
+    ):
+        text = extract_relevant_text(
+            text, question, model, config, config.summarization_extract_max_tokens
         )
+        token_length = count_string_tokens(text, model)
+        logger.info(f"Length of the text relevant to the question: {token_length}")
 
-        logger.debug(f"Summarizing with {model}:\n{summarization_prompt.dump()}\n")
-        summary = create_chat_completion(
-            prompt=summarization_prompt, config=config, temperature=0, max_tokens=500
-        ).content
-
-        logger.debug(f"\n{'-'*16} SUMMARY {'-'*17}\n{summary}\n{'-'*42}\n")
-        return summary.strip(), None
+    if token_length <= max_chunk_length:
+        return _summarize(text, config, instruction, rate_limiter), None
 
-    summaries: list[str] = []
     chunks = list(
         split_text(
             text, for_model=model, config=config, max_chunk_length=max_chunk_length
         )
     )
 
-    for i, (chunk, chunk_length) in enumerate(chunks):
-        logger.info(
-            f"Summarizing chunk {i + 1} / {len(chunks)} of length {chunk_length} tokens"
+    if concurrency is None:
+        concurrency = config.summarization_concurrency
+
+    with ThreadPoolExecutor(max(1, concurrency)) as executor:
+        logger.info(f"Summarizing {len(chunks)} chunks")
+        summaries = list(
+            executor.map(
+                lambda chunk: _summarize(chunk[0], config, instruction, rate_limiter),
+                chunks,
+            )
+        )
+        logger.info(f"Summarized {len(chunks)} chunks")
+
+        summary = _reduce_summaries(
+            summaries, config, max_chunk_length, rate_limiter, executor
+        )
+    return summary, [(summaries[i], chunks[i][0]) for i in range(0, len(chunks))]
+
+
+def _summarize(
+    text: str, config: Config, instruction: Optional[str], rate_limiter: RateLimiter
+) -> str:
+    """
+    Summarizes text that fits in one request. Summaries are cached on disk, keyed by
+    model, instruction and text, see `get_summary_cache`.
+    """
+    model = config.fast_llm
+    cache = get_summary_cache(config)
+    cache_key = _summary_cache_key(model, instruction, text)
+    if cache is not None and (cached := cache.get(cache_key)) is not None:
+        logger.debug(
+            f"Summary cache hit; {cache.hits} hits, {cache.misses} misses in total"
+        )
+        return cached.decode()
+
+    summarization_prompt = ChatSequence.for_model(model)
+    summarization_prompt.add(
+        "user",
+        "Write a concise summary of the following text"
+        f"{f'; {instruction}' if instruction is not None else ''}:"
+        "\n\n\n"
+        f'LITERAL TEXT: """{text}"""'
+        "\n\n\n"
+        "CONCISE SUMMARY: The text is best summarized as"
+        # "Only respond with a concise summary or description of the user message."
+    )
+
+    logger.debug(f"Summarizing with {model}:\n{summarization_prompt.dump()}\n")
+    rate_limiter.wait()
+    summary = create_chat_completion(
+        prompt=summarization_prompt, config=config, temperature=0, max_tokens=500
+    ).content
+
+    logger.debug(f"\n{'-'*16} SUMMARY {'-'*17}\n{summary}\n{'-'*42}\n")
+    summary = summary.strip()
+    if cache is not None:
+        cache.set(cache_key, summary.encode())
+    return summary
+
+
+def get_summary_cache(config: Config) -> PersistentCache | None:
+    """Returns the summary cache, or None if it is disabled or unavailable"""
+    if config.summary_cache_size <= 0 or config.workdir is None:
+        return None
+    return _open_summary_cache(
+        Path(config.workdir) / "data" / "summary_cache.sqlite3",
+        config.summary_cache_size,
+        config.summary_cache_ttl or None,
+    )
+
+
+@lru_cache(maxsize=None)
+def _open_summary_cache(
+    path: Path, max_entries: int, max_age: Optional[int]
+) -> PersistentCache | None:
+    try:
+        return PersistentCache(path, max_entries, max_age)
+    except (sqlite3.Error, OSError) as e:
+        logger.warn(f"Could not open summary cache {path}, not caching: {e}")
+        return None
+
+
+def _summary_cache_key(model: str, instruction: Optional[str], text: str) -> str:
+    # the question of a summary is part of its instruction
+    return hashlib.sha256(
+        orjson.dumps([model, instruction, hashlib.sha256(text.encode()).hexdigest()])
+    ).hexdigest()
+
+
+def _reduce_summaries(
+    summaries: list[str],
+    config: Config,
+    max_chunk_length: int,
+    rate_limiter: RateLimiter,
+    executor: Executor,
+) -> str:
+    """
+    Summarizes the summaries of the chunks of a text into one summary.
+
+    As long as the summaries don't fit in one request together, they are merged in
+    groups that do, concurrently, so the summaries are reduced in a tree of depth
+    O(log(number of chunks)) instead of one after another.
+    """
+    model = config.fast_llm
+    separator_length = count_string_tokens("\n\n", model)
+    while True:
+        groups: list[list[str]] = [[]]
+        group_length = 0
+        for summary in summaries:
+            length = count_string_tokens(summary, model) + separator_length
+            if groups[-1] and group_length + length > max_chunk_length:
+                groups.append([])
+                group_length = 0
+            groups[-1].append(summary)
+            group_length += length
+
+        if len(groups) == 1:
+            return _summarize("\n\n".join(summaries), config, None, rate_limiter)
+        if len(groups) == len(summaries):
+            raise ValueError("Chunk summaries are too long to be summarized together")
+
+        logger.info(f"Merging {len(summaries)} summaries in {len(groups)} groups")
+        summaries = list(
+            executor.map(
+                lambda group: _summarize(
+                    "\n\n".join(group), config, None, rate_limiter
+                ),
+                groups,
+            )
         )
-        summary, _ = summarize_text(chunk, config, instruction)
-        summaries.append(summary)
 
-    logger.info(f"Summarized {len(chunks)} chunks")
 
-    summary, _ = summarize_text("\n\n".join(summaries), config)
-    return summary.strip(), [
-        (summaries[i], chunks[i][0]) for i in range(0, len(chunks))
-    ]
+def extract_relevant_text(
+    text: str, question: str, for_model: str, config: Config, max_tokens: int
+) -> str:
+    """
+    Cuts a text down to the sentences that are most relevant to a question, without
+    using an LLM. Sentences are ranked by their BM25 score for the terms of the
+    question, and the best ones are kept, in their original order, until `max_tokens`
+    tokens are reached. Left out parts of the text are marked with "...".
+
+    Args:
+        text (str): The text to cut down
+        question (str): The question that the sentences should be relevant to
+        for_model (str): The model to count tokens for
+        config (Config): The config object
+        max_tokens (int): The maximum length of the result
+
+    Returns:
+        str: The relevant part of the text, or the whole text if it isn't longer
+            than `max_tokens`
+    """
+    tokenizer = get_encoding(for_model)
+    tokens = tokenizer.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+
+    nlp = load_sentence_segmenter(
+        config.browse_spacy_language_model, config.browse_spacy_sentencizer_only
+    )
+    # sentences without punctuation can be as long as the text, so cut them up
+    ranges = list(
+        _chop_long_ranges(
+            _sentence_token_ranges(text, tokenizer.decode_tokens_bytes(tokens), nlp),
+            PASSAGE_MAX_TOKENS,
+            PASSAGE_MAX_TOKENS,
+        )
+    )
+    sentences = [tokenizer.decode(tokens[start:end]) for start, end in ranges]
+    scores = _bm25_scores(
+        _terms(question), [_terms(sentence) for sentence in sentences]
+    )
+
+    kept: list[int] = []
+    n_tokens = 0
+    # ties, e.g. sentences without any term of the question, keep their order
+    for i in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+        start, end = ranges[i]
+        if n_tokens + end - start <= max_tokens:
+            kept.append(i)
+            n_tokens += end - start
+
+    kept.sort()
+    parts = [] if kept and kept[0] == 0 else ["..."]
+    for previous, i in zip([None, *kept], kept):
+        if previous is not None and i > previous + 1:
+            parts.append("...")
+        parts.append(sentences[i].strip())
+    if kept and kept[-1] < len(sentences) - 1:
+        parts.append("...")
+    return " ".join(parts)
+
+
+def _terms(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def _bm25_scores(
+    query: list[str], documents: list[list[str]], k1: float = 1.2, b: float = 0.75
+) -> list[float]:
+    """Returns the Okapi BM25 score of each of the (tokenized) documents for a query"""
+    if not documents:
+        return []
+    average_length = sum(len(d) for d in documents) / len(documents) or 1
+    document_frequency = Counter(term for d in documents for term in set(d))
+    idf = {
+        term: log(
+            1
+            + (len(documents) - document_frequency[term] + 0.5)
+            / (document_frequency[term] + 0.5)
+        )
+        for term in set(query)
+        if document_frequency[term]
+    }
+
+    scores = []
+    for document in documents:
+        term_frequency = Counter(document)
+        length_norm = k1 * (1 - b + b * len(document) / average_length)
+        scores.append(
+            sum(
+                weight
+                * term_frequency[term]
+                * (k1 + 1)
+                / (term_frequency[term] + length_norm)
+                for term, weight in idf.items()
+                if term in term_frequency
+            )
+        )
+    return scores
 
 
 def split_text(
@@ -169,7 +478,10 @@ def split_text(
 
     # flatten paragraphs to improve performance
     text = text.replace("\n", " ")
-    text_length = count_string_tokens(text, for_model)
+    # the text is encoded once; sentences and chunks are slices of its tokens
+    tokenizer = get_encoding(for_model)
+    tokens = tokenizer.encode(text)
+    text_length = len(tokens)
 
     if text_length < max_length:
         yield text, text_length
@@ -178,67 +490,82 @@ def split_text(
     n_chunks = ceil(text_length / max_length)
     target_chunk_length = ceil(text_length / n_chunks)
 
-    nlp: spacy.language.Language = spacy.load(config.browse_spacy_language_model)
-    nlp.add_pipe("sentencizer")
-    doc = nlp(text)
-    sentences = [sentence.text.strip() for sentence in doc.sents]
+    nlp = load_sentence_segmenter(
+        config.browse_spacy_language_model, config.browse_spacy_sentencizer_only
+    )
+    sentences = _sentence_token_ranges(text, tokenizer.decode_tokens_bytes(tokens), nlp)
 
-    current_chunk: list[str] = []
-    current_chunk_length = 0
-    last_sentence = None
+    def chunk(start: int, end: int) -> tuple[str, int]:
+        return tokenizer.decode(tokens[start:end]).strip(), end - start
+
+    # the current chunk is tokens[chunk_start:chunk_end]
+    chunk_start = chunk_end = 0
     last_sentence_length = 0
 
-    i = 0
-    while i < len(sentences):
-        sentence = sentences[i]
-        sentence_length = count_string_tokens(sentence, for_model)
-        expected_chunk_length = current_chunk_length + 1 + sentence_length
+    for start, end in _chop_long_ranges(sentences, max_length, target_chunk_length):
+        sentence_length = end - start
+        expected_chunk_length = end - chunk_start
 
-        if (
+        if chunk_end == chunk_start or (
             expected_chunk_length < max_length
             # try to create chunks of approximately equal size
             and expected_chunk_length - (sentence_length / 2) < target_chunk_length
         ):
-            current_chunk.append(sentence)
-            current_chunk_length = expected_chunk_length
-
-        elif sentence_length < max_length:
-            if last_sentence:
-                yield " ".join(current_chunk), current_chunk_length
-                current_chunk = []
-                current_chunk_length = 0
-
-                if with_overlap:
-                    overlap_max_length = max_length - sentence_length - 1
-                    if last_sentence_length < overlap_max_length:
-                        current_chunk += [last_sentence]
-                        current_chunk_length += last_sentence_length + 1
-                    elif overlap_max_length > 5:
-                        # add as much from the end of the last sentence as fits
-                        current_chunk += [
-                            list(
-                                chunk_content(
-                                    last_sentence,
-                                    for_model,
-                                    overlap_max_length,
-                                )
-                            ).pop()[0],
-                        ]
-                        current_chunk_length += overlap_max_length + 1
-
-            current_chunk += [sentence]
-            current_chunk_length += sentence_length
-
-        else:  # sentence longer than maximum length -> chop up and try again
-            sentences[i : i + 1] = [
-                chunk
-                for chunk, _ in chunk_content(sentence, for_model, target_chunk_length)
-            ]
-            continue
+            chunk_end = end
+        else:
+            yield chunk(chunk_start, chunk_end)
+
+            # sentences are contiguous, so the overlap with the previous chunk
+            # is the end of the last sentence
+            overlap = 0
+            if with_overlap:
+                overlap_max_length = max_length - sentence_length - 1
+                if last_sentence_length < overlap_max_length:
+                    overlap = last_sentence_length
+                elif overlap_max_length > 5:
+                    # add as much from the end of the last sentence as fits
+                    overlap = overlap_max_length
+            chunk_start, chunk_end = start - overlap, end
 
-        i += 1
-        last_sentence = sentence
         last_sentence_length = sentence_length
 
-    if current_chunk:
-        yield " ".join(current_chunk), current_chunk_length
+    if chunk_end > chunk_start:
+        yield chunk(chunk_start, chunk_end)
+
+
+def _sentence_token_ranges(
+    text: str, token_bytes: list[bytes], nlp: spacy.language.Language
+) -> Iterator[tuple[int, int]]:
+    """
+    Yields the (start, end) token range of each sentence in a text, given the bytes
+    of the text's tokens. The ranges are contiguous and cover all tokens, including
+    the whitespace between sentences.
+    """
+    token_offsets = list(accumulate((len(b) for b in token_bytes), initial=0))
+    sentence_start = 0
+    char_offset = byte_offset = 0
+    for char_start, _ in iter_sentence_spans(text, nlp):
+        byte_offset += len(text[char_offset:char_start].encode("utf-8"))
+        char_offset = char_start
+        # the first token of the sentence is the one containing its first byte
+        boundary = bisect_right(token_offsets, byte_offset) - 1
+        if boundary > sentence_start:
+            yield sentence_start, boundary
+            sentence_start = boundary
+    if sentence_start < len(token_bytes):
+        yield sentence_start, len(token_bytes)
+
+
+def _chop_long_ranges(
+    ranges: Iterable[tuple[int, int]], max_length: int, piece_length: int
+) -> Iterator[tuple[int, int]]:
+    """Chops the token ranges of at least `max_length` tokens into equal pieces of at
+    most `piece_length` tokens"""
+    for start, end in ranges:
+        length = end - start
+        if length < max_length:
+            yield start, end
+            continue
+        size = ceil(length / ceil(length / piece_length))
+        for piece_start in range(start, end, size):
+            yield piece_start, min(piece_start + size, end)
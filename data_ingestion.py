@@ -1,11 +1,18 @@
 import argparse
 import logging
+import os
+from pathlib import Path
+from typing import Iterator
 
-from autogpt.commands.file_operations import ingest_file, list_files
+from autogpt.commands.file_operations import ingest_files
 from autogpt.config import ConfigBuilder
+from autogpt.llm.rate_limiter import set_model_rate_limits
 from autogpt.memory.vector import VectorMemory, get_memory
+from autogpt.workspace import Workspace
 
-config = ConfigBuilder.build_config_from_env()
+config = ConfigBuilder.build_config_from_env(workdir=Path(__file__).parent)
+config.workspace_path = Workspace.set_workspace_directory(config)
+set_model_rate_limits(config.openai_rate_limits)
 
 
 def configure_logging():
@@ -21,18 +28,26 @@ def configure_logging():
     return logging.getLogger("AutoGPT-Ingestion")
 
 
+def list_files(directory: str) -> Iterator[str]:
+    """Lists the non-hidden files in a directory recursively"""
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if not file.startswith("."):
+                yield os.path.join(root, file)
+
+
 def ingest_directory(directory: str, memory: VectorMemory, args):
     """
-    Ingest all files in a directory by calling the ingest_file function for each file.
+    Ingest all files in a directory. The files are summarized and embedded
+    concurrently; see `--concurrency` and `--requests_per_minute`.
 
     :param directory: The directory containing the files to ingest
     :param memory: An object with an add() method to store the chunks in memory
     """
     logger = logging.getLogger("AutoGPT-Ingestion")
     try:
-        files = list_files(directory)
-        for file in files:
-            ingest_file(file, memory, args.max_length, args.overlap)
+        n_ingested = ingest_files(list_files(directory), memory, config)
+        logger.info(f"Ingested {n_ingested} files from '{directory}'")
     except Exception as e:
         logger.error(f"Error while ingesting directory '{directory}': {str(e)}")
 
@@ -56,18 +71,39 @@ def main() -> None:
         default=False,
     )
     parser.add_argument(
-        "--overlap",
+        "--concurrency",
+        type=int,
+        help="The maximum number of concurrent API requests "
+        f"(default: {config.memory_ingestion_concurrency})",
+        default=config.memory_ingestion_concurrency,
+    )
+    parser.add_argument(
+        "--requests_per_minute",
+        type=int,
+        help="The maximum number of API requests per minute, 0 for no limit "
+        f"(default: {config.memory_ingestion_requests_per_minute})",
+        default=config.memory_ingestion_requests_per_minute,
+    )
+    parser.add_argument(
+        "--parse_workers",
         type=int,
-        help="The overlap size between chunks when ingesting files (default: 200)",
-        default=200,
+        help="The number of processes that extract the text of files, "
+        "0 to extract it in this process "
+        f"(default: {config.memory_ingestion_parse_workers})",
+        default=config.memory_ingestion_parse_workers,
     )
     parser.add_argument(
-        "--max_length",
+        "--parse_timeout",
         type=int,
-        help="The max_length of each chunk when ingesting files (default: 4000)",
-        default=4000,
+        help="The maximum number of seconds to extract the text of a file, "
+        f"0 for no limit (default: {config.memory_ingestion_parse_timeout})",
+        default=config.memory_ingestion_parse_timeout,
     )
     args = parser.parse_args()
+    config.memory_ingestion_concurrency = args.concurrency
+    config.memory_ingestion_requests_per_minute = args.requests_per_minute
+    config.memory_ingestion_parse_workers = args.parse_workers
+    config.memory_ingestion_parse_timeout = args.parse_timeout
 
     # Initialize memory
     memory = get_memory(config)
@@ -77,13 +113,20 @@ def main() -> None:
 
     if args.file:
         try:
-            ingest_file(args.file, memory, args.max_length, args.overlap)
-            logger.info(f"File '{args.file}' ingested successfully.")
+            if ingest_files(
+                [str(config.workspace_path / args.file)],
+                memory,
+                config,
+                raise_errors=True,
+            ):
+                logger.info(f"File '{args.file}' ingested successfully.")
+            else:
+                logger.info(f"File '{args.file}' is unchanged, skipped it.")
         except Exception as e:
             logger.error(f"Error while ingesting file '{args.file}': {str(e)}")
     elif args.dir:
         try:
-            ingest_directory(args.dir, memory, args)
+            ingest_directory(str(config.workspace_path / args.dir), memory, args)
             logger.info(f"Directory '{args.dir}' ingested successfully.")
         except Exception as e:
             logger.error(f"Error while ingesting directory '{args.dir}': {str(e)}")
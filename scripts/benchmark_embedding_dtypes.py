@@ -0,0 +1,135 @@
+"""
+Benchmarks the recall and memory use of the embedding dtypes (`MEMORY_EMBEDDING_DTYPE`)
+of the `segment_file` memory backend.
+
+The memories are read from a `json_file` memory index (`--index`), so the benchmark
+runs on real MemoryItems; without one, synthetic clustered embeddings are used.
+Queries are the chunk embeddings of randomly chosen memories, mixed with noise.
+
+For every dtype and `MEMORY_RESCORE_FACTOR`, the script reports the size of the
+embedding segment that is scanned by a search, the median query latency, and the
+recall@k against an exact float32 search.
+
+Usage: python -m scripts.benchmark_embedding_dtypes [--index auto-gpt-memory.json]
+"""
+import argparse
+import logging
+import statistics
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import numpy as np
+import orjson
+
+import autogpt.memory.vector.memory_item as vector_memory_item
+import autogpt.memory.vector.providers.segment_file as segment_file_memory
+from autogpt.config import ConfigBuilder
+from autogpt.logs import logger
+from autogpt.memory.vector import MemoryItem, SegmentFileMemory
+
+from .benchmark_vector_memory import make_embeddings, make_memories
+
+
+def load_memories(args: argparse.Namespace) -> list[MemoryItem]:
+    if args.index:
+        memories = [MemoryItem(**m) for m in orjson.loads(args.index.read_bytes())]
+        print(f"Loaded {len(memories)} memories from {args.index}")
+        return memories
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dimensions))
+    n_rows = args.memories * (args.chunks_per_memory + 1)
+    embeddings = make_embeddings(rng, centers, n_rows, args.noise)
+    print(f"Generated {args.memories} synthetic memories")
+    return list(make_memories(embeddings, args.chunks_per_memory))
+
+
+def make_queries(memories: list[MemoryItem], args: argparse.Namespace) -> np.ndarray:
+    rng = np.random.default_rng(args.seed + 1)
+    queries = []
+    for i in rng.integers(0, len(memories), args.queries):
+        chunks = np.asarray(memories[i].e_chunks, dtype=np.float32)
+        query = chunks[rng.integers(0, len(chunks))]
+        query = query + args.query_noise * rng.standard_normal(query.shape) / np.sqrt(
+            len(query)
+        )
+        queries.append(query / np.linalg.norm(query))
+    return np.array(queries, dtype=np.float32)
+
+
+def search(memory: SegmentFileMemory, e_query: np.ndarray, k: int, config):
+    with mock.patch.object(
+        segment_file_memory, "get_embedding", return_value=e_query.tolist()
+    ):
+        start = time.perf_counter()
+        results = memory.get_relevant("query", k, config)
+        latency = time.perf_counter() - start
+    return [r.memory_item.summary for r in results], latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--index", type=Path, help="a json_file memory index")
+    parser.add_argument("--dtypes", nargs="+", default=["float32", "float16", "int8"])
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--query-noise", type=float, default=0.5)
+    parser.add_argument("--memories", type=int, default=20_000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--chunks-per-memory", type=int, default=4)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--noise", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logger.set_level(logging.WARNING)
+    memories = load_memories(args)
+    queries = make_queries(memories, args)
+
+    with (
+        TemporaryDirectory() as workdir,
+        mock.patch.object(vector_memory_item, "get_embedding"),
+    ):
+        config = ConfigBuilder.build_config_from_env(Path(workdir))
+        config.workspace_path = Path(workdir)
+
+        exact = None
+        for dtype in args.dtypes:
+            config.memory_index = f"benchmark-{dtype}"
+            config.memory_embedding_dtype = dtype
+            memory = SegmentFileMemory(config)
+            for item in memories:
+                memory.add(item)
+            segment = (
+                memory.quantized_path if memory.quantized else memory.embeddings_path
+            )
+            segment_size = segment.stat().st_size
+            if dtype == "int8":
+                segment_size += memory.scales_path.stat().st_size
+
+            for rescore_factor in args.rescore_factors if memory.quantized else [1]:
+                memory.rescore_factor = rescore_factor
+                results, latencies = zip(
+                    *(search(memory, q, args.k, config) for q in queries)
+                )
+                if exact is None:
+                    if dtype != "float32":
+                        parser.error("the first of --dtypes must be float32")
+                    exact = [set(r) for r in results]
+                recall = statistics.mean(
+                    len(exact[i].intersection(r)) / len(exact[i])
+                    for i, r in enumerate(results)
+                )
+                print(
+                    f"  {dtype:>7} (rescore x{rescore_factor}): "
+                    f"{segment_size / 2**20:8.1f} MiB scanned, "
+                    f"{1000 * statistics.median(latencies):7.2f} ms/query, "
+                    f"recall@{args.k} = {recall:.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmarks the approximate search of the `ivf_file` memory backend against the
+brute force search of the `json_file` memory backend.
+
+For every index size, both backends are filled with the same synthetic, clustered
+embeddings and queried with the same queries. The script reports the median query
+latency of both backends and the recall@k of `ivf_file` for each `nprobe` value,
+i.e. the fraction of the exact top-k memories that the approximate search returns.
+
+Usage: python -m scripts.benchmark_vector_memory [--sizes 10000 100000 1000000]
+"""
+import argparse
+import logging
+import statistics
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import numpy as np
+
+import autogpt.memory.vector.memory_item as vector_memory_item
+import autogpt.memory.vector.providers.base as memory_provider_base
+import autogpt.memory.vector.providers.ivf_file as ivf_file_memory
+import autogpt.memory.vector.providers.segment_file as segment_file_memory
+from autogpt.config import ConfigBuilder
+from autogpt.logs import logger
+from autogpt.memory.vector import IVFFileMemory, JSONFileMemory, MemoryItem
+
+
+def make_embeddings(
+    rng: np.random.Generator, centers: np.ndarray, n: int, noise: float
+) -> np.ndarray:
+    vectors = centers[rng.integers(0, len(centers), n)]
+    vectors = vectors + noise * rng.standard_normal(vectors.shape)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def make_memories(embeddings: np.ndarray, chunks_per_memory: int):
+    rows_per_memory = chunks_per_memory + 1
+    for i in range(len(embeddings) // rows_per_memory):
+        rows = embeddings[i * rows_per_memory : (i + 1) * rows_per_memory]
+        yield MemoryItem(
+            raw_content=f"memory {i}",
+            summary=f"summary {i}",
+            chunks=[f"chunk {i}.{j}" for j in range(chunks_per_memory)],
+            chunk_summaries=[f"chunk {i}.{j}" for j in range(chunks_per_memory)],
+            e_summary=rows[0],
+            e_chunks=list(rows[1:]),
+            metadata={"location": f"{i}.txt"},
+        )
+
+
+def timed_search(memory, query: str, e_query: np.ndarray, k: int, config):
+    e_query = e_query.tolist()  # get_embedding() returns a list for a single text
+    with (
+        mock.patch.object(memory_provider_base, "get_embedding", return_value=e_query),
+        mock.patch.object(segment_file_memory, "get_embedding", return_value=e_query),
+        mock.patch.object(ivf_file_memory, "get_embedding", return_value=e_query),
+    ):
+        start = time.perf_counter()
+        results = memory.get_relevant(query, k, config)
+        latency = time.perf_counter() - start
+    return [r.memory_item.raw_content for r in results], latency
+
+
+def benchmark(n_chunks: int, args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dimensions))
+    n_rows = n_chunks // args.chunks_per_memory * (args.chunks_per_memory + 1)
+    embeddings = make_embeddings(rng, centers, n_rows, args.noise)
+    queries = make_embeddings(rng, centers, args.queries, args.noise)
+
+    with (
+        TemporaryDirectory() as workdir,
+        mock.patch.object(vector_memory_item, "get_embedding"),
+    ):
+        config = ConfigBuilder.build_config_from_env(Path(workdir))
+        config.workspace_path = Path(workdir)
+        config.memory_index = "benchmark"
+
+        # Filling the list directly avoids re-saving the JSON file on every add
+        brute_force = JSONFileMemory(config)
+        brute_force.memories.extend(make_memories(embeddings, args.chunks_per_memory))
+
+        start = time.perf_counter()
+        ivf = IVFFileMemory(config)
+        for memory in make_memories(embeddings, args.chunks_per_memory):
+            ivf.add(memory)
+        if ivf.centroids is None:
+            ivf.train()
+        print(
+            f"\n{n_chunks} chunks, {len(ivf)} memories: ingested and trained "
+            f"{ivf.n_lists} clusters in {time.perf_counter() - start:.1f}s"
+        )
+
+        exact, latencies = [], []
+        for i, e_query in enumerate(queries):
+            result, latency = timed_search(
+                brute_force, f"q{i}", e_query, args.k, config
+            )
+            exact.append(set(result))
+            latencies.append(latency)
+        print(
+            f"  json_file (brute force): "
+            f"{1000 * statistics.median(latencies):8.2f} ms/query"
+        )
+
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            recalls, latencies = [], []
+            for i, e_query in enumerate(queries):
+                result, latency = timed_search(ivf, f"q{i}", e_query, args.k, config)
+                recalls.append(len(exact[i].intersection(result)) / len(exact[i]))
+                latencies.append(latency)
+            print(
+                f"  ivf_file (nprobe={nprobe:>4}): "
+                f"{1000 * statistics.median(latencies):8.2f} ms/query, "
+                f"recall@{args.k} = {statistics.mean(recalls):.3f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--chunks-per-memory", type=int, default=4)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--noise", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logger.set_level(logging.WARNING)
+    for n_chunks in args.sizes:
+        benchmark(n_chunks, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock
+
+import numpy
+import pytest
+from pytest_mock import MockerFixture
+
+from autogpt.config import Config
+from autogpt.memory.vector.utils import get_embedding, get_embedding_cache
+
+
+@pytest.fixture
+def mock_create_embedding(mocker: MockerFixture, embedding_dimension: int):
+    def create_embedding(input: list[str], **kwargs):
+        return MagicMock(
+            data=[
+                {"index": i, "embedding": [float(len(text))] * embedding_dimension}
+                for i, text in enumerate(input)
+            ]
+        )
+
+    return mocker.patch(
+        "autogpt.memory.vector.utils.iopenai.create_embedding",
+        side_effect=create_embedding,
+    )
+
+
+def test_get_embedding_uses_cache(config: Config, mock_create_embedding: MagicMock):
+    embedding = get_embedding("some text", config)
+    assert get_embedding("some text", config) == pytest.approx(embedding)
+    assert mock_create_embedding.call_count == 1
+
+    cache = get_embedding_cache(config)
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_get_embedding_cache_normalizes_text(
+    config: Config, mock_create_embedding: MagicMock
+):
+    embedding = get_embedding("caf\u00e9  au\nlait ", config)
+    assert get_embedding("cafe\u0301 au lait", config) == pytest.approx(embedding)
+    assert mock_create_embedding.call_count == 1
+    # Only the cache key is normalized, the embedded text keeps its whitespace
+    assert mock_create_embedding.call_args.args[0] == ["caf\u00e9  au lait "]
+
+
+def test_get_embedding_returns_writable_arrays(
+    config: Config, mock_create_embedding: MagicMock
+):
+    get_embedding("some text", config)
+    embedding = get_embedding("some text", config)
+    embedding /= 2
+    assert get_embedding("some text", config)[0] == pytest.approx(2 * embedding[0])
+
+
+def test_get_embedding_multiple_only_fetches_missing(
+    config: Config, mock_create_embedding: MagicMock
+):
+    get_embedding("a", config)
+    embeddings = get_embedding(["a", "bb", "ccc", "bb"], config)
+
+    assert mock_create_embedding.call_count == 2
+    assert mock_create_embedding.call_args.args[0] == ["bb", "ccc"]
+    assert [e[0] for e in embeddings] == [1, 2, 3, 2]
+    assert all(e.dtype == numpy.float32 for e in embeddings)
+
+
+def test_get_embedding_cache_is_keyed_by_model(
+    config: Config, mock_create_embedding: MagicMock, mocker: MockerFixture
+):
+    get_embedding("some text", config)
+    mocker.patch.object(config, "embedding_model", "other-embedding-model")
+    get_embedding("some text", config)
+    assert mock_create_embedding.call_count == 2
+
+
+def test_get_embedding_cache_disabled(
+    config: Config, mock_create_embedding: MagicMock, mocker: MockerFixture
+):
+    mocker.patch.object(config, "embedding_cache_size", 0)
+    assert get_embedding_cache(config) is None
+
+    get_embedding("some text", config)
+    get_embedding("some text", config)
+    assert mock_create_embedding.call_count == 2
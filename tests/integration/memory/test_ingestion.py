@@ -0,0 +1,262 @@
+import threading
+import time
+
+import numpy
+import pytest
+from pytest_mock import MockerFixture
+
+import autogpt.memory.vector.ingestion as ingestion
+from autogpt.config import Config
+from autogpt.memory.vector import (
+    IngestionPipeline,
+    JSONFileMemory,
+    MemoryDocument,
+    MemoryItem,
+    hash_content,
+)
+from autogpt.memory.vector.ingestion import RateLimiter
+
+
+@pytest.fixture
+def mock_text_processing(mocker: MockerFixture):
+    """Splits texts on "|" and summarizes by upper-casing, without using an LLM"""
+    mocker.patch.object(
+        ingestion,
+        "split_text",
+        side_effect=lambda text, *_: [(chunk, len(chunk)) for chunk in text.split("|")],
+    )
+    mocker.patch.object(
+        ingestion, "count_string_tokens", side_effect=lambda text, _: len(text)
+    )
+    return mocker.patch.object(
+        ingestion,
+        "summarize_text",
+        side_effect=lambda text, *_, **__: (text.upper(), None),
+    )
+
+
+@pytest.fixture
+def mock_embed(mocker: MockerFixture, embedding_dimension: int):
+    def embed(texts: list[str], config: Config):
+        return [numpy.full(embedding_dimension, len(t), numpy.float32) for t in texts]
+
+    return mocker.patch.object(ingestion, "get_embedding", side_effect=embed)
+
+
+def test_from_text(config: Config, mock_text_processing, mock_embed):
+    item = MemoryItem.from_text("one|two", "text_file", config, {"location": "a.txt"})
+
+    assert item.raw_content == "one|two"
+    assert item.chunks == ["one", "two"]
+    assert item.chunk_summaries == ["ONE", "TWO"]
+    assert item.summary == "ONE\n\nTWO"
+    assert [e[0] for e in item.e_chunks] == [3, 3]
+    assert item.e_summary[0] == len("ONE\n\nTWO")
+    assert item.metadata.pop("created_at") <= time.time()
+    assert item.content_hash == hash_content("one|two")
+    assert item.metadata == {"location": "a.txt", "source_type": "text_file"}
+
+
+def test_summarizes_within_pipeline_concurrency(
+    config: Config, mock_text_processing, mock_embed
+):
+    config.summarization_concurrency = 8
+    MemoryItem.from_text("one|two", "text_file", config)
+
+    # summarize_text must not start more requests in the pipeline's workers
+    assert all(
+        call.kwargs["concurrency"] == 1 for call in mock_text_processing.call_args_list
+    )
+
+
+def test_from_text_hashes_like_memory_item(
+    config: Config, mock_text_processing, mock_embed
+):
+    item = MemoryItem.from_text("one|two", "text_file", config, how_to_summarize="!")
+    assert item.content_hash == hash_content("one|two", "!")
+    assert item.content_hash == (
+        MemoryItem(
+            item.raw_content,
+            item.summary,
+            item.chunks,
+            item.chunk_summaries,
+            item.e_summary,
+            item.e_chunks,
+            item.metadata,
+            how_to_summarize="!",
+        ).content_hash
+    )
+
+
+def test_from_text_summarizes_text_relevant_to_question(
+    config: Config, mock_text_processing, mock_embed, mocker: MockerFixture
+):
+    mocker.patch.object(
+        ingestion, "extract_relevant_text", side_effect=lambda text, *_: "two"
+    )
+    item = MemoryItem.from_text(
+        "one|two|three", "webpage", config, question_for_summary="Which one?"
+    )
+
+    # The whole text is chunked and embedded, but only the relevant part summarized
+    assert item.raw_content == "one|two|three"
+    assert item.chunks == ["one", "two", "three"]
+    assert len(item.e_chunks) == 3
+    assert item.summary == "TWO"
+    assert item.chunk_summaries == []
+    assert mock_text_processing.call_count == 1
+
+
+def test_from_text_single_chunk(config: Config, mock_text_processing, mock_embed):
+    item = MemoryItem.from_text("one", "text_file", config)
+
+    assert item.summary == item.chunk_summaries[0] == "ONE"
+    assert mock_text_processing.call_count == 1
+
+
+def test_from_text_raises_errors(config: Config, mock_text_processing, mock_embed):
+    mock_text_processing.side_effect = RuntimeError("LLM unavailable")
+    with pytest.raises(RuntimeError):
+        MemoryItem.from_text("one", "text_file", config)
+
+
+def test_process_batches_embeddings(
+    config: Config, mock_text_processing, mock_embed, mocker: MockerFixture
+):
+    documents = [
+        MemoryDocument(f"doc {i} a|doc {i} b", "text_file", {"location": f"{i}.txt"})
+        for i in range(10)
+    ]
+    mocker.patch.object(IngestionPipeline, "MAX_BATCH_INPUTS", 8)
+
+    items = list(IngestionPipeline(config, concurrency=4).process(documents))
+
+    assert [item.metadata["location"] for item in items] == [
+        f"{i}.txt" for i in range(10)
+    ]
+    assert all(item.chunks == item.raw_content.split("|") for item in items)
+    # All documents fit in one window: first the 20 chunks, then the 10 summaries
+    assert [len(call.args[0]) for call in mock_embed.call_args_list] == [8, 8, 4, 8, 2]
+
+
+def test_process_skips_failed_documents(
+    config: Config, mock_text_processing, mock_embed
+):
+    def summarize(text: str, *_, **__):
+        if "bad" in text:
+            raise RuntimeError("LLM unavailable")
+        return text, None
+
+    mock_text_processing.side_effect = summarize
+    documents = [
+        MemoryDocument("good 1", "text_file"),
+        MemoryDocument("bad|good", "text_file"),
+        MemoryDocument("good 2", "text_file"),
+    ]
+
+    items = list(IngestionPipeline(config).process(documents))
+    assert [item.raw_content for item in items] == ["good 1", "good 2"]
+
+
+def test_ingest_adds_to_memory(
+    config: Config, mock_text_processing, mock_embed, mocker: MockerFixture
+):
+    memory = mocker.Mock()
+    documents = [MemoryDocument(f"doc {i}", "text_file") for i in range(5)]
+
+    assert IngestionPipeline(config).ingest(documents, memory) == 5
+    assert [call.args[0].raw_content for call in memory.upsert.call_args_list] == [
+        f"doc {i}" for i in range(5)
+    ]
+
+
+def test_ingest_skips_unchanged_documents(
+    config: Config, mock_text_processing, mock_embed
+):
+    memory = JSONFileMemory(config)
+    pipeline = IngestionPipeline(config)
+    documents = [
+        MemoryDocument(f"doc {i}", "text_file", {"location": f"{i}.txt"})
+        for i in range(3)
+    ]
+    assert pipeline.ingest(documents, memory) == 3
+    mock_text_processing.reset_mock()
+
+    documents[1] = MemoryDocument("doc 1, edited", "text_file", {"location": "1.txt"})
+    assert pipeline.ingest(documents, memory) == 1
+    assert mock_text_processing.call_count == 1
+    assert [m.raw_content for m in memory] == ["doc 0", "doc 1, edited", "doc 2"]
+
+
+def test_ingest_skips_unchanged_documents_with_fixed_encoding(
+    config: Config, mock_text_processing, mock_embed
+):
+    memory = JSONFileMemory(config)
+    pipeline = IngestionPipeline(config)
+    text = "\u201cquoted\u201d"  # Stored with straight quotes by ftfy
+    document = MemoryDocument(text, "text_file", {"location": "a.txt"})
+    assert pipeline.ingest([document], memory) == 1
+    assert memory.find("text_file", "a.txt", hash_content(text))
+    mock_text_processing.reset_mock()
+    mock_embed.reset_mock()
+
+    document = MemoryDocument(text, "text_file", {"location": "a.txt"})
+    assert pipeline.ingest([document], memory) == 0
+    assert not mock_text_processing.called
+    assert not mock_embed.called
+
+
+def test_ingest_raises_errors(config: Config, mock_text_processing, mock_embed):
+    memory = JSONFileMemory(config)
+    pipeline = IngestionPipeline(config)
+    document = MemoryDocument("doc", "text_file", {"location": "a.txt"})
+    assert pipeline.ingest([document], memory, raise_errors=True) == 1
+    # Unchanged documents are skipped, not failed
+    assert pipeline.ingest([document], memory, raise_errors=True) == 0
+
+    mock_text_processing.side_effect = RuntimeError("LLM unavailable")
+    document = MemoryDocument("doc, edited", "text_file", {"location": "a.txt"})
+    assert pipeline.ingest([document], memory) == 0
+    with pytest.raises(RuntimeError):
+        pipeline.ingest([document], memory, raise_errors=True)
+
+
+def test_process_is_concurrent(
+    config: Config, mock_text_processing, mock_embed, mocker: MockerFixture
+):
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def slow_summary(text: str, *_, **__):
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return text, None
+
+    mock_text_processing.side_effect = slow_summary
+    documents = [MemoryDocument(f"doc {i}", "text_file") for i in range(8)]
+
+    assert len(list(IngestionPipeline(config, concurrency=4).process(documents))) == 8
+    assert max_running == 4
+
+
+def test_rate_limiter(mocker: MockerFixture):
+    sleep = mocker.patch.object(ingestion.time, "sleep")
+    mocker.patch.object(ingestion.time, "monotonic", return_value=100.0)
+
+    limiter = RateLimiter(requests_per_minute=120)
+    for _ in range(3):
+        limiter.wait()
+
+    assert [call.args[0] for call in sleep.call_args_list] == [0, 0.5, 1.0]
+
+
+def test_rate_limiter_unlimited(mocker: MockerFixture):
+    sleep = mocker.patch.object(ingestion.time, "sleep")
+    RateLimiter(requests_per_minute=0).wait()
+    sleep.assert_not_called()
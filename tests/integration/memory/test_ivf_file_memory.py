@@ -0,0 +1,286 @@
+# sourcery skip: snake-case-functions
+"""Tests for IVFFileMemory class"""
+import numpy
+import pytest
+from pytest_mock import MockerFixture
+
+import autogpt.memory.vector.providers.ivf_file as ivf_file_memory
+import autogpt.memory.vector.providers.segment_file as segment_file_memory
+from autogpt.config import Config
+from autogpt.memory.vector import (
+    IVFFileMemory,
+    MemoryFilter,
+    MemoryItem,
+    SegmentFileMemory,
+)
+
+
+@pytest.fixture(autouse=True)
+def small_training_threshold(mocker: MockerFixture):
+    mocker.patch.object(IVFFileMemory, "MIN_TRAINING_ROWS", 64)
+
+
+@pytest.fixture
+def random_embeddings(embedding_dimension: int):
+    def make(n: int, seed: int = 0):
+        rng = numpy.random.default_rng(seed)
+        centers = rng.standard_normal((8, embedding_dimension))
+        vectors = centers[rng.integers(0, 8, n)] + 0.3 * rng.standard_normal(
+            (n, embedding_dimension)
+        )
+        vectors /= numpy.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors.astype(numpy.float32)
+
+    return make
+
+
+@pytest.fixture
+def memory_items(random_embeddings) -> list[MemoryItem]:
+    embeddings = random_embeddings(3 * 40)
+    return [
+        MemoryItem(
+            raw_content=f"test content {i}",
+            summary=f"test content summary {i}",
+            chunks=[f"test chunk {i}.{j}" for j in range(2)],
+            chunk_summaries=[f"test chunk summary {i}.{j}" for j in range(2)],
+            e_summary=embeddings[3 * i],
+            e_chunks=[embeddings[3 * i + 1], embeddings[3 * i + 2]],
+            metadata={"location": f"{i}.txt"},
+        )
+        for i in range(40)
+    ]
+
+
+def relevant_items(index: SegmentFileMemory, query: str, k: int, config: Config):
+    return [r.memory_item for r in index.get_relevant(query, k, config)]
+
+
+def test_ivf_memory_untrained_until_threshold(
+    config: Config, memory_items: list[MemoryItem]
+):
+    index = IVFFileMemory(config)
+    for item in memory_items[:21]:
+        index.add(item)
+    assert index.centroids is None
+    assert not index.ivf_path.exists()
+
+    index.add(memory_items[21])
+    assert index.centroids is not None
+    assert index.n_lists == int(numpy.sqrt(66))
+    assert index.ivf_path.exists()
+
+
+def test_ivf_memory_get_relevant_matches_brute_force(
+    config: Config,
+    memory_items: list[MemoryItem],
+    random_embeddings,
+    mocker: MockerFixture,
+):
+    config.memory_ivf_nprobe = 1000  # probe all clusters -> exact search
+    index = IVFFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+    index.discard(memory_items[5])
+    assert index.centroids is not None
+
+    e_query = random_embeddings(1, seed=1)[0]
+    mocker.patch.object(ivf_file_memory, "get_embedding", return_value=e_query)
+    mocker.patch.object(segment_file_memory, "get_embedding", return_value=e_query)
+    relevant = index.get_relevant("query", 5, config)
+
+    expected = SegmentFileMemory.get_relevant(index, "query", 5, config)
+    assert [r.memory_item for r in relevant] == [r.memory_item for r in expected]
+    assert [r.score for r in relevant] == pytest.approx([r.score for r in expected])
+    assert memory_items[5] not in [r.memory_item for r in relevant]
+
+
+def test_ivf_memory_get_relevant_batch(
+    config: Config,
+    memory_items: list[MemoryItem],
+    random_embeddings,
+    mocker: MockerFixture,
+):
+    index = IVFFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+    assert index.centroids is not None
+
+    e_queries = random_embeddings(3, seed=1)
+    get_embedding = mocker.patch.object(
+        ivf_file_memory, "get_embedding", return_value=e_queries
+    )
+    results = index.get_relevant_batch(["q0", "q1", "q2"], 5, config)
+    get_embedding.assert_called_once()
+
+    for i, relevant in enumerate(results):
+        mocker.patch.object(ivf_file_memory, "get_embedding", return_value=e_queries[i])
+        expected = index.get_relevant(f"q{i}", 5, config)
+        assert [r.memory_item for r in relevant] == [r.memory_item for r in expected]
+
+
+def test_ivf_memory_quantized_get_relevant(
+    config: Config,
+    memory_items: list[MemoryItem],
+    random_embeddings,
+    mocker: MockerFixture,
+):
+    config.memory_embedding_dtype = "int8"
+    config.memory_ivf_nprobe = 1000
+    index = IVFFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+    assert index.centroids is not None
+
+    e_query = random_embeddings(1, seed=1)[0]
+    mocker.patch.object(ivf_file_memory, "get_embedding", return_value=e_query)
+    relevant = index.get_relevant("query", 5, config)
+
+    exact = sorted(
+        (max(numpy.dot(e, e_query) for e in [m.e_summary, *m.e_chunks]), i)
+        for i, m in enumerate(memory_items)
+    )[::-1][:5]
+    assert [r.memory_item for r in relevant] == [memory_items[i] for _, i in exact]
+    assert [r.score for r in relevant] == pytest.approx([s for s, _ in exact])
+
+
+def test_ivf_memory_get_relevant_filtered(
+    config: Config,
+    memory_items: list[MemoryItem],
+    random_embeddings,
+    mocker: MockerFixture,
+):
+    for i, item in enumerate(memory_items):
+        item.metadata["created_at"] = float(i)
+    config.memory_ivf_nprobe = 1
+    index = IVFFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+
+    e_query = random_embeddings(1, seed=1)[0]
+    mocker.patch.object(ivf_file_memory, "get_embedding", return_value=e_query)
+    mocker.patch.object(segment_file_memory, "get_embedding", return_value=e_query)
+    search = mocker.spy(index, "_search")
+
+    # Selective filters are searched exactly
+    filter = MemoryFilter(created_after=5, created_before=8)
+    relevant = index.get_relevant("query", 3, config, filter)
+    expected = SegmentFileMemory.get_relevant(index, "query", 3, config, filter)
+    assert [r.memory_item for r in relevant] == [r.memory_item for r in expected]
+    search.assert_not_called()
+
+    # Others only within the probed clusters
+    filter = MemoryFilter(created_after=10)
+    relevant = index.get_relevant("query", 3, config, filter)
+    search.assert_called_once()
+    assert relevant
+    assert all(filter.matches(r.memory_item.metadata) for r in relevant)
+
+
+def test_ivf_memory_nprobe_limits_candidates(
+    config: Config,
+    memory_items: list[MemoryItem],
+    mocker: MockerFixture,
+):
+    config.memory_ivf_nprobe = 1
+    index = IVFFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+
+    # A query equal to a stored summary must find that memory in its own cluster
+    mocker.patch.object(
+        ivf_file_memory, "get_embedding", return_value=memory_items[7].e_summary
+    )
+    relevant = index.get_relevant("query", 1, config)
+    assert relevant[0].memory_item == memory_items[7]
+    assert relevant[0].summary_relevance_score == pytest.approx(1)
+
+
+def test_ivf_memory_assigns_added_rows(
+    config: Config, memory_items: list[MemoryItem], mocker: MockerFixture
+):
+    config.memory_ivf_nprobe = 1
+    index = IVFFileMemory(config)
+    for item in memory_items[:30]:
+        index.add(item)
+    assert index.centroids is not None
+    n_training_rows = index._n_training_rows
+
+    index.add(memory_items[30])
+    assert index._n_training_rows == n_training_rows
+    assert len(index._row_lists) == index._n_rows
+    assert sum(len(rows) for rows in index._lists) == index._n_rows
+
+    mocker.patch.object(
+        ivf_file_memory, "get_embedding", return_value=memory_items[30].e_chunks[1]
+    )
+    assert relevant_items(index, "query", 1, config) == [memory_items[30]]
+
+
+def test_ivf_memory_load_index(
+    config: Config, memory_items: list[MemoryItem], mocker: MockerFixture
+):
+    config.memory_ivf_nprobe = 2
+    index = IVFFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+
+    reloaded = IVFFileMemory(config)
+    assert reloaded.memories == memory_items
+    assert numpy.array_equal(reloaded.centroids, index.centroids)
+    assert reloaded._row_lists == index._row_lists
+
+    mocker.patch.object(
+        ivf_file_memory, "get_embedding", return_value=memory_items[3].e_summary
+    )
+    assert relevant_items(reloaded, "q", 3, config) == relevant_items(
+        index, "q", 3, config
+    )
+
+
+def test_ivf_memory_load_index_trains_missing_index(
+    config: Config, memory_items: list[MemoryItem]
+):
+    index = IVFFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+    index.ivf_path.unlink()
+
+    reloaded = IVFFileMemory(config)
+    assert reloaded.centroids is not None
+    assert len(reloaded._row_lists) == reloaded._n_rows
+    assert reloaded.ivf_path.exists()
+
+
+def test_ivf_memory_compact(
+    config: Config, memory_items: list[MemoryItem], mocker: MockerFixture
+):
+    config.memory_ivf_nprobe = 1000
+    index = IVFFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+    old_ivf_path = index.ivf_path
+
+    for item in memory_items[:10]:
+        index.discard(item)
+    index.compact()
+    assert not old_ivf_path.exists()
+    assert index.ivf_path.exists()
+    assert sum(len(rows) for rows in index._lists) == index._n_rows == 30 * 3
+
+    mocker.patch.object(
+        ivf_file_memory, "get_embedding", return_value=memory_items[20].e_summary
+    )
+    assert relevant_items(index, "q", 1, config) == [memory_items[20]]
+    assert relevant_items(IVFFileMemory(config), "q", 1, config) == [memory_items[20]]
+
+
+def test_ivf_memory_clear(config: Config, memory_items: list[MemoryItem]):
+    index = IVFFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+    ivf_path = index.ivf_path
+
+    index.clear()
+    assert index.centroids is None
+    assert not ivf_path.exists()
+    assert len(IVFFileMemory(config)) == 0
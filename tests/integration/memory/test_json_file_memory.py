@@ -1,10 +1,14 @@
 # sourcery skip: snake-case-functions
 """Tests for JSONFileMemory class"""
+import dataclasses
+
+import numpy
 import orjson
 import pytest
 
+import autogpt.memory.vector.providers.base as memory_provider_base
 from autogpt.config import Config
-from autogpt.memory.vector import JSONFileMemory, MemoryItem
+from autogpt.memory.vector import JSONFileMemory, MemoryFilter, MemoryItem
 from autogpt.workspace import Workspace
 
 
@@ -50,6 +54,55 @@ def test_json_memory_add(config: Config, memory_item: MemoryItem):
     assert index.memories[0] == memory_item
 
 
+def test_json_memory_discard(config: Config, memory_item: MemoryItem):
+    index = JSONFileMemory(config)
+    index.add(memory_item)
+    assert memory_item in index
+
+    index.discard(memory_item)
+    assert memory_item not in index
+    assert len(JSONFileMemory(config)) == 0
+
+
+def test_json_memory_upsert(config: Config, memory_item: MemoryItem):
+    index = JSONFileMemory(config)
+    other = dataclasses.replace(
+        memory_item, raw_content="other content", metadata={"location": "b.txt"}
+    )
+    memory_item.metadata = {"source_type": "text_file", "location": "a.txt"}
+    index.add(memory_item)
+    index.add(other)
+
+    unchanged = dataclasses.replace(memory_item, summary="new summary")
+    assert index.upsert(unchanged) is memory_item
+    assert index.find("text_file", "a.txt", memory_item.content_hash) is memory_item
+
+    changed = dataclasses.replace(memory_item, raw_content="changed content")
+    assert index.upsert(changed) is changed
+    assert index.memories == [changed, other]
+    assert memory_item not in index
+    assert index.find("text_file", "a.txt", memory_item.content_hash) is None
+
+    assert JSONFileMemory(config).memories == [changed, other]
+
+
+def test_json_memory_upsert_after_discarding_same_source(
+    config: Config, memory_item: MemoryItem
+):
+    index = JSONFileMemory(config)
+    memory_item.metadata = {"source_type": "text_file", "location": "a.txt"}
+    other = dataclasses.replace(memory_item, raw_content="other content")
+    index.add(memory_item)
+    index.add(other)
+
+    index.discard(other)
+    assert index.find("text_file", "a.txt") is memory_item
+
+    changed = dataclasses.replace(memory_item, raw_content="changed content")
+    index.upsert(changed)
+    assert index.memories == [changed]
+
+
 def test_json_memory_clear(config: Config, memory_item: MemoryItem):
     index = JSONFileMemory(config)
     assert index.memories == []
@@ -73,6 +126,47 @@ def test_json_memory_get(config: Config, memory_item: MemoryItem, mock_get_embed
     assert retrieved.memory_item == memory_item
 
 
+def test_json_memory_get_filtered(
+    config: Config, memory_item: MemoryItem, mock_get_embedding
+):
+    index = JSONFileMemory(config)
+    memory_item.metadata = {"source_type": "webpage", "location": "https://a"}
+    index.add(memory_item)
+
+    assert index.get("test", config, MemoryFilter(source_type="text_file")) is None
+    retrieved = index.get("test", config, MemoryFilter(location="https://a"))
+    assert retrieved is not None
+    assert retrieved.memory_item == memory_item
+
+
+def test_json_memory_get_relevant_batch(
+    config: Config, memory_item: MemoryItem, embedding_dimension: int, mocker
+):
+    index = JSONFileMemory(config)
+    items = [
+        dataclasses.replace(memory_item, raw_content=f"content {i}", metadata={})
+        for i in range(3)
+    ]
+    for i, item in enumerate(items):
+        item.e_summary = numpy.eye(embedding_dimension)[i]
+        item.e_chunks = [item.e_summary]
+        index.add(item)
+
+    get_embedding = mocker.patch.object(
+        memory_provider_base,
+        "get_embedding",
+        side_effect=lambda queries, _: [
+            numpy.eye(embedding_dimension)[int(q)] for q in queries
+        ],
+    )
+    results = index.get_relevant_batch(["2", "0"], 2, config)
+
+    get_embedding.assert_called_once()
+    assert [r[0].memory_item for r in results] == [items[2], items[0]]
+    assert all(len(r) == 2 for r in results)
+    assert index.get_relevant_batch([], 2, config) == []
+
+
 def test_json_memory_load_index(config: Config, memory_item: MemoryItem):
     index = JSONFileMemory(config)
     index.add(memory_item)
@@ -0,0 +1,63 @@
+# sourcery skip: snake-case-functions
+"""Tests for MemoryFilter and MetadataIndex"""
+from autogpt.memory.vector.memory_filter import MemoryFilter, MetadataIndex
+
+HOUR = MetadataIndex.TIME_BUCKET_SECONDS
+
+METADATA = {
+    0: {"source_type": "webpage", "location": "https://a", "created_at": 0.5 * HOUR},
+    1: {"source_type": "text_file", "location": "a.txt", "created_at": 1.5 * HOUR},
+    2: {"source_type": "text_file", "location": "b.txt", "created_at": 2.5 * HOUR},
+    3: {"source_type": "agent_history"},
+}
+
+
+def make_index() -> MetadataIndex:
+    index = MetadataIndex()
+    for id, metadata in METADATA.items():
+        index.add(id, metadata)
+    return index
+
+
+def test_memory_filter_matches():
+    assert MemoryFilter().matches(METADATA[3])
+    assert MemoryFilter(source_type="text_file").matches(METADATA[1])
+    assert not MemoryFilter(source_type="webpage").matches(METADATA[1])
+    assert not MemoryFilter(source_type="text_file", location="b.txt").matches(
+        METADATA[1]
+    )
+    assert MemoryFilter(created_after=HOUR, created_before=2 * HOUR).matches(
+        METADATA[1]
+    )
+    assert not MemoryFilter(created_before=1.5 * HOUR).matches(METADATA[1])
+    # Memories without creation time never match a time range
+    assert not MemoryFilter(created_after=0).matches(METADATA[3])
+
+
+def test_metadata_index_candidates():
+    index = make_index()
+    assert index.candidates(MemoryFilter()) is None
+    assert index.candidates(MemoryFilter(source_type="text_file")) == {1, 2}
+    assert index.candidates(MemoryFilter(location="a.txt")) == {1}
+    assert (
+        index.candidates(MemoryFilter(source_type="webpage", location="a.txt")) == set()
+    )
+    assert index.candidates(MemoryFilter(location="missing.txt")) == set()
+
+
+def test_metadata_index_time_buckets():
+    index = make_index()
+    assert index.candidates(MemoryFilter(created_after=1.2 * HOUR)) == {1, 2}
+    assert index.candidates(MemoryFilter(created_before=1.2 * HOUR)) == {0, 1}
+    # Candidates include the whole edge buckets; MemoryFilter.matches is exact
+    assert index.candidates(
+        MemoryFilter(created_after=1.8 * HOUR, created_before=2.2 * HOUR)
+    ) == {1, 2}
+
+
+def test_metadata_index_remove():
+    index = make_index()
+    index.remove(1, METADATA[1])
+    assert index.candidates(MemoryFilter(source_type="text_file")) == {2}
+    assert "a.txt" not in index.locations
+    assert index.candidates(MemoryFilter(created_before=2 * HOUR)) == {0}
@@ -0,0 +1,186 @@
+# sourcery skip: snake-case-functions
+"""Tests for MemoryServer and the RemoteMemory client"""
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy
+import pytest
+from pytest_mock import MockerFixture
+
+import autogpt.memory.vector.providers.segment_file as segment_file_memory
+import autogpt.memory.vector.server as memory_server
+from autogpt.config import Config
+from autogpt.memory.vector import MemoryFilter, MemoryItem, RemoteMemory, get_memory
+from autogpt.memory.vector.server import MemoryRequest, MemoryServer
+
+
+@pytest.fixture
+def memory_items(embedding_dimension: int) -> list[MemoryItem]:
+    def one_hot(i: int):
+        e = numpy.zeros(embedding_dimension, numpy.float32)
+        e[i] = 1
+        return e
+
+    return [
+        MemoryItem(
+            raw_content=f"test content {i}",
+            summary=f"test content summary {i}",
+            chunks=[f"test content {i}"],
+            chunk_summaries=[f"test content summary {i}"],
+            e_summary=one_hot(i),
+            e_chunks=[one_hot(i)],
+            metadata={"source_type": "text_file", "location": f"{i}.txt"},
+        )
+        for i in range(4)
+    ]
+
+
+@pytest.fixture
+def mock_get_embedding(mocker: MockerFixture, embedding_dimension: int):
+    """Embeds the query "i" as the i-th unit vector"""
+
+    def embed(queries: str | list[str], _):
+        if isinstance(queries, str):
+            return numpy.eye(embedding_dimension, dtype=numpy.float32)[int(queries)]
+        return numpy.eye(embedding_dimension, dtype=numpy.float32)[
+            [int(q) for q in queries]
+        ]
+
+    return mocker.patch.object(segment_file_memory, "get_embedding", side_effect=embed)
+
+
+@pytest.fixture
+def server(config: Config):
+    # Unix socket paths are limited to ~100 characters, so keep it short
+    with tempfile.TemporaryDirectory() as socket_dir:
+        config.memory_server_address = str(Path(socket_dir) / "memory.sock")
+        server = MemoryServer(config)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        for _ in range(100):
+            if Path(config.memory_server_address).exists():
+                break
+            thread.join(0.01)
+        yield server
+        server.shutdown()
+        thread.join(5)
+
+
+def test_remote_memory_roundtrip(
+    server: MemoryServer,
+    config: Config,
+    memory_items: list[MemoryItem],
+    mock_get_embedding,
+):
+    config.memory_backend = "remote"
+    memory = get_memory(config)
+    assert isinstance(memory, RemoteMemory)
+
+    for item in memory_items:
+        memory.add(item)
+    assert len(memory) == 4
+    assert memory_items[1] in memory
+    assert list(memory) == memory_items
+    assert memory.get_stats() == (4, 4)
+
+    relevant = memory.get_relevant("2", 2, config)
+    assert relevant[0].memory_item == memory_items[2]
+    assert relevant[0].score == pytest.approx(1)
+    assert memory.get("1", config, MemoryFilter(location="3.txt")).memory_item == (
+        memory_items[3]
+    )
+
+    assert memory.find("text_file", "0.txt") == memory_items[0]
+    memory.discard(memory_items[0])
+    assert memory.find("text_file", "0.txt") is None
+    assert memory_items[0] not in memory
+
+    # The server keeps the index, in its own backend
+    assert server.indexes[config.memory_index].get_stats() == (3, 3)
+    other_client = RemoteMemory(config)
+    assert len(other_client) == 3
+    memory.clear()
+    assert len(other_client) == 0
+
+
+def test_remote_memory_raises_server_errors(server: MemoryServer, config: Config):
+    memory = RemoteMemory(config)
+    with pytest.raises(ValueError, match="Unknown memory server method"):
+        memory._call("compact")
+    assert len(memory) == 0
+
+
+def test_remote_memory_without_server(config: Config, tmp_path: Path):
+    config.memory_server_address = str(tmp_path / "missing.sock")
+    with pytest.raises(ConnectionError):
+        RemoteMemory(config)
+
+
+def test_memory_server_batches_searches(
+    config: Config,
+    memory_items: list[MemoryItem],
+    mock_get_embedding,
+    mocker: MockerFixture,
+):
+    server = MemoryServer(config)
+    requests = [MemoryRequest("index", "add", (item,)) for item in memory_items[:3]] + [
+        MemoryRequest("index", "get_relevant", (str(i), 1, None)) for i in range(3)
+    ]
+    requests.append(MemoryRequest("index", "add", (memory_items[3],)))
+    requests.append(MemoryRequest("index", "get_relevant", ("3", 1, None)))
+
+    get_relevant_batch = mocker.spy(
+        segment_file_memory.SegmentFileMemory, "get_relevant_batch"
+    )
+    server._process_batch(requests)
+
+    # The 3 consecutive searches are embedded and scored together,
+    # after the memories that were added before them
+    get_relevant_batch.assert_called_once()
+    assert all(r.response[0] for r in requests)
+    assert [r.response[1][0].memory_item for r in requests[3:6]] == memory_items[:3]
+    # The last search sees the memory that was added after the batch
+    assert requests[7].response[1][0].memory_item == memory_items[3]
+
+
+def test_memory_server_responds_with_conversion_errors(
+    config: Config,
+    memory_items: list[MemoryItem],
+    mock_get_embedding,
+    mocker: MockerFixture,
+):
+    server = MemoryServer(config)
+    server._process_batch([MemoryRequest("index", "add", (memory_items[0],))])
+    mocker.patch.object(
+        memory_server, "_transferable", side_effect=RuntimeError("not transferable")
+    )
+    requests = [MemoryRequest("index", "get_relevant", (i, 1, None)) for i in "01"]
+    requests.append(MemoryRequest("index", "list", ()))
+    server._process_batch(requests)
+
+    assert all(r.done.is_set() and not r.response[0] for r in requests)
+    assert all(isinstance(r.response[1], RuntimeError) for r in requests)
+
+
+@pytest.mark.parametrize("address", ["0.0.0.0:8765", "example.com:8765"])
+def test_memory_server_refuses_non_loopback_address(config: Config, address: str):
+    config.memory_server_address = address
+    config.memory_server_authkey = "secret"
+    with pytest.raises(ValueError, match="only listen on localhost"):
+        MemoryServer(config)
+
+
+def test_memory_server_refuses_tcp_without_authkey(config: Config):
+    config.memory_server_address = "127.0.0.1:8765"
+    config.memory_server_authkey = None
+    with pytest.raises(ValueError, match="MEMORY_SERVER_AUTHKEY"):
+        MemoryServer(config)
+
+    config.memory_server_authkey = "secret"
+    assert MemoryServer(config).address == ("127.0.0.1", 8765)
+
+
+def test_memory_server_socket_is_private(server: MemoryServer, config: Config):
+    mode = Path(config.memory_server_address).stat().st_mode
+    assert mode & 0o777 == 0o600
@@ -0,0 +1,474 @@
+# sourcery skip: snake-case-functions
+"""Tests for SegmentFileMemory class"""
+import dataclasses
+
+import numpy
+import orjson
+import pytest
+from pytest_mock import MockerFixture
+
+import autogpt.memory.vector.providers.segment_file as segment_file_memory
+from autogpt.config import Config
+from autogpt.memory.vector import MemoryFilter, MemoryItem, SegmentFileMemory
+from autogpt.memory.vector.memory_item import LazyMemoryItem
+
+
+@pytest.fixture
+def memory_items(mock_embedding) -> list[MemoryItem]:
+    return [
+        MemoryItem(
+            raw_content=f"test content {i}",
+            summary=f"test content summary {i}",
+            chunks=[f"test content {i}"],
+            chunk_summaries=[f"test content summary {i}"],
+            e_summary=mock_embedding * (i + 1),
+            e_chunks=[mock_embedding * (i + 1)],
+            metadata={"location": f"{i}.txt"},
+        )
+        for i in range(4)
+    ]
+
+
+def test_segment_memory_init_without_backing_files(config: Config):
+    index = SegmentFileMemory(config)
+    assert index.log_path.exists()
+    assert index.embeddings_path.exists()
+    assert len(index) == 0
+
+
+def test_segment_memory_add(config: Config, memory_item: MemoryItem):
+    index = SegmentFileMemory(config)
+    index.add(memory_item)
+    assert index.memories[0] == memory_item
+    assert index.embeddings_path.stat().st_size == 2 * memory_item.e_summary.nbytes
+
+
+def test_segment_memory_add_appends(config: Config, memory_items: list[MemoryItem]):
+    index = SegmentFileMemory(config)
+    index.add(memory_items[0])
+    log_head = index.log_path.read_bytes()
+    embeddings_head = index.embeddings_path.read_bytes()
+
+    index.add(memory_items[1])
+    assert index.log_path.read_bytes().startswith(log_head)
+    assert index.embeddings_path.read_bytes().startswith(embeddings_head)
+
+
+def test_segment_memory_load_index(config: Config, memory_items: list[MemoryItem]):
+    index = SegmentFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+
+    reloaded = SegmentFileMemory(config)
+    assert len(reloaded) == len(memory_items)
+    assert reloaded.memories == memory_items
+    # MemoryItem.__eq__ ignores the metadata and the content hash
+    for memory, item in zip(reloaded.memories, memory_items):
+        assert memory.metadata == item.metadata
+        assert memory.content_hash == item.content_hash
+
+
+def test_segment_memory_load_index_is_lazy(
+    config: Config, memory_items: list[MemoryItem]
+):
+    index = SegmentFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+
+    memory = SegmentFileMemory(config).memories[2]
+    assert isinstance(memory, LazyMemoryItem)
+    assert not {"raw_content", "chunks", "chunk_summaries"} & vars(memory).keys()
+    assert memory.summary == memory_items[2].summary
+    assert memory.raw_content == memory_items[2].raw_content
+    assert memory.chunks == memory_items[2].chunks
+    assert memory.chunk_summaries == memory_items[2].chunk_summaries
+    assert "raw_content" not in vars(memory)
+
+
+def test_segment_memory_migrates_version_1(
+    config: Config, memory_items: list[MemoryItem]
+):
+    index = SegmentFileMemory(config)
+    records = [{"op": "header", "version": 1, "generation": 0, "dimensions": 1536}]
+    with index.embeddings_path.open("wb") as emb:
+        for i, item in enumerate(memory_items):
+            emb.write(item.e_summary.tobytes() + item.e_chunks[0].tobytes())
+            records.append(
+                {
+                    "op": "add",
+                    "id": i,
+                    "row": 2 * i,
+                    "n_rows": 2,
+                    "item": {
+                        "raw_content": item.raw_content,
+                        "summary": item.summary,
+                        "chunks": item.chunks,
+                        "chunk_summaries": item.chunk_summaries,
+                        "metadata": item.metadata,
+                    },
+                }
+            )
+    index.log_path.write_bytes(b"".join(orjson.dumps(r) + b"\n" for r in records))
+
+    migrated = SegmentFileMemory(config)
+    assert migrated.memories == memory_items
+    assert b'"version":2' in migrated.log_path.read_bytes().split(b"\n")[0]
+    assert SegmentFileMemory(config).memories == memory_items
+
+
+def test_segment_memory_discard(config: Config, memory_items: list[MemoryItem]):
+    index = SegmentFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+
+    index.discard(memory_items[1])
+    assert memory_items[1] not in index
+    assert len(index) == 3
+
+    reloaded = SegmentFileMemory(config)
+    assert reloaded.memories == [memory_items[0], *memory_items[2:]]
+
+
+def test_segment_memory_discard_lazy_item(
+    config: Config, memory_items: list[MemoryItem]
+):
+    index = SegmentFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+
+    reloaded = SegmentFileMemory(config)
+    lazy_memories = reloaded.memories
+    reloaded.discard(lazy_memories[0])
+    reloaded.compact()
+
+    # Both the discarded memory and the remaining ones must still be readable
+    assert lazy_memories[0].raw_content == memory_items[0].raw_content
+    assert [m.raw_content for m in lazy_memories[1:]] == [
+        m.raw_content for m in memory_items[1:]
+    ]
+    assert reloaded.memories == memory_items[1:]
+
+
+def test_segment_memory_upsert(config: Config, memory_items: list[MemoryItem]):
+    index = SegmentFileMemory(config)
+    for item in memory_items[:3]:
+        index.add(item)
+    assert memory_items[1] in index
+    assert memory_items[3] not in index
+
+    changed = dataclasses.replace(memory_items[1], raw_content="changed content")
+    assert index.upsert(changed) is changed
+    assert memory_items[1] not in index
+
+    reloaded = SegmentFileMemory(config)
+    assert reloaded.memories == [memory_items[0], memory_items[2], changed]
+    assert reloaded.find(None, "1.txt", changed.content_hash) == changed
+    assert reloaded.find(None, "1.txt", memory_items[1].content_hash) is None
+    assert reloaded.upsert(changed) == changed
+    assert len(reloaded) == 3
+
+
+def test_segment_memory_upsert_after_discarding_same_source(
+    config: Config, memory_items: list[MemoryItem]
+):
+    index = SegmentFileMemory(config)
+    other = dataclasses.replace(memory_items[1], metadata={"location": "0.txt"})
+    index.add(memory_items[0])
+    index.add(other)
+
+    index.discard(other)
+    assert index.find(None, "0.txt") == memory_items[0]
+
+    changed = dataclasses.replace(memory_items[0], raw_content="changed content")
+    index.upsert(changed)
+    assert SegmentFileMemory(config).memories == [changed]
+
+
+def test_segment_memory_clear(config: Config, memory_items: list[MemoryItem]):
+    index = SegmentFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+
+    index.clear()
+    assert len(index) == 0
+    assert index.log_path.read_bytes() == b""
+    assert len(SegmentFileMemory(config)) == 0
+
+    index.add(memory_items[0])
+    assert SegmentFileMemory(config).memories == [memory_items[0]]
+
+
+def test_segment_memory_compact(config: Config, memory_items: list[MemoryItem]):
+    index = SegmentFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+    old_embeddings_path = index.embeddings_path
+
+    index.discard(memory_items[0])
+    index.compact()
+    assert not old_embeddings_path.exists()
+    assert (
+        index.embeddings_path.stat().st_size == 3 * 2 * memory_items[0].e_summary.nbytes
+    )
+
+    reloaded = SegmentFileMemory(config)
+    assert reloaded.memories == memory_items[1:]
+
+
+def test_segment_memory_ignores_interrupted_write(
+    config: Config, memory_items: list[MemoryItem]
+):
+    index = SegmentFileMemory(config)
+    index.add(memory_items[0])
+    with index.log_path.open("ab") as f:
+        f.write(b'{"op": "add", "id": 1, "ro')
+    with index.embeddings_path.open("ab") as f:
+        f.write(numpy.zeros(10, numpy.float32).tobytes())
+
+    reloaded = SegmentFileMemory(config)
+    assert reloaded.memories == [memory_items[0]]
+
+    reloaded.add(memory_items[1])
+    assert SegmentFileMemory(config).memories == memory_items[:2]
+
+
+def test_segment_memory_get(
+    config: Config, memory_item: MemoryItem, mock_get_embedding
+):
+    index = SegmentFileMemory(config)
+    assert index.get("test", config) is None
+
+    index.add(memory_item)
+    retrieved = index.get("test", config)
+    assert retrieved is not None
+    assert retrieved.memory_item == memory_item
+
+
+def test_segment_memory_get_stats(config: Config, memory_item: MemoryItem) -> None:
+    index = SegmentFileMemory(config)
+    index.add(memory_item)
+    n_memories, n_chunks = index.get_stats()
+    assert n_memories == 1
+    assert n_chunks == 1
+
+
+@pytest.fixture
+def one_hot_memory_items(embedding_dimension: int) -> list[MemoryItem]:
+    def one_hot(i: int):
+        e = numpy.zeros(embedding_dimension, numpy.float32)
+        e[i] = 1
+        return e
+
+    return [
+        MemoryItem(
+            raw_content=f"test content {i}",
+            summary=f"test content summary {i}",
+            chunks=[f"test chunk {i}.{j}" for j in range(3)],
+            chunk_summaries=[f"test chunk summary {i}.{j}" for j in range(3)],
+            e_summary=one_hot(4 * i),
+            e_chunks=[one_hot(4 * i + j + 1) for j in range(3)],
+            metadata={"location": f"{i}.txt"},
+        )
+        for i in range(5)
+    ]
+
+
+def test_segment_memory_get_relevant(
+    config: Config,
+    one_hot_memory_items: list[MemoryItem],
+    embedding_dimension: int,
+    mocker: MockerFixture,
+):
+    index = SegmentFileMemory(config)
+    for item in one_hot_memory_items:
+        index.add(item)
+    index.discard(one_hot_memory_items[3])
+
+    e_query = numpy.zeros(embedding_dimension, numpy.float32)
+    e_query[[2 * 4 + 2, 3 * 4, 1 * 4]] = [0.9, 0.8, 0.5]
+    mocker.patch.object(segment_file_memory, "get_embedding", return_value=e_query)
+
+    relevant = index.get_relevant("query", 3, config)
+    assert [r.memory_item for r in relevant] == [
+        one_hot_memory_items[2],
+        one_hot_memory_items[1],
+        one_hot_memory_items[0],
+    ]
+    assert relevant[0].score == pytest.approx(0.9)
+    assert relevant[0].summary_relevance_score == 0
+    assert relevant[0].chunk_relevance_scores == pytest.approx([0, 0.9, 0])
+    assert relevant[0].most_relevant_chunk[0] == "test chunk 2.1"
+    assert relevant[1].summary_relevance_score == pytest.approx(0.5)
+
+    # results must be the same after reloading the index from disk
+    reloaded = SegmentFileMemory(config)
+    assert [r.memory_item for r in reloaded.get_relevant("query", 3, config)] == [
+        r.memory_item for r in relevant
+    ]
+
+
+def test_segment_memory_get_relevant_k_exceeds_size(
+    config: Config, one_hot_memory_items: list[MemoryItem], mock_get_embedding
+):
+    index = SegmentFileMemory(config)
+    for item in one_hot_memory_items[:2]:
+        index.add(item)
+
+    assert len(index.get_relevant("query", 5, config)) == 2
+
+
+def test_segment_memory_get_relevant_filtered(
+    config: Config,
+    one_hot_memory_items: list[MemoryItem],
+    embedding_dimension: int,
+    mocker: MockerFixture,
+):
+    for i, item in enumerate(one_hot_memory_items):
+        item.metadata["source_type"] = "webpage" if i % 2 else "text_file"
+        item.metadata["created_at"] = 1000.0 * i
+    index = SegmentFileMemory(config)
+    for item in one_hot_memory_items:
+        index.add(item)
+    index.discard(one_hot_memory_items[2])
+
+    e_query = numpy.zeros(embedding_dimension, numpy.float32)
+    e_query[[2 * 4 + 2, 3 * 4, 1 * 4]] = [0.9, 0.8, 0.5]
+    mocker.patch.object(segment_file_memory, "get_embedding", return_value=e_query)
+    scored_rows = mocker.spy(index, "_score_rows")
+
+    def relevant_items(filter: MemoryFilter, index=index):
+        return [r.memory_item for r in index.get_relevant("query", 5, config, filter)]
+
+    assert relevant_items(MemoryFilter(source_type="webpage")) == [
+        one_hot_memory_items[3],
+        one_hot_memory_items[1],
+    ]
+    # Only the rows of the 2 matching memories are scored
+    assert len(scored_rows.call_args.args[3]) == 2 * 4
+
+    assert relevant_items(MemoryFilter(source_type="text_file")) == [
+        one_hot_memory_items[0],
+        one_hot_memory_items[4],
+    ]
+    assert relevant_items(MemoryFilter(location="1.txt")) == [one_hot_memory_items[1]]
+    assert relevant_items(MemoryFilter(location="2.txt")) == []
+    assert relevant_items(MemoryFilter(created_after=1000, created_before=4000)) == [
+        one_hot_memory_items[3],
+        one_hot_memory_items[1],
+    ]
+
+    # The metadata index is rebuilt on load
+    reloaded = SegmentFileMemory(config)
+    assert relevant_items(MemoryFilter(source_type="webpage"), reloaded) == [
+        one_hot_memory_items[3],
+        one_hot_memory_items[1],
+    ]
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_segment_memory_get_relevant_batch(
+    dtype: str,
+    config: Config,
+    one_hot_memory_items: list[MemoryItem],
+    embedding_dimension: int,
+    mocker: MockerFixture,
+):
+    config.memory_embedding_dtype = dtype
+    index = SegmentFileMemory(config)
+    for item in one_hot_memory_items:
+        index.add(item)
+    index.discard(one_hot_memory_items[3])
+
+    e_queries = numpy.zeros((2, embedding_dimension), numpy.float32)
+    e_queries[0, [2 * 4 + 2, 3 * 4, 1 * 4]] = [0.9, 0.8, 0.5]
+    e_queries[1, [4 * 4 + 3, 0]] = [0.7, 0.6]
+    get_embedding = mocker.patch.object(
+        segment_file_memory, "get_embedding", return_value=e_queries
+    )
+
+    results = index.get_relevant_batch(["query 0", "query 1"], 2, config)
+    get_embedding.assert_called_once_with(["query 0", "query 1"], config)
+    assert [[r.memory_item for r in relevant] for relevant in results] == [
+        [one_hot_memory_items[2], one_hot_memory_items[1]],
+        [one_hot_memory_items[4], one_hot_memory_items[0]],
+    ]
+    assert results[1][0].for_query == "query 1"
+    assert results[1][0].score == pytest.approx(0.7)
+
+    filtered = index.get_relevant_batch(
+        ["query 0", "query 1"], 2, config, MemoryFilter(location="0.txt")
+    )
+    assert [[r.memory_item for r in relevant] for relevant in filtered] == [
+        [one_hot_memory_items[0]],
+        [one_hot_memory_items[0]],
+    ]
+
+
+@pytest.mark.parametrize("dtype, itemsize", [("float16", 2), ("int8", 1)])
+def test_segment_memory_quantized_get_relevant(
+    dtype: str,
+    itemsize: int,
+    config: Config,
+    one_hot_memory_items: list[MemoryItem],
+    embedding_dimension: int,
+    mocker: MockerFixture,
+):
+    config.memory_embedding_dtype = dtype
+    index = SegmentFileMemory(config)
+    for item in one_hot_memory_items:
+        index.add(item)
+    assert index.quantized_path.stat().st_size == 20 * embedding_dimension * itemsize
+
+    e_query = numpy.zeros(embedding_dimension, numpy.float32)
+    e_query[[2 * 4 + 2, 3 * 4, 1 * 4]] = [0.9, 0.8, 0.5]
+    mocker.patch.object(segment_file_memory, "get_embedding", return_value=e_query)
+    search_scores = mocker.spy(index, "_search_scores")
+
+    relevant = index.get_relevant("query", 2, config)
+    assert [r.memory_item for r in relevant] == one_hot_memory_items[2:4]
+    # Scores are computed in float32 for the re-ranked candidates
+    assert relevant[0].score == pytest.approx(0.9)
+    assert search_scores.spy_return.dtype == numpy.float32
+
+
+def test_segment_memory_int8_quantization(config: Config, embedding_dimension: int):
+    config.memory_embedding_dtype = "int8"
+    index = SegmentFileMemory(config)
+    rows = numpy.random.default_rng(0).standard_normal((8, embedding_dimension))
+    rows = rows.astype(numpy.float32)
+
+    quantized, scales = index._quantize(rows)
+    assert quantized.dtype == numpy.int8
+    assert numpy.abs(quantized).max(axis=1).tolist() == [127] * 8
+    assert quantized * scales[:, numpy.newaxis] == pytest.approx(rows, abs=0.02)
+
+
+def test_segment_memory_switch_embedding_dtype(
+    config: Config, memory_items: list[MemoryItem], mock_get_embedding
+):
+    index = SegmentFileMemory(config)
+    for item in memory_items:
+        index.add(item)
+    expected = [r.memory_item for r in index.get_relevant("query", 2, config)]
+
+    # Switching to int8 converts the existing embeddings
+    config.memory_embedding_dtype = "int8"
+    quantized = SegmentFileMemory(config)
+    assert len(quantized.quantized_embeddings) == len(quantized.embeddings) == 8
+    assert len(quantized.scales) == 8
+    assert [r.memory_item for r in quantized.get_relevant("query", 2, config)] == (
+        expected
+    )
+
+    # Switching back removes the quantized segments
+    config.memory_embedding_dtype = "float32"
+    index = SegmentFileMemory(config)
+    assert not quantized.quantized_path.exists()
+    assert not quantized.scales_path.exists()
+    assert len(index) == 4
+
+
+def test_segment_memory_invalid_embedding_dtype(config: Config):
+    config.memory_embedding_dtype = "float64"
+    with pytest.raises(ValueError):
+        SegmentFileMemory(config)
@@ -4,6 +4,8 @@ from pytest_mock import MockerFixture
 
 import autogpt.memory.vector.memory_item as vector_memory_item
 import autogpt.memory.vector.providers.base as memory_provider_base
+import autogpt.memory.vector.providers.ivf_file as ivf_file_memory
+import autogpt.memory.vector.providers.segment_file as segment_file_memory
 from autogpt.config.config import Config
 from autogpt.llm.providers.openai import OPEN_AI_EMBEDDING_MODELS
 from autogpt.memory.vector import get_memory
@@ -32,6 +34,16 @@ def mock_get_embedding(mocker: MockerFixture, embedding_dimension: int):
         "get_embedding",
         return_value=[0.0255] * embedding_dimension,
     )
+    mocker.patch.object(
+        segment_file_memory,
+        "get_embedding",
+        return_value=[0.0255] * embedding_dimension,
+    )
+    mocker.patch.object(
+        ivf_file_memory,
+        "get_embedding",
+        return_value=[0.0255] * embedding_dimension,
+    )
 
 
 @pytest.fixture
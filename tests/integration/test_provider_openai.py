@@ -1,9 +1,18 @@
-from unittest.mock import MagicMock, patch
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import openai as openai_sdk
 import pytest
+from openai.openai_object import OpenAIObject
 
 from autogpt.llm.api_manager import ApiManager
+from autogpt.llm.base import ChatSequence, Message
 from autogpt.llm.providers import openai
+from autogpt.llm.utils import (
+    create_chat_completion,
+    create_text_completion,
+    get_llm_cache,
+)
 
 api_manager = ApiManager()
 
@@ -23,7 +32,7 @@ class TestProviderOpenAI:
             {"role": "user", "content": "Who won the world series in 2020?"},
         ]
         model = "gpt-3.5-turbo"
-        with patch("openai.ChatCompletion.create") as mock_create:
+        with patch("openai.ChatCompletion.acreate") as mock_create:
             mock_response = MagicMock()
             del mock_response.error
             mock_response.usage.prompt_tokens = 10
@@ -40,7 +49,7 @@ class TestProviderOpenAI:
         messages = []
         model = "gpt-3.5-turbo"
 
-        with patch("openai.ChatCompletion.create") as mock_create:
+        with patch("openai.ChatCompletion.acreate") as mock_create:
             mock_response = MagicMock()
             del mock_response.error
             mock_response.usage.prompt_tokens = 0
@@ -52,3 +61,199 @@ class TestProviderOpenAI:
             assert api_manager.get_total_prompt_tokens() == 0
             assert api_manager.get_total_completion_tokens() == 0
             assert api_manager.get_total_cost() == 0
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_acreate_chat_completion_meters_usage():
+        """Test that async completions are metered, and use the pooled session."""
+        response = OpenAIObject.construct_from(
+            {
+                "model": "gpt-3.5-turbo",
+                "usage": {"prompt_tokens": 10, "completion_tokens": 20},
+                "choices": [],
+            }
+        )
+        sessions = []
+
+        async def acreate(**kwargs):
+            sessions.append(openai_sdk.aiosession.get())
+            return response
+
+        with patch("openai.ChatCompletion.acreate", side_effect=acreate):
+            for _ in range(2):
+                assert (
+                    await openai.acreate_chat_completion([], model="gpt-3.5-turbo")
+                    is response
+                )
+
+        assert sessions[0] is sessions[1] is openai.get_aiosession()
+        assert openai_sdk.aiosession.get() is None
+        assert api_manager.get_total_prompt_tokens() == 20
+        assert api_manager.get_total_completion_tokens() == 40
+        await openai.close_aiosession()
+
+    @staticmethod
+    def test_create_chat_completion_runs_on_shared_event_loop():
+        """Test that sync calls of different threads share one loop and session."""
+        response = OpenAIObject.construct_from({"model": "gpt-3.5-turbo"})
+        calls = []
+
+        async def acreate(**kwargs):
+            calls.append((threading.current_thread().name, openai_sdk.aiosession.get()))
+            return response
+
+        with patch("openai.ChatCompletion.acreate", side_effect=acreate):
+            threads = [
+                threading.Thread(
+                    target=openai.create_chat_completion,
+                    args=([],),
+                    kwargs={"model": "gpt-3.5-turbo"},
+                )
+                for _ in range(2)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+        assert [thread for thread, _ in calls] == ["llm-event-loop"] * 2
+        assert calls[0][1] is calls[1][1] is not None
+
+    @staticmethod
+    def test_create_chat_completion_streams_sync():
+        """Test that a sync stream can be iterated over, and closed early."""
+        closed = []
+
+        async def chunks():
+            try:
+                for i in range(3):
+                    yield OpenAIObject.construct_from({"choices": [], "i": i})
+            finally:
+                closed.append(True)
+
+        async def acreate(**kwargs):
+            return chunks()
+
+        with patch("openai.ChatCompletion.acreate", side_effect=acreate):
+            stream = openai.create_chat_completion(
+                [], model="gpt-3.5-turbo", stream=True
+            )
+            assert next(stream).i == 0
+            stream.close()
+
+        assert closed == [True]
+
+    @staticmethod
+    def test_create_calls_are_rate_limited(mocker):
+        """Test that calls wait for the rate limits of their model."""
+        limiter = MagicMock(acquire_async=AsyncMock())
+        get_limiter = mocker.patch.object(
+            openai, "get_model_rate_limiter", return_value=limiter
+        )
+        mocker.patch.object(openai, "_count_text_tokens", return_value=7)
+        mocker.patch("autogpt.llm.utils.count_message_tokens", return_value=20)
+
+        with patch("openai.ChatCompletion.acreate") as mock_create:
+            del mock_create.return_value.error
+            openai.create_chat_completion(
+                [{"role": "user", "content": "Hi"}], model="gpt-4", max_tokens=100
+            )
+        with patch("openai.Embedding.acreate"):
+            openai.create_embedding(["a", [1, 2, 3]], model="text-embedding-ada-002")
+
+        assert [call.args[0] for call in get_limiter.call_args_list] == [
+            "gpt-4",
+            "text-embedding-ada-002",
+        ]
+        assert [call.args[0] for call in limiter.acquire_async.call_args_list] == [
+            20 + 100,
+            7 + 7,
+        ]
+
+
+def test_create_chat_completion_streamed(config, mocker):
+    """Test that streamed completions are assembled, and can be stopped early."""
+    deltas = [{"role": "assistant"}, {"content": "Hello"}, {"content": " world"}]
+    chunks = (
+        OpenAIObject.construct_from({"choices": [{"delta": delta}]})
+        for delta in deltas + [{"content": "!"}]
+    )
+    create = mocker.patch.object(openai, "create_chat_completion", return_value=chunks)
+    mocker.patch("autogpt.llm.utils.count_string_tokens", return_value=2)
+    mocker.patch.object(ChatSequence, "token_length", 10)
+    received = []
+
+    def on_content_delta(delta: str) -> bool:
+        received.append(delta)
+        return delta == " world"
+
+    response = create_chat_completion(
+        ChatSequence.for_model("gpt-3.5-turbo"),
+        config,
+        max_tokens=100,
+        on_content_delta=on_content_delta,
+    )
+
+    assert response.content == "Hello world"
+    assert received == ["Hello", " world"]
+    assert create.call_args.kwargs["stream"] is True
+    # The rest of the stream is closed, and its usage is counted
+    assert chunks.gi_frame is None
+    assert api_manager.get_total_prompt_tokens() == 10
+    assert api_manager.get_total_completion_tokens() == 2
+
+
+@pytest.fixture
+def mock_chat_completion(config, mocker):
+    """Answers every chat completion with "Hello", without counting tokens"""
+    config.llm_cache_mode = "record"
+    mocker.patch.object(ChatSequence, "token_length", 10)
+    response = OpenAIObject.construct_from(
+        {"choices": [{"message": {"role": "assistant", "content": "Hello"}}]}
+    )
+    return mocker.patch.object(openai, "create_chat_completion", return_value=response)
+
+
+def test_llm_cache_records_and_replays(config, mock_chat_completion):
+    prompt = ChatSequence.for_model("gpt-3.5-turbo", [Message("user", "Hi")])
+    cache = get_llm_cache(config)
+    cache.clear()
+
+    for _ in range(2):
+        response = create_chat_completion(prompt, config, temperature=0)
+        assert response.content == "Hello"
+    mock_chat_completion.assert_called_once()
+    assert (cache.hits, len(cache)) == (1, 1)
+
+    # The request is the key: other requests are not answered from the cache
+    create_chat_completion(prompt, config, temperature=0.5)
+    assert mock_chat_completion.call_count == 2
+
+    config.llm_cache_mode = "replay"
+    assert create_chat_completion(prompt, config, temperature=0).content == "Hello"
+    with pytest.raises(RuntimeError, match="No recorded response"):
+        create_chat_completion(prompt, config, temperature=1)
+    assert mock_chat_completion.call_count == 2
+
+
+def test_llm_cache_passthrough(config, mock_chat_completion):
+    config.llm_cache_mode = "passthrough"
+    prompt = ChatSequence.for_model("gpt-3.5-turbo", [Message("user", "Hi")])
+
+    for _ in range(2):
+        create_chat_completion(prompt, config, temperature=0)
+    assert mock_chat_completion.call_count == 2
+    assert get_llm_cache(config) is None
+
+
+def test_llm_cache_text_completion(config, mocker):
+    config.llm_cache_mode = "record"
+    get_llm_cache(config).clear()
+    create = mocker.patch.object(openai, "create_text_completion")
+    create.return_value.choices = [MagicMock(text="Done")]
+
+    for _ in range(2):
+        assert create_text_completion("Do it", config, "text-davinci-003", 0, 10) == (
+            "Done"
+        )
+    create.assert_called_once()
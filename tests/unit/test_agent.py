@@ -1,4 +1,13 @@
+import json
+
+import tiktoken
+from pytest_mock import MockerFixture
+
+import autogpt.agents.base as base_agent
+import autogpt.llm.utils.token_counter as token_counter
 from autogpt.agents.agent import Agent, execute_command
+from autogpt.llm.base import ChatModelResponse, ChatSequence
+from autogpt.llm.providers.openai import OPEN_AI_CHAT_MODELS
 
 
 def test_agent_initialization(agent: Agent):
@@ -27,3 +36,93 @@ def test_execute_command_plugin(agent: Agent):
 
 # More test methods can be added for specific agent interactions
 # For example, mocking chat_with_ai and testing the agent's interaction loop
+
+
+def test_think_streams_response(agent: Agent, mocker: MockerFixture):
+    agent.config.openai_streaming = True
+    mocker.patch.object(
+        token_counter,
+        "get_encoding",
+        return_value=tiktoken.Encoding(
+            "bytes",
+            pat_str=r"\s?\S+|\s+",
+            mergeable_ranks={bytes([i]): i for i in range(256)},
+            special_tokens={"<|endoftext|>": 256},
+        ),
+    )
+    reply = {
+        "thoughts": {
+            "text": "Hi",
+            "reasoning": "Because",
+            "plan": "- a\n- b",
+            "criticism": "None",
+            "speak": "Hi",
+        },
+        "command": {"name": "write_file", "args": {"filename": "a.txt"}},
+    }
+    text = f"```json\n{json.dumps(reply)}\n```\nI hope this helps!"
+    streamed = []
+
+    def create_chat_completion(prompt, config, functions, on_content_delta):
+        for char in text:
+            streamed.append(char)
+            if on_content_delta(char):
+                break
+        return ChatModelResponse(
+            model_info=OPEN_AI_CHAT_MODELS["gpt-4"],
+            content="".join(streamed),
+            function_call=None,
+        )
+
+    mocker.patch.object(
+        base_agent, "create_chat_completion", side_effect=create_chat_completion
+    )
+    partial_responses = []
+
+    command_name, command_args, thoughts = agent.think(
+        on_partial_response=lambda path, value: partial_responses.append(path)
+    )
+
+    assert (command_name, command_args, thoughts) == (
+        "write_file",
+        {"filename": "a.txt"},
+        reply,
+    )
+    assert partial_responses.index(("thoughts",)) < partial_responses.index(
+        ("command",)
+    )
+    # The rest of the response isn't waited for once the command is known
+    assert "I hope" not in "".join(streamed)
+
+
+def test_stream_response_with_functions_reads_to_the_end(
+    agent: Agent, mocker: MockerFixture
+):
+    text = json.dumps({"thoughts": {"text": "Hi"}}) + " Calling write_file..."
+    streamed = []
+
+    def create_chat_completion(prompt, config, functions, on_content_delta):
+        for char in text:
+            streamed.append(char)
+            if on_content_delta(char):
+                break
+        return ChatModelResponse(
+            model_info=OPEN_AI_CHAT_MODELS["gpt-4"],
+            content="".join(streamed),
+            function_call={"name": "write_file", "arguments": "{}"},
+        )
+
+    mocker.patch.object(
+        base_agent, "create_chat_completion", side_effect=create_chat_completion
+    )
+    partial_responses = []
+
+    response = agent._stream_response(
+        ChatSequence.for_model("gpt-4"),
+        functions=[{"name": "write_file"}],
+        on_partial_response=lambda path, value: partial_responses.append(path),
+    )
+
+    # The command only arrives as a function call after the content
+    assert response.content == text
+    assert ("thoughts",) in partial_responses
@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import pytest
+
+from autogpt.cache import PersistentCache
+
+
+@pytest.fixture
+def cache_path(tmp_path: Path) -> Path:
+    return tmp_path / "cache.sqlite3"
+
+
+def test_get_and_set(cache_path: Path):
+    cache = PersistentCache(cache_path, max_entries=10)
+    assert cache.get("a") is None
+
+    cache.set("a", b"value a")
+    assert cache.get("a") == b"value a"
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.hit_rate == 0.5
+
+
+def test_get_many(cache_path: Path):
+    cache = PersistentCache(cache_path, max_entries=10)
+    cache.set_many({"a": b"1", "b": b"2"})
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": b"1", "b": b"2"}
+    assert cache.hits == 2
+    assert cache.misses == 1
+
+
+def test_persists_between_instances(cache_path: Path):
+    PersistentCache(cache_path, max_entries=10).set("a", b"1")
+    assert PersistentCache(cache_path, max_entries=10).get("a") == b"1"
+
+
+def test_evicts_least_recently_used(cache_path: Path, mocker):
+    clock = mocker.patch("autogpt.cache.time.time")
+    cache = PersistentCache(cache_path, max_entries=2)
+
+    clock.return_value = 1
+    cache.set("a", b"1")
+    clock.return_value = 2
+    cache.set("b", b"2")
+    clock.return_value = 3
+    cache.get("a")
+    clock.return_value = 4
+    cache.set("c", b"3")
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get_many(["a", "c"]) == {"a": b"1", "c": b"3"}
+
+
+def test_evicts_down_to_max_entries(cache_path: Path):
+    cache = PersistentCache(cache_path, max_entries=2)
+    cache.set_many({"a": b"1", "b": b"2"})
+    cache.set_many({"c": b"3", "d": b"4", "e": b"5"})
+    assert len(cache) == 2
+
+
+def test_clear(cache_path: Path):
+    cache = PersistentCache(cache_path, max_entries=10)
+    cache.set("a", b"1")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get("a") is None
+
+
+def test_entries_expire(cache_path: Path, mocker):
+    clock = mocker.patch("autogpt.cache.time.time")
+    cache = PersistentCache(cache_path, max_entries=10, max_age=60)
+
+    clock.return_value = 0
+    cache.set("a", b"1")
+    clock.return_value = 50
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"
+
+    clock.return_value = 100
+    assert cache.get_many(["a", "b"]) == {"b": b"2"}
+    cache.set("c", b"3")
+    assert len(cache) == 2  # the expired entry is removed
@@ -0,0 +1,83 @@
+import pytest
+import tiktoken
+from pytest_mock import MockerFixture
+
+import autogpt.llm.utils.token_counter as token_counter
+from autogpt.llm.base import ChatSequence, Message
+
+
+@pytest.fixture(autouse=True)
+def byte_tokenizer(mocker: MockerFixture) -> tiktoken.Encoding:
+    """A tokenizer with one token per byte, so no BPE ranks have to be downloaded"""
+    tokenizer = tiktoken.Encoding(
+        "bytes",
+        pat_str=r"\s?\S+|\s+",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={"<|endoftext|>": 256},
+    )
+    mocker.patch.object(token_counter, "get_encoding", return_value=tokenizer)
+    return tokenizer
+
+
+@pytest.fixture
+def count_tokens_per_message(mocker: MockerFixture):
+    return mocker.spy(token_counter, "count_tokens_per_message")
+
+
+def expected_length(sequence: ChatSequence) -> int:
+    return token_counter.count_message_tokens(
+        list(sequence.messages), sequence.model.name
+    )
+
+
+def test_token_length_is_counted_incrementally(count_tokens_per_message):
+    sequence = ChatSequence.for_model("gpt-4", [Message("system", "You are a bot")])
+    assert sequence.token_length == expected_length(sequence)
+
+    sequence.add("user", "Hello")
+    sequence.extend([Message("assistant", "Hi there!"), Message("user", "Bye")])
+    sequence.insert(1, Message("system", "Be nice"))
+    count_tokens_per_message.reset_mock()
+    token_length = sequence.token_length
+    # Only the messages that were added since the last count are counted
+    count_tokens_per_message.assert_called_once()
+    assert len(count_tokens_per_message.call_args.args[0]) == 4
+    assert token_length == expected_length(sequence)
+
+    count_tokens_per_message.reset_mock()
+    sequence.token_length
+    count_tokens_per_message.assert_not_called()
+
+
+def test_token_lengths_breakdown():
+    sequence = ChatSequence.for_model(
+        "gpt-3.5-turbo", [Message("system", "abc"), Message("user", "de")]
+    )
+
+    # 4 tokens per message, plus the role and content
+    assert sequence.token_lengths == [
+        (Message("system", "abc"), 4 + 6 + 3),
+        (Message("user", "de"), 4 + 4 + 2),
+    ]
+    assert sequence.token_length == 13 + 10 + token_counter.REPLY_PRIMING_TOKENS
+    assert "SYSTEM (13 TOKENS)" in sequence.dump()
+
+
+def test_token_length_of_slice(count_tokens_per_message):
+    sequence = ChatSequence.for_model(
+        "gpt-4", [Message("user", str(i) * (i + 1)) for i in range(5)]
+    )
+    sequence.token_length
+    count_tokens_per_message.reset_mock()
+
+    head = sequence[:3]
+    assert head.token_length == expected_length(head)
+    count_tokens_per_message.assert_called_once()  # by expected_length
+
+
+def test_token_length_after_messages_are_replaced():
+    sequence = ChatSequence.for_model("gpt-4", [Message("user", "Hello")])
+    sequence.token_length
+
+    sequence.messages = [Message("user", "Hi"), Message("assistant", "Hey there")]
+    assert sequence.token_length == expected_length(sequence)
@@ -249,3 +249,18 @@ def test_create_config_gpt3only(config: Config) -> None:
         )
         assert config.fast_llm == GPT_3_MODEL
         assert config.smart_llm == GPT_3_MODEL
+
+
+def test_openai_rate_limits(workspace: Workspace) -> None:
+    with mock.patch.dict(
+        os.environ, {"OPENAI_RATE_LIMITS": "gpt-4:200:40000, gpt-3.5-turbo:0:90000"}
+    ):
+        config = ConfigBuilder.build_config_from_env(workspace.root.parent)
+    assert config.openai_rate_limits == {
+        "gpt-4": (200, 40000),
+        "gpt-3.5-turbo": (0, 90000),
+    }
+
+    with mock.patch.dict(os.environ, {"OPENAI_RATE_LIMITS": "gpt-4:200"}):
+        with pytest.raises(ValueError, match="Invalid rate limit"):
+            ConfigBuilder.build_config_from_env(workspace.root.parent)
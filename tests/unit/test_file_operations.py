@@ -197,12 +197,61 @@ def test_read_file(
     assert content.replace("\r", "") == file_content
 
 
+def test_read_file_summarizes_unchanged_file_once(
+    mock_MemoryItem_from_text,
+    test_file_with_content_path: Path,
+    agent: Agent,
+    mocker: MockerFixture,
+):
+    agent.config.memorize_read_files = True
+    from_text = mocker.spy(file_ops.MemoryItem, "from_text")
+    file_ops.read_file(test_file_with_content_path, agent=agent)
+    file_ops.read_file(test_file_with_content_path, agent=agent)
+    assert from_text.call_count == 1
+
+    test_file_with_content_path.write_text("This file has changed.\n")
+    assert "changed" in file_ops.read_file(test_file_with_content_path, agent=agent)
+    assert from_text.call_count == 2
+
+
+def test_read_file_does_not_memorize_file_by_default(
+    mock_MemoryItem_from_text,
+    test_file_with_content_path: Path,
+    agent: Agent,
+):
+    file_ops.read_file(test_file_with_content_path, agent=agent)
+    assert agent.memory.find("text_file", str(test_file_with_content_path)) is None
+
+
+def test_read_file_reads_up_to_max_tokens(
+    mock_MemoryItem_from_text,
+    test_file_with_content_path: Path,
+    agent: Agent,
+    mocker: MockerFixture,
+):
+    read_textual_file = mocker.spy(file_ops, "read_textual_file")
+    agent.config.read_file_max_tokens = 1000
+    file_ops.read_file(test_file_with_content_path, agent=agent)
+    assert read_textual_file.call_args.kwargs["max_tokens"] == 1000
+
+    agent.config.read_file_max_tokens = 0
+    file_ops.read_file(test_file_with_content_path, agent=agent)
+    assert read_textual_file.call_args.kwargs["max_tokens"] is None
+
+
 def test_read_file_not_found(agent: Agent):
     filename = "does_not_exist.txt"
     content = file_ops.read_file(filename, agent=agent)
     assert "Error:" in content and filename in content and "no such file" in content
 
 
+def test_ingest_files_raises_errors(agent: Agent):
+    filename = "does_not_exist.txt"
+    assert file_ops.ingest_files([filename], agent.memory, agent.config) == 0
+    with pytest.raises(FileNotFoundError):
+        file_ops.ingest_files([filename], agent.memory, agent.config, raise_errors=True)
+
+
 def test_write_to_file_relative_path(test_file_name: Path, agent: Agent):
     new_content = "This is new content.\n"
     file_ops.write_to_file(str(test_file_name), new_content, agent=agent)
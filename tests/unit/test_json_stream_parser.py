@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from autogpt.json_utils.streaming import JSONStreamParser
+
+RESPONSE = {
+    "thoughts": {
+        "text": 'a "quoted" } brace',
+        "reasoning": "because\nreasons",
+        "plan": ["- one", "- two"],
+        "criticism": None,
+        "speak": "ok",
+    },
+    "command": {"name": "write_file", "args": {"filename": "a.txt", "n": 1.5}},
+}
+TEXT = f"Here you go:\n```json\n{json.dumps(RESPONSE, indent=2)}\n```"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, len(TEXT)])
+def test_values_are_reported_as_they_complete(chunk_size: int):
+    values = []
+    parser = JSONStreamParser(lambda path, value: values.append((path, value)))
+
+    for i in range(0, len(TEXT), chunk_size):
+        parser.feed(TEXT[i : i + chunk_size])
+
+    assert values == [
+        (("thoughts", "text"), 'a "quoted" } brace'),
+        (("thoughts", "reasoning"), "because\nreasons"),
+        (("thoughts", "plan"), ["- one", "- two"]),
+        (("thoughts", "criticism"), None),
+        (("thoughts", "speak"), "ok"),
+        (("thoughts",), RESPONSE["thoughts"]),
+        (("command", "name"), "write_file"),
+        (("command", "args"), RESPONSE["command"]["args"]),
+        (("command",), RESPONSE["command"]),
+    ]
+    assert parser.done
+    assert parser.members == RESPONSE
+    assert json.loads(parser.completed_text()) == RESPONSE
+
+
+def test_thoughts_are_reported_before_the_command_arrives():
+    values = []
+    parser = JSONStreamParser(lambda path, value: values.append(path))
+
+    parser.feed(TEXT[: TEXT.index('"command"') + len('"command": {"na')])
+    assert values[-1] == ("thoughts",)
+    assert not parser.done
+    # The parsed members can be used as an object of their own
+    assert json.loads(parser.completed_text()) == {"thoughts": RESPONSE["thoughts"]}
+
+
+def test_invalid_values_are_skipped():
+    values = []
+    parser = JSONStreamParser(lambda path, value: values.append((path, value)))
+
+    parser.feed('{"a": nope, "b": [1, 2], "c": {"d": {"e": 1}}}')
+    assert values == [
+        (("b", 0), 1),
+        (("b", 1), 2),
+        (("b",), [1, 2]),
+        (("c", "d"), {"e": 1}),
+        (("c",), {"d": {"e": 1}}),
+    ]
+    assert parser.done
+
+
+def test_completed_text_without_object():
+    parser = JSONStreamParser()
+    parser.feed("No JSON here")
+    assert parser.completed_text() == ""
+    parser.feed(" {")
+    assert parser.completed_text() == "{}"
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+import pytest
+
+from autogpt.llm.event_loop import get_event_loop, iterate_sync, run_sync
+
+
+def test_run_sync_overlaps_coroutines_of_threads():
+    started = []
+
+    async def wait_for_other():
+        # Only returns once the coroutine of the other thread has started as well
+        started.append(threading.current_thread().name)
+        while len(started) < 2:
+            await asyncio.sleep(0.01)
+
+    threads = [
+        threading.Thread(target=run_sync, args=(wait_for_other(), 5)) for _ in "ab"
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert started == ["llm-event-loop"] * 2
+
+
+def test_run_sync_raises_errors():
+    async def fail():
+        raise ValueError("nope")
+
+    with pytest.raises(ValueError, match="nope"):
+        run_sync(fail())
+
+
+def test_run_sync_cancels_on_timeout():
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        run_sync(hang(), timeout=0.05)
+    assert cancelled.wait(5)
+    assert get_event_loop().is_running()
+
+
+@pytest.mark.asyncio
+async def test_run_sync_in_coroutine():
+    async def noop():
+        pass
+
+    with pytest.raises(RuntimeError):
+        run_sync(noop())
+
+
+def test_iterate_sync():
+    async def count():
+        for i in range(3):
+            yield i
+
+    assert list(iterate_sync(count())) == [0, 1, 2]
@@ -0,0 +1,102 @@
+import asyncio
+import email.utils
+import logging
+import time
+
+import pytest
+from openai.error import APIError, RateLimitError
+
+from autogpt.core.resource.model_providers.openai import (
+    _OpenAIRetryHandler,
+    _retry_after,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def failing_calls(error: Exception, failures: int):
+    """An API call that fails `failures` times, and records when it was called"""
+    calls = []
+
+    async def call(name: str = "call"):
+        calls.append((name, time.monotonic()))
+        if len(calls) <= failures:
+            raise error
+        return len(calls)
+
+    return call, calls
+
+
+@pytest.mark.asyncio
+async def test_backoff_does_not_block_event_loop():
+    error = APIError("Bad gateway", http_status=502, headers={"Retry-After": "0.2"})
+    call, calls = failing_calls(error, 1)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    assert await _OpenAIRetryHandler(logger)(call)() == 2
+    ticker.cancel()
+
+    assert calls[1][1] - calls[0][1] >= 0.2
+    assert ticks > 5
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_pauses_concurrent_calls():
+    error = RateLimitError("Rate limited", headers={"retry-after-ms": "300"})
+    call, calls = failing_calls(error, 1)
+    retry = _OpenAIRetryHandler(logger, warn_user=False)
+
+    async def call_later():
+        await asyncio.sleep(0.05)
+        return await retry(call)("later")
+
+    await asyncio.gather(retry(call)("first"), call_later())
+
+    (_, limited_at), *retries = calls
+    # The call that wasn't limited itself waits for the pause as well
+    assert {name for name, _ in retries} == {"first", "later"}
+    assert all(at - limited_at >= 0.3 for _, at in retries)
+
+
+@pytest.mark.asyncio
+async def test_retry_gives_up():
+    call, calls = failing_calls(APIError("Error", http_status=500), 5)
+    with pytest.raises(APIError):
+        await _OpenAIRetryHandler(logger)(call)()
+    assert len(calls) == 1
+
+
+def test_backoff_is_jittered():
+    retry = _OpenAIRetryHandler(logger, backoff_base=2.0)
+    error = APIError("Bad gateway", http_status=502)
+
+    backoffs = {retry._get_backoff(3, error) for _ in range(20)}
+    assert len(backoffs) > 1
+    assert all(16 <= backoff <= 32 for backoff in backoffs)
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({}, None),
+        ({"Retry-After": "3"}, 3),
+        ({"retry-after": "1.5", "retry-after-ms": "1200"}, 1.2),
+        ({"Retry-After": "soon"}, None),
+    ],
+)
+def test_retry_after(headers, expected):
+    assert _retry_after(RateLimitError("Error", headers=headers)) == expected
+
+
+def test_retry_after_http_date():
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert (
+        28 <= _retry_after(RateLimitError("Error", headers={"Retry-After": date})) <= 30
+    )
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+import autogpt.llm.rate_limiter as rate_limiter
+from autogpt.llm.rate_limiter import (
+    ModelRateLimiter,
+    TokenBucket,
+    get_model_rate_limiter,
+    set_model_rate_limits,
+)
+
+
+@pytest.fixture
+def clock(mocker: MockerFixture):
+    """A fake monotonic clock, which only advances when the code sleeps"""
+    now = [100.0]
+
+    def sleep(seconds: float):
+        now[0] += seconds
+
+    mocker.patch.object(rate_limiter.time, "monotonic", side_effect=lambda: now[0])
+    return mocker.patch.object(rate_limiter.time, "sleep", side_effect=sleep)
+
+
+def test_token_bucket_admits_bursts_then_paces(clock):
+    bucket = TokenBucket(rate_per_minute=60, capacity=3)
+
+    assert [bucket.reserve(1) for _ in range(5)] == [0, 0, 0, 1, 2]
+    # Reservations that are not used are given back
+    bucket.refund(2)
+    assert bucket.reserve(1) == 1
+
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate_per_minute=60, capacity=3)
+    bucket.reserve(3)
+
+    clock(100)
+    assert bucket.reserve(3) == 0
+    assert bucket.reserve(1) == 1
+
+
+def test_token_bucket_admits_reservations_above_capacity(clock):
+    bucket = TokenBucket(rate_per_minute=600, capacity=100)
+    assert bucket.reserve(250) == 15
+
+
+def test_model_rate_limiter_paces_requests_and_tokens(clock):
+    limiter = ModelRateLimiter(requests_per_minute=120, tokens_per_minute=6000)
+
+    # The first minute's worth is admitted at once
+    for _ in range(3):
+        limiter.acquire(2000)
+    clock.assert_not_called()
+
+    # ...after which requests are spaced out by the tokens they take
+    limiter.acquire(1000)
+    limiter.acquire(10)
+    assert [call.args[0] for call in clock.call_args_list] == [10, pytest.approx(0.1)]
+
+
+@pytest.mark.asyncio
+async def test_model_rate_limiter_refunds_cancelled_requests():
+    limiter = ModelRateLimiter(requests_per_minute=0, tokens_per_minute=60)
+    limiter.reserve(60)
+
+    waiting = asyncio.create_task(limiter.acquire_async(60))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    assert limiter.reserve(1) < 2
+
+
+def test_set_model_rate_limits():
+    set_model_rate_limits({"gpt-4": (200, 40000), "gpt-3.5-turbo": (0, 0)})
+    try:
+        assert isinstance(get_model_rate_limiter("gpt-4"), ModelRateLimiter)
+        assert get_model_rate_limiter("gpt-4").requests.rate == 200 / 60
+        assert get_model_rate_limiter("gpt-3.5-turbo") is None
+        assert get_model_rate_limiter(None) is None
+    finally:
+        set_model_rate_limits({})
+    assert get_model_rate_limiter("gpt-4") is None
@@ -128,3 +128,32 @@ def test_retry_openapi_other_api_error(capsys):
 
     output = capsys.readouterr()
     assert output.out == ""
+
+
+@pytest.mark.asyncio
+async def test_retry_open_api_coroutine(capsys, error, mocker):
+    """Tests that coroutines are retried without blocking the event loop"""
+    blocking_time = mocker.patch.object(openai, "time")
+    calls = 0
+
+    @openai.retry_api(max_retries=2, backoff_base=0.001)
+    async def f():
+        nonlocal calls
+        calls += 1
+        if calls <= 2:
+            raise error
+        return calls
+
+    assert await f() == 3
+    blocking_time.sleep.assert_not_called()
+    assert "Waiting" in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_retry_open_api_coroutine_failing(error):
+    @openai.retry_api(max_retries=1, backoff_base=0.001)
+    async def f():
+        raise error
+
+    with pytest.raises(type(error)):
+        await f()
@@ -1,13 +1,21 @@
 import json
 import tempfile
-from unittest import TestCase
+import time
+from unittest import TestCase, mock
 from xml.etree import ElementTree
 
 import docx
+import tiktoken
 import yaml
 from bs4 import BeautifulSoup
 
-from autogpt.commands.file_operations_utils import is_file_binary_fn, read_textual_file
+import autogpt.commands.file_operations_utils as file_operations_utils
+from autogpt.commands.file_operations_utils import (
+    is_file_binary_fn,
+    iter_textual_file,
+    read_textual_file,
+    read_textual_files,
+)
 from autogpt.logs import logger
 
 plain_text_str = "Hello, world!"
@@ -136,6 +144,13 @@ respective_file_creation_functions = {
 }
 
 
+def read_slowly(file_path: str, logger) -> str:
+    """Takes forever to read files named slow*; must be importable by worker processes"""
+    if "slow" in file_path:
+        time.sleep(60)
+    return read_textual_file(file_path, logger)
+
+
 class TestConfig(TestCase):
     def test_parsers(self):
         binary_files_extensions = [".pdf", ".docx"]
@@ -148,3 +163,131 @@ class TestConfig(TestCase):
             self.assertIn(plain_text_str, loaded_text)
             should_be_binary = file_extension in binary_files_extensions
             self.assertEqual(should_be_binary, is_file_binary_fn(created_filepath))
+
+    def test_iter_textual_file_yields_paragraphs(self):
+        with tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=".docx") as f:
+            document = docx.Document()
+            for i in range(3):
+                document.add_paragraph(f"Paragraph {i}. ")
+            document.save(f.name)
+
+        self.assertEqual(
+            list(iter_textual_file(f.name, logger)),
+            ["Paragraph 0. ", "Paragraph 1. ", "Paragraph 2. "],
+        )
+        self.assertEqual(
+            read_textual_file(f.name, logger, max_bytes=20), "Paragraph 0. Paragra"
+        )
+
+    def test_iter_textual_file_reads_text_in_blocks(self):
+        with tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=".txt") as f:
+            f.write(("\ufeff" + "Hé, world! " * 10).encode())
+
+        with mock.patch.object(file_operations_utils, "TEXT_BLOCK_CHARS", 14):
+            segments = list(iter_textual_file(f.name, logger))
+        self.assertEqual(len(segments), 8)
+        self.assertEqual("".join(segments), "Hé, world! " * 10)
+
+    def test_read_textual_file_max_tokens(self):
+        tokenizer = tiktoken.Encoding(
+            "bytes",
+            pat_str=r"\s?\S+|\s+",
+            mergeable_ranks={bytes([i]): i for i in range(256)},
+            special_tokens={"<|endoftext|>": 256},
+        )
+        with mock.patch.object(
+            file_operations_utils, "get_encoding", return_value=tokenizer
+        ):
+            self.assertEqual(
+                read_textual_file(mock_text_file(), logger, max_tokens=5), "Hello"
+            )
+
+    def test_read_textual_file_max_tokens_short_text(self):
+        # Text of at most max_tokens bytes can't be longer, so it isn't tokenized
+        with mock.patch.object(file_operations_utils, "get_encoding") as get_encoding:
+            self.assertEqual(
+                read_textual_file(mock_text_file(), logger, max_tokens=1000),
+                plain_text_str,
+            )
+        get_encoding.assert_not_called()
+
+    def test_read_textual_files_in_processes(self):
+        file_paths = [
+            creator() for creator in respective_file_creation_functions.values()
+        ]
+        file_paths.append(file_paths[0] + ".missing")
+
+        results = dict(read_textual_files(file_paths, logger, workers=3))
+
+        self.assertEqual(set(results), set(file_paths))
+        self.assertIsInstance(results.pop(file_paths[-1]), FileNotFoundError)
+        for text in results.values():
+            self.assertIn(plain_text_str, text)
+
+    def test_read_textual_files_timeout(self):
+        with tempfile.NamedTemporaryFile(mode="w", delete=False, prefix="slow") as f:
+            f.write(plain_text_str)
+        file_paths = [f.name, mock_text_file(), mock_text_file()]
+
+        start = time.monotonic()
+        results = list(
+            read_textual_files(
+                file_paths, logger, workers=2, timeout=2, read_file=read_slowly
+            )
+        )
+
+        self.assertLess(time.monotonic() - start, 30)
+        # the other files are read while the slow one is stuck
+        self.assertEqual(
+            [path for path, _ in results], [file_paths[1], file_paths[2], f.name]
+        )
+        self.assertIsInstance(results[-1][1], TimeoutError)
+
+    def test_read_textual_files_in_process(self):
+        file_paths = [mock_text_file(), mock_csv_file()]
+        self.assertEqual(
+            list(read_textual_files(file_paths, logger, workers=0)),
+            [(path, plain_text_str) for path in file_paths],
+        )
+
+    def test_utf8_files_skip_charset_detection(self):
+        with mock.patch.object(
+            file_operations_utils.charset_normalizer, "from_bytes"
+        ) as from_bytes:
+            self.assertEqual(
+                read_textual_file(mock_text_file(), logger), plain_text_str
+            )
+        from_bytes.assert_not_called()
+
+    def test_charset_detection_is_cached(self):
+        text = "Ça va très bien, merci beaucoup! " * 20
+        with tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=".txt") as f:
+            f.write(text.encode("utf-16"))
+
+        from_bytes = mock.Mock(
+            wraps=file_operations_utils.charset_normalizer.from_bytes
+        )
+        with mock.patch.object(
+            file_operations_utils.charset_normalizer, "from_bytes", from_bytes
+        ):
+            self.assertEqual(read_textual_file(f.name, logger), text)
+            self.assertEqual(read_textual_file(f.name, logger), text)
+            self.assertEqual(from_bytes.call_count, 1)
+
+            # A changed file is detected again
+            with open(f.name, "ab") as f:
+                f.write("Très bien!".encode("utf-16-le"))
+            self.assertEqual(read_textual_file(f.name, logger), text + "Très bien!")
+            self.assertEqual(from_bytes.call_count, 2)
+
+    def test_undetectable_charset_is_read_as_utf8(self):
+        with tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=".txt") as f:
+            f.write(b"Hello \xff\xfe world")
+
+        with mock.patch.object(
+            file_operations_utils.charset_normalizer, "from_bytes"
+        ) as from_bytes:
+            from_bytes.return_value.best.return_value = None
+            self.assertEqual(
+                read_textual_file(f.name, logger), "Hello \ufffd\ufffd world"
+            )
@@ -0,0 +1,287 @@
+import re
+import threading
+from math import ceil
+
+import pytest
+import tiktoken
+from pytest_mock import MockerFixture
+
+import autogpt.llm.utils.token_counter as token_counter
+import autogpt.processing.text as text_processing
+from autogpt.config import Config
+from autogpt.processing.text import (
+    chunk_content,
+    extract_relevant_text,
+    iter_sentences,
+    load_sentence_segmenter,
+    split_text,
+    summarize_text,
+)
+
+TEXT = " ".join(
+    f"This is sentence number {i}. Is it {'short' if i % 3 else 'long, or not'}?"
+    for i in range(100)
+)
+
+
+@pytest.fixture
+def byte_tokenizer(mocker: MockerFixture) -> tiktoken.Encoding:
+    """A tokenizer with one token per byte, so no BPE ranks have to be downloaded"""
+    tokenizer = tiktoken.Encoding(
+        "bytes",
+        pat_str=r"\s?\S+|\s+",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={"<|endoftext|>": 256},
+    )
+    mocker.patch.object(text_processing, "get_encoding", return_value=tokenizer)
+    mocker.patch.object(token_counter, "get_encoding", return_value=tokenizer)
+    return tokenizer
+
+
+@pytest.fixture
+def sentencizer_only(config: Config) -> None:
+    config.browse_spacy_sentencizer_only = True
+
+
+def test_load_sentence_segmenter_is_cached(mocker: MockerFixture):
+    load_sentence_segmenter.cache_clear()
+    blank = mocker.spy(text_processing.spacy, "blank")
+
+    nlp = load_sentence_segmenter("en_core_web_sm", sentencizer_only=True)
+    assert load_sentence_segmenter("en_core_web_sm", sentencizer_only=True) is nlp
+    assert nlp.pipe_names == ["sentencizer"]
+    blank.assert_called_once_with("en")
+
+
+@pytest.mark.parametrize("block_chars", [40, 500, len(TEXT)])
+def test_iter_sentences_matches_whole_text(block_chars: int):
+    nlp = load_sentence_segmenter("en", sentencizer_only=True)
+    expected = [sentence.text.strip() for sentence in nlp(TEXT).sents]
+
+    assert list(iter_sentences(TEXT, nlp, block_chars)) == expected
+
+
+def test_iter_sentences_is_lazy(mocker: MockerFixture):
+    nlp = load_sentence_segmenter("en", sentencizer_only=True)
+    spy = mocker.Mock(wraps=nlp)
+
+    sentences = iter_sentences(TEXT, spy, block_chars=100)
+    assert next(sentences) == "This is sentence number 0."
+    assert spy.call_count == 1
+
+
+def test_sentence_token_ranges_multibyte():
+    nlp = load_sentence_segmenter("en", sentencizer_only=True)
+    text = "Héllo wörld. Ça va? Oui."
+    token_bytes = [c.encode() for c in text]  # one token per character
+
+    ranges = list(text_processing._sentence_token_ranges(text, token_bytes, nlp))
+    assert [text[start:end] for start, end in ranges] == [
+        "Héllo wörld. ",
+        "Ça va? ",
+        "Oui.",
+    ]
+
+
+def test_split_text_encodes_once(
+    config: Config, byte_tokenizer: tiktoken.Encoding, sentencizer_only, mocker
+):
+    encode = mocker.spy(byte_tokenizer, "encode")
+
+    chunks = list(
+        split_text(
+            TEXT, config.fast_llm, config, with_overlap=False, max_chunk_length=200
+        )
+    )
+
+    encode.assert_called_once()
+    assert len(chunks) > 1
+    assert all(length < 200 for _, length in chunks)
+    # without overlap, the chunks cover every token of the text once
+    assert sum(length for _, length in chunks) == len(TEXT)
+    assert " ".join(chunk for chunk, _ in chunks) == TEXT
+
+
+def test_split_text_overlap(config: Config, byte_tokenizer, sentencizer_only):
+    chunks = [
+        chunk
+        for chunk, _ in split_text(TEXT, config.fast_llm, config, max_chunk_length=200)
+    ]
+
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        last_sentence = list(
+            iter_sentences(previous, load_sentence_segmenter("en", True))
+        )[-1]
+        assert chunk.startswith(last_sentence)
+
+
+def test_split_text_chops_long_sentences(
+    config: Config, byte_tokenizer, sentencizer_only
+):
+    text = "A short sentence. " + "x" * 450 + " and a short ending."
+
+    chunks = list(
+        split_text(
+            text, config.fast_llm, config, with_overlap=False, max_chunk_length=200
+        )
+    )
+
+    assert all(length < 200 for _, length in chunks)
+    assert "".join(chunk for chunk, _ in chunks).count("x") == 450
+
+
+def test_chunk_content_encodes_once(config: Config, byte_tokenizer, mocker):
+    encode = mocker.spy(byte_tokenizer, "encode")
+
+    chunks = list(chunk_content(TEXT, config.fast_llm, 500, with_overlap=False))
+
+    encode.assert_called_once()
+    assert all(length <= 500 for _, length in chunks)
+    assert "".join(chunk for chunk, _ in chunks) == TEXT
+
+
+@pytest.fixture
+def summarized_texts(config: Config, mocker: MockerFixture) -> list[str]:
+    """
+    Summarizes every text as 60 x's, and records the summarized texts. The summary
+    cache is disabled, so every summarization is a request.
+    """
+    config.summary_cache_size = 0
+    texts = []
+
+    def create_chat_completion(prompt, **_):
+        (text,) = re.findall(r'LITERAL TEXT: """(.*)"""', prompt[0].content, re.S)
+        texts.append(text)
+        return mocker.Mock(content=" " + "x" * 60)
+
+    mocker.patch.object(
+        text_processing, "create_chat_completion", side_effect=create_chat_completion
+    )
+    # chunks of at most 200 tokens
+    mocker.patch.object(
+        text_processing,
+        "_max_chunk_length",
+        side_effect=lambda model, max=None: min(max or 750, 750),
+    )
+    return texts
+
+
+def test_summarize_text_single_request(
+    config: Config, byte_tokenizer, summarized_texts: list[str]
+):
+    assert summarize_text("A short text.", config) == ("x" * 60, None)
+    assert summarized_texts == ["A short text."]
+
+
+def test_summarize_text_reduces_in_tree(
+    config: Config, byte_tokenizer, sentencizer_only, summarized_texts: list[str]
+):
+    summary, chunk_summaries = summarize_text(TEXT, config)
+
+    assert summary == "x" * 60
+    # the chunks are summarized concurrently, so in any order
+    assert sorted(chunk for _, chunk in chunk_summaries) == sorted(
+        summarized_texts[: len(chunk_summaries)]
+    )
+    # 3 summaries of 60 tokens (and a separator) fit in a request of 200 tokens,
+    # so every level of the tree merges groups of 3
+    n_summaries, n_requests = len(chunk_summaries), len(chunk_summaries)
+    while n_summaries > 1:
+        n_summaries = ceil(n_summaries / 3)
+        n_requests += n_summaries
+    assert len(summarized_texts) == n_requests
+    assert all(len(text) <= 200 for text in summarized_texts)
+
+
+def test_summarize_text_summarizes_chunks_concurrently(
+    config: Config, byte_tokenizer, sentencizer_only, summarized_texts: list[str]
+):
+    config.summarization_concurrency = 2
+    # The first 2 chunks can only pass the barrier if they're summarized together
+    barrier = threading.Barrier(2, timeout=5)
+    create_chat_completion = text_processing.create_chat_completion.side_effect
+
+    def summarize_together(prompt, **kwargs):
+        if len(summarized_texts) < 2:
+            barrier.wait()
+        return create_chat_completion(prompt, **kwargs)
+
+    text_processing.create_chat_completion.side_effect = summarize_together
+
+    summary, _ = summarize_text(TEXT, config)
+    assert summary == "x" * 60
+
+
+def test_summarize_text_uses_cache(
+    config: Config, byte_tokenizer, sentencizer_only, summarized_texts: list[str]
+):
+    config.summary_cache_size = 100
+    summary, chunk_summaries = summarize_text(TEXT, config, question="Why?")
+    n_requests = len(summarized_texts)
+    cache = text_processing.get_summary_cache(config)
+    misses = cache.misses
+
+    assert summarize_text(TEXT, config, question="Why?") == (summary, chunk_summaries)
+    assert len(summarized_texts) == n_requests
+    assert cache.misses == misses
+    assert cache.hit_rate >= 0.5
+
+    # The cache is keyed by the instruction as well as the text
+    summarize_text(TEXT, config, question="How?")
+    assert len(summarized_texts) > n_requests
+
+
+def test_get_summary_cache_disabled(config: Config):
+    config.summary_cache_size = 0
+    assert text_processing.get_summary_cache(config) is None
+
+
+PAGE = " ".join(
+    [f"Filler sentence {i} is about nothing in particular." for i in range(20)]
+    + ["Polar bears live on the sea ice of the Arctic."]
+    + [f"Another filler sentence {i} follows here." for i in range(20)]
+    + ["Polar bears mostly eat seals."]
+)
+
+
+def test_extract_relevant_text(config: Config, byte_tokenizer, sentencizer_only):
+    relevant = extract_relevant_text(
+        PAGE, "What do polar bears eat?", config.fast_llm, config, max_tokens=100
+    )
+
+    assert len(relevant) <= 100 + len(" ...") * 3
+    assert relevant == (
+        "... Polar bears live on the sea ice of the Arctic. ... "
+        "Polar bears mostly eat seals."
+    )
+
+
+def test_extract_relevant_text_short_text(config: Config, byte_tokenizer):
+    assert extract_relevant_text("Short.", "Why?", config.fast_llm, config, 10) == (
+        "Short."
+    )
+
+
+def test_bm25_scores():
+    documents = [["polar", "bears", "eat", "seals"], ["bears", "sleep"], ["seals"]]
+
+    scores = text_processing._bm25_scores(["what", "do", "bears", "eat"], documents)
+    assert scores[0] > scores[1] > scores[2] == 0
+
+
+def test_summarize_text_with_question_extracts_relevant_text(
+    config: Config, byte_tokenizer, sentencizer_only, summarized_texts: list[str]
+):
+    config.summarization_extract_max_tokens = 150
+
+    summary, chunk_summaries = summarize_text(
+        PAGE, config, question="What do polar bears eat?"
+    )
+
+    assert chunk_summaries is None
+    assert summarized_texts == [
+        extract_relevant_text(
+            PAGE, "What do polar bears eat?", config.fast_llm, config, 150
+        )
+    ]
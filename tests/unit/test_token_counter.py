@@ -1,7 +1,12 @@
+from collections import OrderedDict
+
 import pytest
+import tiktoken
+from pytest_mock import MockerFixture
 
+import autogpt.llm.utils.token_counter as token_counter
 from autogpt.llm.base import Message
-from autogpt.llm.utils import count_message_tokens, count_string_tokens
+from autogpt.llm.utils import count_message_tokens, count_string_tokens, count_tokens
 
 
 def test_count_message_tokens():
@@ -53,3 +58,44 @@ def test_count_string_tokens_gpt_4():
 
     string = "Hello, world!"
     assert count_string_tokens(string, model_name="gpt-4-0314") == 4
+
+
+@pytest.fixture
+def byte_encoding(mocker: MockerFixture) -> tiktoken.Encoding:
+    """A tokenizer with one token per byte, so no BPE ranks have to be downloaded"""
+    encoding = tiktoken.Encoding(
+        "bytes",
+        pat_str=r"\s?\S+|\s+",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={"<|endoftext|>": 256},
+    )
+    return encoding
+
+
+def test_get_encoding_is_cached(mocker: MockerFixture, byte_encoding):
+    token_counter.get_encoding.cache_clear()
+    encoding_for_model = mocker.patch.object(
+        token_counter.tiktoken, "encoding_for_model", return_value=byte_encoding
+    )
+    try:
+        assert token_counter.get_encoding("gpt-4") is byte_encoding
+        assert token_counter.get_encoding("gpt-4") is byte_encoding
+        encoding_for_model.assert_called_once_with("gpt-4")
+    finally:
+        token_counter.get_encoding.cache_clear()
+
+
+def test_count_tokens_caches_counts(mocker: MockerFixture, byte_encoding):
+    mocker.patch.object(token_counter, "TOKEN_COUNT_CACHE_SIZE", 2)
+    mocker.patch.object(token_counter, "_token_counts", OrderedDict())
+    encode = mocker.spy(byte_encoding, "encode")
+
+    assert count_tokens("Hello", byte_encoding) == 5
+    assert count_tokens("Hello", byte_encoding) == 5
+    assert encode.call_count == 1
+
+    count_tokens("world", byte_encoding)
+    count_tokens("!", byte_encoding)  # evicts "Hello", the least recently used
+    assert list(token_counter._token_counts.values()) == [5, 1]
+    count_tokens("Hello", byte_encoding)
+    assert encode.call_count == 4